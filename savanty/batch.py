@@ -0,0 +1,236 @@
+"""Batch solving of JSONL problem files.
+
+Each input line is a JSON object with a `problem_description` and optionally
+an `id`, `additional_info`, ASP `facts`, `fact_files` and any `SolverOptions`
+field. Each output line holds the problem's `id`, the fields of
+`ProblemSolverResult.to_dict()` and the `elapsed` seconds.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, Optional, Set, Union
+from savanty.facts import normalize_fact
+from savanty.metrics import get_metrics
+from savanty.pool import PoolSaturatedError, WorkerPool, get_pool
+from savanty.scheduler import traffic_priority
+from savanty.solver import SolverOptions, result_from_error, solve_program, validate_and_parse_problem
+
+
+OPTION_FIELDS = ("time_limit", "conflict_limit", "threads", "parallel_mode", "opt_strategy", "configuration")
+
+
+def _parse_line(line: Union[str, bytes], number: int) -> Optional[Dict[str, Any]]:
+    if isinstance(line, bytes):
+        line = line.decode("utf-8")
+    if not line.strip():
+        return None
+    try:
+        problem = json.loads(line)
+        if not isinstance(problem, dict):
+            raise ValueError("expected a JSON object")
+    except ValueError as e:
+        return {"id": number, "error": f"Line {number} is not a valid problem: {e}"}
+    problem.setdefault("id", number)
+    return problem
+
+
+def parse_problems(lines: Iterable[Union[str, bytes]]) -> Iterator[Dict[str, Any]]:
+    """Parse JSONL problem lines lazily, skipping blank lines.
+
+    A problem without an `id` gets its 1-based line number. A line that is
+    not a JSON object yields {"id": <line number>, "error": ...}, so a bad
+    line fails only itself.
+    """
+    for number, line in enumerate(lines, 1):
+        problem = _parse_line(line, number)
+        if problem is not None:
+            yield problem
+
+
+async def parse_problem_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[Dict[str, Any]]:
+    """Like `parse_problems`, for a body that arrives as byte chunks."""
+    buffer = b""
+    number = 0
+    async for chunk in chunks:
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        for line in lines:
+            number += 1
+            problem = _parse_line(line, number)
+            if problem is not None:
+                yield problem
+    problem = _parse_line(buffer, number + 1)
+    if problem is not None:
+        yield problem
+
+
+def read_checkpoint(path: str) -> Set[Any]:
+    """Return the ids an earlier run already wrote to the output file `path`.
+
+    Problems that ended in an error are left out, so a resumed run retries
+    them; the last line written for an id wins. A line cut short by a crash
+    is dropped from the file so appending can continue after it.
+    """
+    done: Dict[Any, bool] = {}
+    if not os.path.exists(path):
+        return set()
+    with open(path, "rb+") as f:
+        offset = 0
+        for line in f:
+            if not line.endswith(b"\n"):
+                f.truncate(offset)
+                break
+            offset += len(line)
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            done[_id_key(record.get("id"))] = not record.get("error")
+    return {key for key, ok in done.items() if ok}
+
+
+def _id_key(problem_id: Any) -> str:
+    # JSON ids may be numbers in one file and strings in another
+    return str(problem_id)
+
+
+async def _aiter(problems: Union[Iterable, AsyncIterator]) -> AsyncIterator[Dict[str, Any]]:
+    if hasattr(problems, "__aiter__"):
+        async for problem in problems:
+            yield problem
+    else:
+        for problem in problems:
+            yield problem
+
+
+async def solve_problem_record(problem: Dict[str, Any], solve_pool: Optional[WorkerPool] = None,
+                               defaults: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Solve one batch problem and return its output record.
+
+    The LLM stages run on the "llm" thread pool at "batch" priority (see
+    `savanty.scheduler`) and Clingo on `solve_pool` (the "solve" pool by
+    default). Every failure, including a full pool,
+    is reported in the record's `error` rather than raised.
+    """
+    started = time.monotonic()
+    if problem.get("error"):
+        result = result_from_error(ValueError(problem["error"]))
+    else:
+        result = await _solve_problem(problem, solve_pool or get_pool("solve"), defaults or {})
+    record = {"id": problem.get("id")}
+    record.update(result.to_dict())
+    record["elapsed"] = time.monotonic() - started
+    status = "error" if result.error else "needs_more_info" if result.needs_more_info else "solved"
+    get_metrics().inc("savanty_batch_problems_total", status=status, help="Batch problems by outcome")
+    return record
+
+
+async def _solve_problem(problem: Dict[str, Any], pool: WorkerPool, defaults: Dict[str, Any]):
+    try:
+        description = problem.get("problem_description")
+        if not description:
+            raise ValueError("problem_description is required")
+        values = dict(defaults)
+        values.update((name, problem[name]) for name in OPTION_FIELDS if problem.get(name) is not None)
+        options = SolverOptions(**values)
+        # Interactive requests get the LLM first when the quota is short
+        with traffic_priority("batch"):
+            problem_info = await get_pool("llm").run(
+                validate_and_parse_problem, description, problem.get("additional_info") or ""
+            )
+        if problem.get("facts"):
+            problem_info = dict(problem_info, facts=list(problem_info.get("facts", [])) + [
+                normalize_fact(fact) for fact in problem["facts"] if fact.strip()
+            ])
+        return await pool.run(solve_program, problem_info, fact_files=problem.get("fact_files"),
+                              options=options.with_resolved_threads(pool.pending + 1))
+    except Exception as e:
+        # Including a full pool or an isolated worker killed for overrunning its limits
+        return result_from_error(e)
+
+
+async def solve_batch(problems: Union[Iterable[Dict[str, Any]], AsyncIterator[Dict[str, Any]]],
+                      concurrency: int = 8, skip: Iterable[Any] = (),
+                      solve_pool: Optional[WorkerPool] = None,
+                      defaults: Optional[Dict[str, Any]] = None,
+                      slot: Optional[Callable] = None) -> AsyncIterator[Dict[str, Any]]:
+    """Solve problems concurrently and yield their output records in completion order.
+
+    `problems` is read lazily, so at most `concurrency` problems are held
+    at once however long the input is. Problems whose id is in `skip` (e.g.
+    from `read_checkpoint`) are passed over. `defaults` are solver option
+    values for problems that do not set their own, and `slot`, if given, is
+    an async context manager factory each problem runs under (e.g. a
+    request limiter's slot).
+    """
+    skip = {_id_key(problem_id) for problem_id in skip}
+    iterator = _aiter(problems).__aiter__()
+    pending: Set[asyncio.Future] = set()
+    exhausted = False
+
+    async def run(problem):
+        if slot is None:
+            return await solve_problem_record(problem, solve_pool, defaults)
+        try:
+            async with slot():
+                return await solve_problem_record(problem, solve_pool, defaults)
+        except PoolSaturatedError as e:
+            record = {"id": problem.get("id")}
+            record.update(result_from_error(e).to_dict())
+            return record
+
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency:
+                try:
+                    problem = await iterator.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                    break
+                if _id_key(problem.get("id")) not in skip:
+                    pending.add(asyncio.ensure_future(run(problem)))
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def run_batch(input_path: str, output_path: str, concurrency: int = 8, resume: bool = True,
+              solve_pool: Optional[WorkerPool] = None, defaults: Optional[Dict[str, Any]] = None,
+              on_record: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, int]:
+    """Solve the problems in the JSONL file `input_path` into `output_path`.
+
+    Records are appended and flushed as each problem finishes, so the output
+    file doubles as the checkpoint: with `resume` a rerun skips the problems
+    it already holds (see `read_checkpoint`); without it the file is
+    overwritten. Returns counts of "skipped", "solved", "needs_more_info"
+    and "errors".
+    """
+    if os.path.dirname(output_path):
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    skip = read_checkpoint(output_path) if resume else set()
+    counts = {"skipped": len(skip), "solved": 0, "needs_more_info": 0, "errors": 0}
+
+    async def run():
+        with open(input_path, encoding="utf-8") as source, \
+                open(output_path, "a" if resume else "w", encoding="utf-8") as out:
+            async for record in solve_batch(parse_problems(source), concurrency=concurrency, skip=skip,
+                                            solve_pool=solve_pool, defaults=defaults):
+                out.write(json.dumps(record, default=str) + "\n")
+                out.flush()
+                if record["error"]:
+                    counts["errors"] += 1
+                elif record["needs_more_info"]:
+                    counts["needs_more_info"] += 1
+                else:
+                    counts["solved"] += 1
+                if on_record is not None:
+                    on_record(record)
+
+    asyncio.run(run())
+    return counts
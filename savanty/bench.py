@@ -0,0 +1,411 @@
+"""Offline benchmarks of the full pipeline with a deterministic stand-in LM."""
+
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Any, Optional, List, Tuple
+import click
+from savanty import solver
+from savanty.solver import PIPELINES, SolverOptions, solve_optimization_problem
+
+
+# Stages reported for every benchmark, besides the end-to-end "total"
+BENCH_STAGES = ("pipeline", "load_facts", "ground", "solve")
+DEFAULT_SIZES = (10, 25, 50)
+
+# Fresh-interpreter commands timed by `measure_cold_start`
+COLD_START_COMMANDS = {
+    "import": ["-c", "import savanty.cli"],
+    "help": ["-m", "savanty.cli", "--help"],
+}
+
+
+@dataclass
+class BenchProblem:
+    """One benchmark instance: a description and the program a good LM would compile it to."""
+
+    family: str
+    size: int
+    description: str
+    program_components: Dict[str, Any]
+
+    @property
+    def analysis(self) -> str:
+        components = self.program_components
+        return (f"{self.family} problem of size {self.size} with {len(components['facts'])} facts, "
+                f"{len(components['constraints'])} constraints and objective {components['optimize']}")
+
+    def responses(self) -> Dict[str, Dict[str, Any]]:
+        """Stage outputs to replay for this problem, for both pipelines."""
+        return {
+            "validate": {"is_valid": True, "reason": "The problem is a finite combinatorial optimization problem."},
+            "identify_gaps": {"has_gaps": False, "gaps": [], "questions": []},
+            "analyze": {"analysis": self.analysis},
+            "generate": {"program_components": self.program_components},
+            "refine": {"refined_problem": self.description},
+            "compile": {"is_valid": True, "reason": "The problem is a finite combinatorial optimization problem.",
+                        "has_gaps": False, "questions": [], "analysis": self.analysis,
+                        "program_components": self.program_components},
+        }
+
+
+def knapsack_problem(size: int, rng: random.Random) -> Tuple[str, Dict[str, Any]]:
+    items = [(f"i{i}", rng.randint(1, 20), rng.randint(1, 10)) for i in range(size)]
+    capacity = sum(weight for _, _, weight in items) // 3
+    description = (f"Choose among {size} items, each with a value and a weight, the subset of "
+                   f"maximum total value whose total weight is at most {capacity}.")
+    return description, {
+        "predicates": [{"name": "Item", "fields": {"name": "ConstantField", "value": "IntegerField",
+                                                   "weight": "IntegerField"}},
+                       {"name": "Capacity", "fields": {"value": "IntegerField"}}],
+        "facts": [f"item({name},{value},{weight})" for name, value, weight in items] + [f"capacity({capacity})"],
+        "constraints": ["{ take(I) : item(I,_,_) }.",
+                        ":- capacity(C), #sum { W,I : take(I), item(I,_,W) } > C."],
+        "optimize": "#maximize { V,I : take(I), item(I,V,_) }.",
+    }
+
+
+def scheduling_problem(size: int, rng: random.Random) -> Tuple[str, Dict[str, Any]]:
+    machines = max(2, size // 5)
+    tasks = [(f"t{i}", rng.randint(1, 8), rng.randint(1, 10)) for i in range(size)]
+    horizon = sum(duration for _, duration, _ in tasks) // (machines + 1)
+    description = (f"Schedule {size} tasks with durations and priorities on {machines} machines so "
+                   f"that no machine is busy for more than {horizon} time units, maximizing the "
+                   f"total priority of the scheduled tasks.")
+    return description, {
+        "predicates": [{"name": "Task", "fields": {"name": "ConstantField", "duration": "IntegerField",
+                                                   "priority": "IntegerField"}},
+                       {"name": "Machine", "fields": {"name": "ConstantField"}},
+                       {"name": "Horizon", "fields": {"value": "IntegerField"}}],
+        "facts": ([f"task({name},{duration},{priority})" for name, duration, priority in tasks]
+                  + [f"machine(m{m})" for m in range(machines)] + [f"horizon({horizon})"]),
+        "constraints": ["{ assign(T,M) : machine(M) } 1 :- task(T,_,_).",
+                        ":- machine(M), horizon(H), #sum { D,T : assign(T,M), task(T,D,_) } > H."],
+        "optimize": "#maximize { P,T : assign(T,_), task(T,_,P) }.",
+    }
+
+
+def graph_coloring_problem(size: int, rng: random.Random) -> Tuple[str, Dict[str, Any]]:
+    edges = set()
+    while len(edges) < 2 * size:
+        a, b = rng.sample(range(size), 2)
+        edges.add((min(a, b), max(a, b)))
+    description = (f"Color the {size} nodes of a graph with {len(edges)} edges using at most 5 colors "
+                   f"so that adjacent nodes differ, minimizing the number of colors used.")
+    return description, {
+        "predicates": [{"name": "Node", "fields": {"id": "IntegerField"}},
+                       {"name": "Edge", "fields": {"source": "IntegerField", "target": "IntegerField"}},
+                       {"name": "Color", "fields": {"id": "IntegerField"}}],
+        "facts": ([f"node({n})" for n in range(size)] + [f"edge({a},{b})" for a, b in sorted(edges)]
+                  + [f"color({c})" for c in range(1, 6)]),
+        "constraints": ["1 { colored(N,C) : color(C) } 1 :- node(N).",
+                        ":- edge(X,Y), colored(X,C), colored(Y,C).",
+                        "used(C) :- colored(_,C)."],
+        "optimize": "#minimize { 1,C : used(C) }.",
+    }
+
+
+def assignment_problem(size: int, rng: random.Random) -> Tuple[str, Dict[str, Any]]:
+    description = (f"Assign each of {size} workers to a different one of {size} jobs, "
+                   f"minimizing the total cost of the assignment.")
+    costs = [f"cost(w{w},j{j},{rng.randint(1, 100)})" for w in range(size) for j in range(size)]
+    return description, {
+        "predicates": [{"name": "Worker", "fields": {"name": "ConstantField"}},
+                       {"name": "Job", "fields": {"name": "ConstantField"}},
+                       {"name": "Cost", "fields": {"worker": "ConstantField", "job": "ConstantField",
+                                                   "value": "IntegerField"}}],
+        "facts": ([f"worker(w{w})" for w in range(size)] + [f"job(j{j})" for j in range(size)] + costs),
+        "constraints": ["1 { assign(W,J) : job(J) } 1 :- worker(W).",
+                        ":- job(J), #count { W : assign(W,J) } > 1."],
+        "optimize": "#minimize { C,W,J : assign(W,J), cost(W,J,C) }.",
+    }
+
+
+FAMILIES = {
+    "knapsack": knapsack_problem,
+    "scheduling": scheduling_problem,
+    "graph_coloring": graph_coloring_problem,
+    "assignment": assignment_problem,
+}
+
+
+def make_problem(family: str, size: int, seed: int = 0) -> BenchProblem:
+    """Generate the instance of `family` at `size`; the same seed gives the same instance."""
+    if family not in FAMILIES:
+        raise ValueError(f"Unknown problem family '{family}', expected one of: {', '.join(FAMILIES)}")
+    description, components = FAMILIES[family](size, random.Random(f"{family}-{size}-{seed}"))
+    return BenchProblem(family, size, description, components)
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """p50, p95 and p99 (nearest rank), mean and max of `values`."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+
+    def rank(q):
+        return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+    return {"p50": rank(50), "p95": rank(95), "p99": rank(99),
+            "mean": sum(ordered) / len(ordered), "max": ordered[-1]}
+
+
+def _stage_seconds(profile: Optional[Dict[str, Any]], stage: str) -> float:
+    return sum(span["seconds"] for span in (profile or {}).get("spans", []) if span["name"] == stage)
+
+
+def _summary(latencies: List[float], profiles: List[Dict[str, Any]], wall: float, errors: int) -> Dict[str, Any]:
+    latency = {"total": percentiles(latencies)}
+    for stage in BENCH_STAGES:
+        latency[stage] = percentiles([_stage_seconds(profile, stage) for profile in profiles])
+    return {"runs": len(latencies), "errors": errors,
+            "throughput": len(latencies) / wall if wall > 0 else 0.0, "latency": latency}
+
+
+def run_single(problem: BenchProblem, repeat: int, options: SolverOptions) -> Dict[str, Any]:
+    """Solve the problem `repeat` times in a row through `solve_optimization_problem`."""
+    latencies, profiles, errors = [], [], 0
+    started = time.perf_counter()
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        result = solve_optimization_problem(problem.description, "", options=options)
+        latencies.append(time.perf_counter() - begin)
+        profiles.append(result.profile)
+        errors += bool(result.error)
+    return _summary(latencies, profiles, time.perf_counter() - started, errors)
+
+
+def run_http(problem: BenchProblem, requests: int, concurrency: int, options: SolverOptions) -> Dict[str, Any]:
+    """Send `requests` /solve requests, `concurrency` at a time, to an in-process server."""
+    from fastapi.testclient import TestClient
+    from savanty.server import create_app
+
+    body = {key: value for key, value in options.to_dict().items() if value is not None}
+    body.update(problem_description=problem.description, profile=True)
+
+    def send(client):
+        begin = time.perf_counter()
+        response = client.post("/solve", json=body)
+        seconds = time.perf_counter() - begin
+        return seconds, response.json().get("profile") if response.status_code == 200 else None
+
+    with TestClient(create_app(max_concurrency=concurrency, max_queue=requests)) as client:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            outcomes = list(executor.map(lambda _: send(client), range(requests)))
+        wall = time.perf_counter() - started
+    profiles = [profile for _, profile in outcomes if profile is not None]
+    return _summary([seconds for seconds, _ in outcomes], profiles, wall, len(outcomes) - len(profiles))
+
+
+@contextmanager
+def _bench_environment(pipeline: Optional[str]):
+    """Measure every run from scratch: no program cache, no coalescing, the chosen pipeline."""
+    saved = {name: os.environ.get(name) for name in ("SAVANTY_CACHE_DISABLED", "SAVANTY_COALESCE")}
+    saved_pipeline = solver.pipeline_mode
+    os.environ["SAVANTY_CACHE_DISABLED"] = "1"
+    os.environ["SAVANTY_COALESCE"] = "0"
+    solver.pipeline_mode = pipeline or solver.pipeline_mode
+    try:
+        yield
+    finally:
+        solver.pipeline_mode = saved_pipeline
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def measure_cold_start(runs: int = 5) -> Dict[str, Dict[str, float]]:
+    """Time `COLD_START_COMMANDS` in fresh Python processes, `runs` times each.
+
+    Short-lived CLI processes pay this on every run, so it is tracked like
+    any other latency.
+    """
+    timings = {}
+    for name, arguments in COLD_START_COMMANDS.items():
+        seconds = []
+        for _ in range(runs):
+            begin = time.perf_counter()
+            subprocess.run([sys.executable] + arguments, check=True, stdout=subprocess.DEVNULL)
+            seconds.append(time.perf_counter() - begin)
+        timings[name] = percentiles(seconds)
+    return timings
+
+
+def run_benchmark(families: Optional[List[str]] = None, sizes: Optional[List[int]] = None,
+                  repeat: int = 5, concurrency: int = 8, http_requests: Optional[int] = None,
+                  lm_latency: float = 0.0, lm_jitter: float = 0.0, pipeline: Optional[str] = None,
+                  time_limit: Optional[float] = 10.0, seed: int = 0,
+                  cold_start_runs: int = 0) -> Dict[str, Any]:
+    """Benchmark every family at every size, single-threaded and under concurrent HTTP load.
+
+    Returns JSON-serializable results: run settings and environment under
+    "meta", and one entry per family, size and mode under "results" with
+    throughput (solves per second) and p50/p95/p99 latencies in seconds for
+    the whole request and each stage. `concurrency=0` skips the HTTP runs;
+    with `cold_start_runs` the CLI startup time is measured too, under
+    "cold_start" (see `measure_cold_start`).
+    """
+    import clingo
+    import dspy
+    from savanty.stand_in_lm import StandInLM, stand_in_lm
+    families = list(families or FAMILIES)
+    sizes = list(sizes or DEFAULT_SIZES)
+    http_requests = http_requests if http_requests is not None else 4 * concurrency
+    options = SolverOptions(time_limit=time_limit)
+    results = []
+    with _bench_environment(pipeline):
+        for family in families:
+            for size in sizes:
+                problem = make_problem(family, size, seed)
+                lm = StandInLM(problem.responses(), latency=lm_latency, jitter=lm_jitter, seed=seed)
+                with stand_in_lm(lm):
+                    entry = {"family": family, "size": size, "facts": len(problem.program_components["facts"])}
+                    results.append(dict(entry, mode="single", **run_single(problem, repeat, options)))
+                    if concurrency > 0 and http_requests > 0:
+                        results.append(dict(entry, mode="http", concurrency=concurrency,
+                                            **run_http(problem, http_requests, concurrency, options)))
+        used_pipeline = solver.pipeline_mode
+    data = {
+        "meta": {
+            "created": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "clingo": clingo.__version__,
+            "dspy": getattr(dspy, "__version__", "unknown"),
+            "cpus": solver.available_cpus(),
+            "pipeline": used_pipeline,
+            "repeat": repeat,
+            "concurrency": concurrency,
+            "http_requests": http_requests,
+            "lm_latency": lm_latency,
+            "lm_jitter": lm_jitter,
+            "time_limit": time_limit,
+            "seed": seed,
+        },
+        "results": results,
+    }
+    if cold_start_runs > 0:
+        data["cold_start"] = measure_cold_start(cold_start_runs)
+    return data
+
+
+def compare_results(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.25,
+                    min_seconds: float = 0.005) -> List[str]:
+    """List the regressions of `current` against `baseline` benchmark results.
+
+    A p95 latency counts as a regression when it grew by more than
+    `tolerance` (a fraction) and by at least `min_seconds`, which keeps
+    timer noise on very fast stages out; throughput when it dropped by more
+    than `tolerance`.
+    """
+    previous = {(entry["family"], entry["size"], entry["mode"]): entry for entry in baseline["results"]}
+    regressions = []
+    for entry in current["results"]:
+        old = previous.get((entry["family"], entry["size"], entry["mode"]))
+        if old is None:
+            continue
+        name = f"{entry['family']}/{entry['size']}/{entry['mode']}"
+        for stage, stats in entry["latency"].items():
+            before = old["latency"].get(stage, {}).get("p95")
+            after = stats.get("p95")
+            if before is None or after is None:
+                continue
+            if after > before * (1 + tolerance) and after - before >= min_seconds:
+                regressions.append(f"{name} {stage} p95 {before * 1000:.1f} ms -> {after * 1000:.1f} ms")
+        if old["throughput"] and entry["throughput"] < old["throughput"] * (1 - tolerance):
+            regressions.append(f"{name} throughput {old['throughput']:.2f}/s -> {entry['throughput']:.2f}/s")
+    for command, stats in current.get("cold_start", {}).items():
+        before = baseline.get("cold_start", {}).get(command, {}).get("p50")
+        after = stats.get("p50")
+        if before and after and after > before * (1 + tolerance) and after - before >= min_seconds:
+            regressions.append(f"cold start {command} p50 {before * 1000:.1f} ms -> {after * 1000:.1f} ms")
+    return regressions
+
+
+def format_results(data: Dict[str, Any]) -> str:
+    """Render benchmark results as a table of throughput and latencies in milliseconds."""
+    lines = [f"{'family':<15}{'size':>6}{'mode':>8}{'runs':>6}{'err':>5}{'tput/s':>9}"
+             f"{'p50':>9}{'p95':>9}{'p99':>9}  p95 " + "/".join(BENCH_STAGES)]
+    for entry in data["results"]:
+        total = entry["latency"]["total"]
+        stages = "/".join(f"{entry['latency'][stage].get('p95', 0) * 1000:.1f}" for stage in BENCH_STAGES)
+        lines.append(f"{entry['family']:<15}{entry['size']:>6}{entry['mode']:>8}{entry['runs']:>6}"
+                     f"{entry['errors']:>5}{entry['throughput']:>9.2f}{total.get('p50', 0) * 1000:>9.1f}"
+                     f"{total.get('p95', 0) * 1000:>9.1f}{total.get('p99', 0) * 1000:>9.1f}  {stages}")
+    for command, stats in data.get("cold_start", {}).items():
+        lines.append(f"cold start {command:<10} p50 {stats['p50'] * 1000:.1f} ms, max {stats['max'] * 1000:.1f} ms")
+    return "\n".join(lines)
+
+
+@click.command("bench")
+@click.option('--family', 'families', multiple=True, type=click.Choice(list(FAMILIES)),
+              help='Problem family to run; repeatable (default: all)')
+@click.option('--sizes', default=",".join(map(str, DEFAULT_SIZES)), show_default=True,
+              help='Comma-separated instance sizes')
+@click.option('--repeat', default=5, show_default=True, help='Single-threaded solves per instance')
+@click.option('--concurrency', default=8, show_default=True, help='Concurrent HTTP clients, 0 to skip the HTTP runs')
+@click.option('--requests', 'http_requests', type=int, help='HTTP requests per instance (default: 4 x concurrency)')
+@click.option('--lm-latency', default=0.0, show_default=True, help='Seconds the stand-in LM takes per call')
+@click.option('--lm-jitter', default=0.0, show_default=True, help='Random variation of --lm-latency, as a fraction')
+@click.option('--pipeline', type=click.Choice(PIPELINES), help='LLM pipeline (default: SAVANTY_PIPELINE)')
+@click.option('--time-limit', default=10.0, show_default=True, help='Clingo time limit per solve in seconds')
+@click.option('--seed', default=0, show_default=True, help='Seed for instances and LM latency')
+@click.option('--out', type=click.Path(dir_okay=False), help='Write the results as JSON to this file')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False),
+              help='Earlier --out file to compare against; exits with status 1 on regressions')
+@click.option('--tolerance', default=0.25, show_default=True, help='Allowed slowdown against --baseline, as a fraction')
+@click.option('--cold-start', 'cold_start_runs', default=0, show_default=True,
+              help='Also time this many fresh `savanty` startups')
+@click.option('--startup-budget', type=float,
+              help='Exit with status 1 if the median `savanty --help` startup exceeds this many seconds')
+def bench_command(families: tuple, sizes: str, repeat: int, concurrency: int, http_requests: Optional[int],
+                  lm_latency: float, lm_jitter: float, pipeline: Optional[str], time_limit: float,
+                  seed: int, out: Optional[str], baseline: Optional[str], tolerance: float,
+                  cold_start_runs: int = 0, startup_budget: Optional[float] = None):
+    """Benchmark the pipeline offline, with a stand-in LM instead of the configured model.
+
+    Examples:
+      savanty bench --sizes 10,50,100 --out bench.json
+      savanty bench --lm-latency 0.8 --lm-jitter 0.2 --concurrency 16
+      savanty bench --out new.json --baseline bench.json
+      savanty bench --sizes 10 --repeat 1 --concurrency 0 --cold-start 10 --startup-budget 0.5
+    """
+    try:
+        size_list = [int(size) for size in sizes.split(",") if size.strip()]
+    except ValueError:
+        raise click.BadParameter(f"Invalid sizes '{sizes}'", param_hint="--sizes")
+    data = run_benchmark(families=list(families), sizes=size_list, repeat=repeat, concurrency=concurrency,
+                         http_requests=http_requests, lm_latency=lm_latency, lm_jitter=lm_jitter,
+                         pipeline=pipeline, time_limit=time_limit, seed=seed,
+                         cold_start_runs=cold_start_runs or (3 if startup_budget is not None else 0))
+    click.echo(format_results(data))
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        click.echo(f"Results written to {out}")
+    failed = False
+    if startup_budget is not None and data["cold_start"]["help"]["p50"] > startup_budget:
+        click.echo(f"Startup took {data['cold_start']['help']['p50']:.3f}s, over the {startup_budget}s budget", err=True)
+        failed = True
+    if baseline:
+        with open(baseline, "r", encoding="utf-8") as f:
+            regressions = compare_results(json.load(f), data, tolerance=tolerance)
+        for regression in regressions:
+            click.echo(f"Regression: {regression}", err=True)
+        if regressions:
+            failed = True
+        else:
+            click.echo("No regressions against the baseline.")
+    if failed:
+        raise SystemExit(1)
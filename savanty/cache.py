@@ -0,0 +1,202 @@
+"""Persistent, content-addressed cache for compiled program components."""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Any, Optional, List
+
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "savanty", "programs")
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_MAX_BYTES = 100 * 1024 * 1024
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Collapse whitespace so formatting-only differences share a cache entry."""
+    if not text:
+        return ""
+    return " ".join(text.split())
+
+
+class ProgramCache:
+    """On-disk cache of parsed `program_components`, keyed by a content hash.
+
+    Each entry is stored as its own JSON file, so several processes can share
+    one cache directory. Entries expire after `ttl` seconds (0 disables
+    expiry) and the least recently used ones are evicted once the cache holds
+    more than `max_entries` files or `max_bytes` bytes.
+    """
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(description: str, additional_info: Optional[str], model: str,
+                 signature_fingerprint: str) -> str:
+        """Build the cache key for a problem compiled by a given model and pipeline."""
+        payload = json.dumps([
+            normalize_text(description),
+            normalize_text(additional_info),
+            model,
+            signature_fingerprint,
+        ])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached program components for `key`, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self._count(hit=False)
+            return None
+
+        if self.ttl and time.time() - entry.get("created", 0) > self.ttl:
+            self._remove(path)
+            self._count(hit=False)
+            return None
+
+        try:
+            # Refresh the access time used for LRU eviction.
+            os.utime(path, None)
+        except OSError:
+            pass
+        self._count(hit=True)
+        return entry["program_components"]
+
+    def set(self, key: str, program_components: Dict[str, Any]) -> None:
+        """Store program components under `key` and evict old entries if needed.
+
+        The cache is best-effort: a write that fails (read-only or full disk)
+        is dropped rather than failing the solve.
+        """
+        path = self._path(key)
+        entry = {"created": time.time(), "program_components": program_components}
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+            return
+        self._evict()
+
+    def invalidate(self, key: str) -> bool:
+        """Remove a single entry. Returns True if it existed."""
+        return self._remove(self._path(key))
+
+    def clear(self) -> int:
+        """Remove every entry and return how many were deleted."""
+        removed = 0
+        for path, _, _ in self._entries():
+            if self._remove(path):
+                removed += 1
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current size of the cache."""
+        entries = self._entries()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(entries),
+            "bytes": sum(size for _, _, size in entries),
+        }
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _entries(self) -> List[tuple]:
+        """List (path, mtime, size) for every stored entry."""
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for shard in os.listdir(self.directory):
+            shard_dir = os.path.join(self.directory, shard)
+            if not os.path.isdir(shard_dir):
+                continue
+            for name in os.listdir(shard_dir):
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(shard_dir, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, st.st_mtime, st.st_size))
+        return entries
+
+    def _evict(self) -> None:
+        entries = self._entries()
+        total_bytes = sum(size for _, _, size in entries)
+        if len(entries) <= self.max_entries and total_bytes <= self.max_bytes:
+            return
+        entries.sort(key=lambda entry: entry[1])
+        while entries and (len(entries) > self.max_entries or total_bytes > self.max_bytes):
+            path, _, size = entries.pop(0)
+            if self._remove(path):
+                total_bytes -= size
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+
+_program_cache: Optional[ProgramCache] = None
+_program_cache_lock = threading.Lock()
+
+
+def get_program_cache() -> Optional[ProgramCache]:
+    """Return the process-wide program cache, or None when caching is disabled.
+
+    Configured through `SAVANTY_CACHE_DIR`, `SAVANTY_CACHE_TTL`,
+    `SAVANTY_CACHE_MAX_ENTRIES` and `SAVANTY_CACHE_MAX_BYTES`; set
+    `SAVANTY_CACHE_DISABLED=1` to turn the cache off.
+    """
+    global _program_cache
+    if os.getenv("SAVANTY_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    with _program_cache_lock:
+        if _program_cache is None:
+            _program_cache = ProgramCache(
+                directory=os.getenv("SAVANTY_CACHE_DIR", DEFAULT_CACHE_DIR),
+                ttl=float(os.getenv("SAVANTY_CACHE_TTL", DEFAULT_TTL)),
+                max_entries=int(os.getenv("SAVANTY_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                max_bytes=int(os.getenv("SAVANTY_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES)),
+            )
+        return _program_cache
+
+
+def reset_program_cache() -> None:
+    """Forget the process-wide cache so the next lookup re-reads the environment."""
+    global _program_cache
+    with _program_cache_lock:
+        _program_cache = None
@@ -1,138 +1,276 @@
-"""Main application module for Savanty."""
+"""Main application module for Savanty.
 
+Heavy dependencies are imported on the code path that needs them: FastAPI
+and uvicorn for `--web` (see `savanty.server`), fastmcp for `--mcp` and
+dspy on the first LLM call (see `savanty.lm`), so `--help`, template
+solves and transcript replays start quickly.
+"""
+
+import json
 import os
 import sys
 from typing import Optional
 import click
-from fastapi import FastAPI, Form, HTTPException
-from fastapi.responses import HTMLResponse
-from pydantic import BaseModel
-import uvicorn
-from savanty.solver import solve_optimization_problem, ProblemSolverResult
-
-try:
-    from fastmcp import FastMCP
-    FASTMCP_AVAILABLE = True
-except ImportError:
-    FASTMCP_AVAILABLE = False
-
-
-class SolveRequest(BaseModel):
-    problem_description: str
-    additional_info: str = ""
-
-
-def create_app():
-    """Create and configure the FastAPI application."""
-    app = FastAPI(title="Savanty API", version="0.2.0")
-
-    @app.get("/", response_class=HTMLResponse)
-    async def index():
-        """Render the main dashboard page."""
-        return """
-        <html>
-            <head>
-                <title>Savanty - Optimization Problem Solver</title>
-            </head>
-            <body>
-                <h1>Savanty - Optimization Problem Solver</h1>
-                <form action="/solve" method="post">
-                    <label for="problem_description">Problem Description:</label><br>
-                    <textarea id="problem_description" name="problem_description" rows="4" cols="50"></textarea><br>
-                    <label for="additional_info">Additional Information (optional):</label><br>
-                    <textarea id="additional_info" name="additional_info" rows="2" cols="50"></textarea><br>
-                    <input type="submit" value="Solve">
-                </form>
-            </body>
-        </html>
-        """
-
-    @app.post("/solve")
-    async def solve(request: SolveRequest):
-        """Solve an optimization problem."""
-        try:
-            result = solve_optimization_problem(
-                request.problem_description, request.additional_info
-            )
+from savanty.solver import (
+    compile_template,
+    solve_template,
+    result_from_error,
+    ProblemSolverResult,
+    SolverOptions,
+    PARALLEL_MODES,
+    OPT_STRATEGIES,
+    CONFIGURATIONS,
+)
+from savanty.problem_templates import get_template_store
+from savanty.session import SolveSession
+from savanty.metrics import format_profile
+from savanty.bench import bench_command
+from savanty.transcripts import TRANSCRIPT_MODES, reset_transcript
+from savanty.warm_start import previous_atoms
 
-            if result.needs_more_info:
-                return {
-                    "needs_more_info": True,
-                    "questions": result.questions,
-                    "log": "Please provide more information to solve this problem."
-                }
-            elif result.error:
-                raise HTTPException(status_code=400, detail={
-                    "error": result.error,
-                    "log": f"Error occurred while solving: {result.error}"
-                })
-            else:
-                return {
-                    "solution": result.solution,
-                    "log": "Problem solved successfully."
-                }
-        except Exception as e:
-            raise HTTPException(status_code=400, detail={
-                "error": str(e),
-                "log": f"Error occurred while solving: {str(e)}"
-            })
 
-    return app
+def __getattr__(name):
+    # The HTTP API lives in savanty.server; keep `savanty.cli.create_app` working
+    if name == "create_app":
+        from savanty.server import create_app
+        return create_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _echo_result(result: ProblemSolverResult, profile: bool = False, save_path: Optional[str] = None) -> None:
+    """Print a solved result, or the error and exit with status 1.
+
+    With `profile` the stage timings, token counts and Clingo statistics go
+    to stderr. With `save_path` the result is also written there as JSON,
+    for a later `--warm-start`.
+    """
+    if profile and result.profile:
+        click.echo(format_profile(result.profile), err=True)
+    if result.error:
+        click.echo(f"Error: {result.error}", err=True)
+        sys.exit(1)
+    click.echo("Solution found:")
+    click.echo(result.solution)
+    if result.cost:
+        status = "optimal" if result.optimal else "not proven optimal"
+        click.echo(f"Cost: {result.cost} ({status}, {result.models} models)")
+    if result.warm_start:
+        click.echo(_format_warm_start(result.warm_start))
+    if save_path:
+        with open(save_path, "w", encoding="utf-8") as f:
+            json.dump(result.to_dict(), f)
+
+
+def _format_warm_start(report: dict) -> str:
+    reuse = (f"kept {report['reused']:.0%} of the previous solution "
+             f"({report['kept_atoms']} of {report['previous_atoms']} atoms)")
+    if not report["feasible"]:
+        return f"Warm start: {reuse}; the previous solution is no longer feasible"
+    bound = f", initial bound {report['bound']}" if report["bound"] else ""
+    return f"Warm start: {reuse}{bound}"
+
+
+def _load_previous(path: str) -> ProblemSolverResult:
+    """Read a result saved with `--save-result` (or a bare atoms mapping)."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            atoms = previous_atoms(json.load(f))
+    except ValueError as e:
+        raise click.BadParameter(f"{path}: {e}", param_hint="--warm-start")
+    if atoms is None:
+        raise click.BadParameter(f"{path} holds no solution", param_hint="--warm-start")
+    return ProblemSolverResult(atoms=atoms)
+
+
+def _run_batch(input_path: str, output_path: Optional[str], concurrency: int, resume: bool,
+               solve_pool: str, workers: Optional[int], option_values: dict) -> None:
+    """Solve a JSONL batch, reporting each problem on stderr; exits with status 1 if any failed."""
+    from savanty.batch import run_batch
+    from savanty.pool import WorkerPool
+
+    if not output_path:
+        raise click.UsageError("--batch requires --out")
+    defaults = {name: value for name, value in option_values.items() if value is not None}
+    try:
+        SolverOptions(**defaults)
+    except ValueError as e:
+        raise click.BadParameter(str(e))
+
+    def report(record):
+        if record["error"]:
+            status = f"error: {record['error']}"
+        elif record["needs_more_info"]:
+            status = "needs more information"
+        else:
+            status = f"solved in {record['elapsed']:.2f}s"
+        click.echo(f"{record['id']}: {status}", err=True)
 
+    pool = WorkerPool("batch", kind=solve_pool, max_workers=workers, max_queue=concurrency)
+    try:
+        counts = run_batch(input_path, output_path, concurrency=concurrency, resume=resume,
+                           solve_pool=pool, defaults=defaults, on_record=report)
+    finally:
+        pool.shutdown()
+    click.echo(f"Solved {counts['solved']}, needs more information {counts['needs_more_info']}, "
+               f"errors {counts['errors']}, skipped {counts['skipped']} already in {output_path}")
+    if counts["errors"]:
+        sys.exit(1)
 
-@click.command()
+
+@click.group(invoke_without_command=True)
 @click.option('--problem', '-p', help='Optimization problem description')
 @click.option('--web', '-w', is_flag=True, help='Run web interface')
-@click.option('--mcp', '-m', is_flag=True, help='Run as Model Context Protocol server')
+@click.option('--mcp', '-m', is_flag=True, help='Run as Model Context Protocol server (with --web, served at /mcp)')
 @click.option('--port', default=int(os.getenv('SAVANTY_PORT', 8000)), help='Port for web interface')
-def main(problem: Optional[str], web: bool, mcp: bool, port: int):
+@click.option('--facts', 'fact_files', multiple=True, type=click.Path(exists=True, dir_okay=False),
+              help='Instance data file (.csv, .jsonl or .lp) to load alongside the problem; repeatable')
+@click.option('--time-limit', type=float, help='Stop searching after this many seconds and return the best model so far')
+@click.option('--conflict-limit', type=int, help='Stop searching after this many conflicts')
+@click.option('--stream', is_flag=True, help='Print each improving model as it is found')
+@click.option('--threads', help='Clingo solver threads, or "auto" to size from available CPUs')
+@click.option('--parallel-mode', type=click.Choice(PARALLEL_MODES), help='Multi-threaded search: portfolio or search space splitting')
+@click.option('--opt-strategy', type=click.Choice(OPT_STRATEGIES), help='Optimization strategy: branch-and-bound or core-guided')
+@click.option('--configuration', type=click.Choice(CONFIGURATIONS), help='Clingo configuration preset')
+@click.option('--save-template', 'save_template_id', metavar='ID',
+              help='Compile the problem and save its encoding as a reusable template')
+@click.option('--template', 'template_ref', metavar='ID[@VERSION]',
+              help='Solve a saved template with --facts/--fact data, without calling the LLM')
+@click.option('--fact', 'inline_facts', multiple=True, help='ASP fact for --template, e.g. "task(a,3)"; repeatable')
+@click.option('--warm-start', 'warm_start_path', type=click.Path(exists=True, dir_okay=False), metavar='RESULT.json',
+              help='Start the search from a previous solution saved with --save-result')
+@click.option('--save-result', 'save_result_path', type=click.Path(dir_okay=False), metavar='RESULT.json',
+              help='Write the result as JSON, e.g. for a later --warm-start')
+@click.option('--list-templates', is_flag=True, help='List saved templates')
+@click.option('--profile', 'show_profile', is_flag=True,
+              help='Print per-stage timings, LLM tokens and Clingo statistics to stderr')
+@click.option('--transcript', 'transcript_path', type=click.Path(dir_okay=False),
+              help='LM transcript file to record LLM calls to or replay them from')
+@click.option('--transcript-mode', type=click.Choice(TRANSCRIPT_MODES), default='replay', show_default=True,
+              help='record: always call the LLM; replay: serve recorded calls, record misses; strict: fail on misses')
+@click.option('--batch', 'batch_path', type=click.Path(exists=True, dir_okay=False), metavar='INPUT.jsonl',
+              help='Solve every problem in a JSONL file; one JSON object per line (requires --out)')
+@click.option('--out', 'batch_out', type=click.Path(dir_okay=False), metavar='RESULTS.jsonl',
+              help='Results file for --batch, written in completion order and used as the resume checkpoint')
+@click.option('--concurrency', type=click.IntRange(min=1), default=8, show_default=True,
+              help='Problems solved at once in --batch mode')
+@click.option('--resume/--no-resume', default=True, show_default=True,
+              help='Skip problems already in --out (errors are retried) or start the file over')
+@click.option('--solve-pool', type=click.Choice(("thread", "process", "isolated")), default='process',
+              show_default=True, help='Where --batch runs Clingo')
+@click.option('--workers', type=click.IntRange(min=1), help='Clingo workers for --batch (default: CPU count)')
+@click.pass_context
+def main(ctx: click.Context, problem: Optional[str], web: bool, mcp: bool, port: int, fact_files: tuple,
+         time_limit: Optional[float], conflict_limit: Optional[int], stream: bool,
+         threads: Optional[str], parallel_mode: Optional[str], opt_strategy: Optional[str],
+         configuration: Optional[str], save_template_id: Optional[str] = None,
+         template_ref: Optional[str] = None, inline_facts: tuple = (),
+         warm_start_path: Optional[str] = None, save_result_path: Optional[str] = None,
+         list_templates: bool = False, show_profile: bool = False,
+         transcript_path: Optional[str] = None, transcript_mode: str = 'replay',
+         batch_path: Optional[str] = None, batch_out: Optional[str] = None, concurrency: int = 8,
+         resume: bool = True, solve_pool: str = 'process', workers: Optional[int] = None):
     """Savanty CLI - An intelligent optimization problem solver.
     
     Examples:
       savanty -p "Minimize x+y subject to x>=0, y>=0, x+y<=10"
+      savanty -p "Schedule the tasks in tasks.csv" --facts tasks.csv
+      savanty -p "..." --time-limit 10 --stream
+      savanty -p "..." --profile
+      savanty -p "..." --transcript runs.tx --transcript-mode record
+      savanty -p "..." --transcript runs.tx --transcript-mode strict
+      savanty -p "..." --threads auto --parallel-mode split --opt-strategy usc
+      savanty -p "Schedule the tasks in tasks.csv" --save-template shifts
+      savanty --template shifts --facts tasks.csv
+      savanty --template shifts --facts tasks.csv --warm-start last.json --save-result next.json
+      savanty --batch problems.jsonl --out results.jsonl --concurrency 16
       savanty --web
       savanty --mcp
+      savanty --web --mcp
+      savanty bench --out bench.json
     """
+    if ctx.invoked_subcommand:
+        return
+    if transcript_path:
+        # Through the environment, so server workers pick it up as well
+        os.environ["SAVANTY_TRANSCRIPT"] = transcript_path
+        os.environ["SAVANTY_TRANSCRIPT_MODE"] = transcript_mode
+        reset_transcript()
     if mcp:
         # Run as MCP server
-        if not FASTMCP_AVAILABLE:
+        try:
+            import fastmcp  # noqa: F401
+        except ImportError:
             print("Error: fastmcp package not installed. Please run 'pip install fastmcp'")
             sys.exit(1)
-            
-        # Create FastMCP app
-            mcp_app = FastMCP("Savanty Optimizer")
-        
-        @mcp_app.prompt(name="solve_optimization")
-        async def solve_optimization(problem: str) -> str:
-            """Solve an optimization problem using Savant.
-            
-            Args:
-                problem: The optimization problem description
-                
-            Returns:
-                The solution to the optimization problem
-            """
-            try:
-                result = solve_optimization_problem(problem, "")
-                if result.error:
-                    return f"Error: {result.error}"
-                return f"Solution: {result.solution}"
-            except Exception as e:
-                return f"Error occurred: {str(e)}"
-        
-        print("Starting Savanty MCP server on stdin/stdout...")
-        mcp_app.run()
+        from savanty.mcp_server import create_mcp_app
+        mcp_app = create_mcp_app()
+        if web:
+            # One process serves both, sharing caches and pools
+            import uvicorn
+            from savanty.server import create_app
+            print(f"Starting Savanty HTTP API with the MCP server at /mcp on port {port}...")
+            uvicorn.run(create_app(mcp_app=mcp_app), host="0.0.0.0", port=port)
+        else:
+            print("Starting Savanty MCP server on stdin/stdout...")
+            mcp_app.run()
     elif web:
         # Run web interface
+        import uvicorn
+        from savanty.server import create_app
         app = create_app()
         uvicorn.run(app, host="0.0.0.0", port=port)
-    elif problem:
-        # Solve problem from command line
-        current_problem = problem
+    elif batch_path:
+        _run_batch(batch_path, batch_out, concurrency, resume, solve_pool, workers,
+                   dict(time_limit=time_limit, conflict_limit=conflict_limit, threads=threads,
+                        parallel_mode=parallel_mode, opt_strategy=opt_strategy, configuration=configuration))
+    elif list_templates:
+        templates = get_template_store().list()
+        if not templates:
+            click.echo("No templates saved.")
+        for template in templates:
+            click.echo(f"{template['id']}@{template['version']}: {template['description'][:60]}")
+    elif template_ref or problem:
+        solve_kwargs = {}
+        if fact_files:
+            solve_kwargs["fact_files"] = list(fact_files)
+        option_values = dict(time_limit=time_limit, conflict_limit=conflict_limit, threads=threads,
+                             parallel_mode=parallel_mode, opt_strategy=opt_strategy,
+                             configuration=configuration)
+        if any(value is not None for value in option_values.values()):
+            try:
+                solve_kwargs["options"] = SolverOptions(**option_values)
+            except ValueError as e:
+                raise click.BadParameter(str(e))
+        previous = _load_previous(warm_start_path) if warm_start_path else None
+        if stream:
+            solve_kwargs["on_model"] = lambda info: click.echo(
+                f"Model {info['models']}: cost {info['cost']} after {info['elapsed']:.2f}s"
+            )
+        
+        if template_ref:
+            # Solve a saved template: no LLM involved
+            result = solve_template(template_ref, facts=list(inline_facts), warm_start=previous, **solve_kwargs)
+            _echo_result(result, profile=show_profile, save_path=save_result_path)
+            return
+        
+        # Solve problem from command line; the session keeps earlier turns'
+        # work, so each answer only refines and regenerates what changed
+        session = SolveSession(problem)
+        # The session warm-starts its first grounding from its last result
+        session.last_result = previous
         additional_info = ""
+        answers = []
         
         while True:
-            result = solve_optimization_problem(current_problem, additional_info)
+            if save_template_id:
+                try:
+                    template = compile_template(problem, "\n".join(answers), save_template_id)
+                    click.echo(f"Saved template {template.id}@{template.version}")
+                    break
+                except Exception as e:
+                    result = result_from_error(e)
+            else:
+                result = session.solve(additional_info, **solve_kwargs)
             
             if result.needs_more_info:
                 click.echo("I need more information to solve this problem:")
@@ -142,20 +280,19 @@ def main(problem: Optional[str], web: bool, mcp: bool, port: int):
                 # Ask user for additional information
                 user_input = click.prompt("Please provide the missing information", type=str)
                 additional_info = user_input
+                answers.append(user_input)
                 # We'll try again with the additional info
                 continue
-            elif result.error:
-                click.echo(f"Error: {result.error}", err=True)
-                sys.exit(1)
-            else:
-                click.echo("Solution found:")
-                click.echo(result.solution)
-                break
+            _echo_result(result, profile=show_profile, save_path=save_result_path)
+            break
     else:
         # Show help if no options provided
         click.echo("Savanty: An intelligent optimization problem solver")
         click.echo("Use --help for more information")
 
 
+main.add_command(bench_command)
+
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""Single-flight coalescing of identical in-flight solves."""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict
+from savanty.cache import normalize_text
+
+
+def coalesce_key(*parts: Any) -> str:
+    """Hash the inputs that decide a result; strings are whitespace-normalized."""
+    normalized = [normalize_text(part) if isinstance(part, str) else part for part in parts]
+    payload = json.dumps(normalized, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SingleFlight:
+    """Let concurrent callers with the same key share one computation.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is running wait for it and get the same result or
+    exception. Nothing is cached: once the computation finishes the next
+    caller starts a new one. Callers share the returned object and should
+    treat it as read-only. `calls` counts every call and `coalesced` the
+    ones that were served by someone else's computation.
+
+    `do` is for threads and `do_async` for coroutines on one event loop.
+    In `do_async` the computation runs as its own task, so a leader whose
+    request is cancelled does not cancel it for the callers waiting on it.
+    """
+
+    def __init__(self, name: str = "solve"):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self._futures: Dict[str, Future] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._futures) + len(self._tasks)
+
+    def do(self, key: str, fn: Callable, *args, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)`, or wait for the identical call already running."""
+        with self._lock:
+            self.calls += 1
+            future = self._futures.get(key)
+            leader = future is None
+            if leader:
+                future = self._futures[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._futures[key]
+        return future.result()
+
+    async def do_async(self, key: str, fn: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        """Await `fn(*args, **kwargs)`, or the identical coroutine already running."""
+        with self._lock:
+            self.calls += 1
+            task = self._tasks.get(key)
+            if task is None:
+                task = asyncio.ensure_future(fn(*args, **kwargs))
+                self._tasks[key] = task
+                task.add_done_callback(lambda _task: self._forget(key, _task))
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Task) -> None:
+        with self._lock:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced, "in_flight": self.in_flight}
+
+
+_single_flights: Dict[str, SingleFlight] = {}
+_single_flights_lock = threading.Lock()
+
+
+def get_single_flight(name: str = "solve") -> SingleFlight:
+    """Return the process-wide `SingleFlight` group for `name`."""
+    with _single_flights_lock:
+        if name not in _single_flights:
+            _single_flights[name] = SingleFlight(name)
+        return _single_flights[name]
+
+
+def coalescing_stats() -> Dict[str, Dict[str, int]]:
+    """Counters of every single-flight group, by name."""
+    with _single_flights_lock:
+        groups = list(_single_flights.values())
+    return {group.name: group.stats() for group in groups}
+
+
+def coalescing_enabled() -> bool:
+    """Coalescing is on unless `SAVANTY_COALESCE` is set to 0/false/no."""
+    return os.getenv("SAVANTY_COALESCE", "1").lower() not in ("0", "false", "no")
+
+
+def reset_single_flights() -> None:
+    with _single_flights_lock:
+        _single_flights.clear()
@@ -1,7 +1,17 @@
 """DSPy modules for Savanty optimization problem solver."""
 
+import asyncio
+import hashlib
+import json
+import re
+import warnings
 import dspy
-from typing import List, Dict, Any
+from typing import Dict, Any
+from savanty.metrics import get_metrics, span, record_lm_usage
+from savanty.transcripts import get_transcript
+from savanty.program_check import program_components_errors
+from savanty.lm import stage_lm
+from savanty.scheduler import estimate_tokens, get_scheduler, is_rate_limit_error
 
 
 class ProblemAnalysis(dspy.Signature):
@@ -35,6 +45,15 @@ class ProgramGeneration(dspy.Signature):
     program_components = dspy.OutputField(desc="JSON structure with predicates, facts, constraints, and optimization statement for ASP")
 
 
+class ProgramRepair(dspy.Signature):
+    """Fix ASP program components that failed static checks before solving."""
+    
+    analysis = dspy.InputField(desc="Structured analysis of an optimization problem")
+    program_components = dspy.InputField(desc="JSON program components that failed the checks")
+    diagnostics = dspy.InputField(desc="Problems found in the program components, one per line")
+    repaired_components = dspy.OutputField(desc="Corrected JSON structure with predicates, facts, constraints, and optimization statement for ASP")
+
+
 class ProblemRefinement(dspy.Signature):
     """Refine a problem description with additional information."""
     
@@ -43,18 +62,217 @@ class ProblemRefinement(dspy.Signature):
     refined_problem = dspy.OutputField(desc="Refined problem description with additional information incorporated")
 
 
+class FusedCompilation(dspy.Signature):
+    """Validate an optimization problem, identify missing information, analyze it and generate ASP program components in a single step."""
+    
+    problem_description = dspy.InputField(desc="Natural language description of an optimization problem")
+    additional_info = dspy.InputField(desc="Additional information provided by the user, possibly empty")
+    is_valid = dspy.OutputField(desc="Boolean indicating if the problem can be solved with ASP")
+    reason = dspy.OutputField(desc="Explanation of why the problem is or isn't valid for ASP solving")
+    has_gaps = dspy.OutputField(desc="Boolean indicating if information needed to solve the problem is missing")
+    questions = dspy.OutputField(desc="JSON list of questions to ask the user to fill the gaps, empty if there are none")
+    analysis = dspy.OutputField(desc="Structured analysis of the problem including domain, variables, constraints, and objective")
+    program_components = dspy.OutputField(desc="JSON structure with predicates, facts, constraints, and optimization statement for ASP; empty if the problem is invalid or has gaps")
+
+
+PIPELINE_SIGNATURES = (
+    ProblemAnalysis,
+    ProblemValidation,
+    GapIdentification,
+    ProgramGeneration,
+    ProgramRepair,
+    ProblemRefinement,
+)
+
+FUSED_PIPELINE_SIGNATURES = PIPELINE_SIGNATURES + (FusedCompilation,)
+
+# The signature each named stage (see `StagePredict`) runs
+STAGE_SIGNATURES = {
+    "analyze": ProblemAnalysis,
+    "validate": ProblemValidation,
+    "identify_gaps": GapIdentification,
+    "generate": ProgramGeneration,
+    "repair": ProgramRepair,
+    "refine": ProblemRefinement,
+    "compile": FusedCompilation,
+}
+
+
+def signature_fingerprint(signatures: tuple = PIPELINE_SIGNATURES) -> str:
+    """Hash the pipeline's signature definitions.
+
+    Changing an instruction or field description changes what the LLM is
+    asked, so anything derived from its output (e.g. cached programs) must be
+    keyed by this value.
+    """
+    spec = []
+    for signature in signatures:
+        fields = {
+            name: {key: value for key, value in (field.json_schema_extra or {}).items()
+                   if not key.startswith("IS_")}
+            for name, field in signature.fields.items()
+        }
+        spec.append([signature.__name__, signature.instructions, fields])
+    return hashlib.sha256(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _is_true(value: Any) -> bool:
+    return str(value).strip().lower() == "true"
+
+
+def gaps_likely(problem_description: str) -> bool:
+    """Guess whether a problem will need gap questions.
+
+    Descriptions that are very short or contain no numbers rarely carry the
+    instance data needed to build a program. Speculative mode uses this to
+    decide whether to start `identify_gaps` before validation has finished.
+    """
+    return len(problem_description.split()) < 25 or not re.search(r"\d", problem_description)
+
+
+class StagePredict(dspy.Predict):
+    """`dspy.Predict` that records its latency and token usage under a stage name.
+
+    Each call is timed as the `llm.<stage>` span (see `savanty.metrics`)
+    and the tokens DSPy reports for it are counted against the stage.
+    When a transcript is configured (see `savanty.transcripts`) recorded
+    calls are replayed from it and calls made to the LLM are recorded.
+
+    Calls go to the model routed to the stage (see `savanty.lm.stage_lm`)
+    and wait for an admission slot from that model's scheduler (see
+    `savanty.scheduler`) before they are sent.
+    """
+    
+    def __init__(self, signature, stage: str, **config):
+        super().__init__(signature, **config)
+        self.stage = stage
+    
+    def __call__(self, *args, **kwargs):
+        with span(f"llm.{self.stage}"):
+            replayed = self._replay(kwargs)
+            if replayed is not None:
+                return replayed
+            lm = self._lm()
+            scheduler = get_scheduler(_model(lm))
+            with scheduler.slot(estimate_tokens(self._inputs(kwargs))) as usage:
+                try:
+                    prediction = super().__call__(*args, **self._with_lm(kwargs, lm))
+                except Exception as e:
+                    if is_rate_limit_error(e):
+                        scheduler.throttle()
+                    raise
+                usage.used = _total_tokens(prediction)
+        self._record(kwargs, prediction, lm)
+        return prediction
+    
+    async def acall(self, *args, **kwargs):
+        with span(f"llm.{self.stage}"):
+            replayed = self._replay(kwargs)
+            if replayed is not None:
+                return replayed
+            lm = self._lm()
+            scheduler = get_scheduler(_model(lm))
+            async with scheduler.aslot(estimate_tokens(self._inputs(kwargs))) as usage:
+                try:
+                    prediction = await super().acall(*args, **self._with_lm(kwargs, lm))
+                except Exception as e:
+                    if is_rate_limit_error(e):
+                        scheduler.throttle()
+                    raise
+                usage.used = _total_tokens(prediction)
+        self._record(kwargs, prediction, lm)
+        return prediction
+    
+    def _lm(self):
+        return stage_lm(self.stage) or self.lm or dspy.settings.lm
+    
+    def _with_lm(self, kwargs: Dict[str, Any], lm) -> Dict[str, Any]:
+        return dict(kwargs, lm=lm) if lm is not None else kwargs
+    
+    def _inputs(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: kwargs.get(name) for name in self.signature.input_fields}
+    
+    def _replay(self, kwargs: Dict[str, Any]):
+        transcript = get_transcript()
+        if transcript is None:
+            return None
+        outputs = transcript.lookup(self.stage, signature_fingerprint((self.signature,)), self._inputs(kwargs))
+        return dspy.Prediction(**outputs) if outputs is not None else None
+    
+    def _record(self, kwargs: Dict[str, Any], prediction, lm) -> None:
+        record_lm_usage(self.stage, _lm_usage(prediction))
+        transcript = get_transcript()
+        if transcript is not None:
+            outputs = {name: prediction.get(name) for name in self.signature.output_fields}
+            transcript.record(self.stage, signature_fingerprint((self.signature,)), self._inputs(kwargs),
+                              outputs, model=getattr(lm, "model", None))
+
+
+def _model(lm) -> str:
+    return getattr(lm, "model", None) or "default"
+
+
+def _total_tokens(prediction):
+    """Tokens the provider reported for a call, or None when it reported none (e.g. usage tracking off)."""
+    total = sum(int((counts or {}).get("total_tokens") or 0) for counts in _lm_usage(prediction).values())
+    return total or None
+
+
+def _lm_usage(prediction) -> Dict[str, Any]:
+    try:
+        return prediction.get_lm_usage() or {}
+    except AttributeError:
+        return {}
+
+
+_warned_speculative_fallback = False
+
+
+def _speculative_fallback() -> None:
+    """Count a speculative `forward` run sequentially inside an event loop, warning the first time."""
+    global _warned_speculative_fallback
+    get_metrics().inc("savanty_speculative_fallbacks_total",
+                      help="Speculative pipeline runs that fell back to sequential stages inside an event loop")
+    if not _warned_speculative_fallback:
+        _warned_speculative_fallback = True
+        warnings.warn("Speculative pipeline called synchronously inside a running event loop; running the "
+                      "stages sequentially. Use `acall` to run them concurrently.", RuntimeWarning, stacklevel=3)
+
+
 class InteractiveProblemSolver(dspy.Module):
-    """Main module for solving optimization problems using DSPy with interactive gap filling."""
+    """Main module for solving optimization problems using DSPy with interactive gap filling.
+
+    With `speculative=True` the stages that only depend on the (refined)
+    problem description are started concurrently through async LM calls:
+    `validate` and `analyze` always, and `identify_gaps` when `gaps_likely`
+    says it will probably be needed. Results of speculative calls that the
+    sequential pipeline would not have made are discarded, so the returned
+    prediction is the same in both modes.
+
+    The prediction's `problem_description` is the description the stages
+    worked on, i.e. the refined one when `additional_info` was given.
+    """
     
-    def __init__(self):
+    def __init__(self, speculative: bool = False):
         super().__init__()
-        self.analyze = dspy.Predict(ProblemAnalysis)
-        self.validate = dspy.Predict(ProblemValidation)
-        self.identify_gaps = dspy.Predict(GapIdentification)
-        self.generate = dspy.Predict(ProgramGeneration)
-        self.refine = dspy.Predict(ProblemRefinement)
+        self.speculative = speculative
+        self.analyze = StagePredict(ProblemAnalysis, "analyze")
+        self.validate = StagePredict(ProblemValidation, "validate")
+        self.identify_gaps = StagePredict(GapIdentification, "identify_gaps")
+        self.generate = StagePredict(ProgramGeneration, "generate")
+        self.repair = StagePredict(ProgramRepair, "repair")
+        self.refine = StagePredict(ProblemRefinement, "refine")
     
     def forward(self, problem_description: str, additional_info: str = None):
+        if self.speculative:
+            try:
+                asyncio.get_running_loop()
+            except RuntimeError:
+                return asyncio.run(self.aforward(problem_description, additional_info))
+            # Already inside an event loop: callers there should use `acall`;
+            # fall back to the sequential pipeline rather than nesting loops.
+            _speculative_fallback()
+        
         # If we have additional info, refine the problem first
         if additional_info:
             refinement = self.refine(
@@ -76,7 +294,8 @@ class InteractiveProblemSolver(dspy.Module):
                     validation=validation,
                     gap_check=gap_check,
                     needs_more_info=True,
-                    questions=gap_check.questions
+                    questions=gap_check.questions,
+                    problem_description=problem_description
                 )
             else:
                 # Problem is invalid and we can't ask for more info
@@ -92,5 +311,145 @@ class InteractiveProblemSolver(dspy.Module):
             validation=validation,
             analysis=analysis,
             program=program,
-            needs_more_info=False
-        )
\ No newline at end of file
+            needs_more_info=False,
+            problem_description=problem_description
+        )
+    
+    async def aforward(self, problem_description: str, additional_info: str = None):
+        """Async pipeline; concurrent stages only when `speculative` is set."""
+        if additional_info:
+            refinement = await self.refine.acall(
+                original_problem=problem_description,
+                additional_info=additional_info
+            )
+            problem_description = refinement.refined_problem
+        
+        validation_task = asyncio.ensure_future(
+            self.validate.acall(problem_description=problem_description)
+        )
+        analysis_task = None
+        gap_task = None
+        if self.speculative:
+            analysis_task = asyncio.ensure_future(
+                self.analyze.acall(problem_description=problem_description)
+            )
+            if gaps_likely(problem_description):
+                gap_task = asyncio.ensure_future(
+                    self.identify_gaps.acall(problem_description=problem_description)
+                )
+        
+        try:
+            validation = await validation_task
+            
+            if validation.is_valid.lower() != "true":
+                if analysis_task is not None:
+                    analysis_task.cancel()
+                if gap_task is None:
+                    gap_task = asyncio.ensure_future(
+                        self.identify_gaps.acall(problem_description=problem_description)
+                    )
+                gap_check = await gap_task
+                
+                if gap_check.has_gaps.lower() == "true":
+                    return dspy.Prediction(
+                        validation=validation,
+                        gap_check=gap_check,
+                        needs_more_info=True,
+                        questions=gap_check.questions,
+                        problem_description=problem_description
+                    )
+                else:
+                    raise ValueError(f"Problem cannot be solved with ASP: {validation.reason}")
+            
+            if gap_task is not None:
+                gap_task.cancel()
+            if analysis_task is None:
+                analysis_task = asyncio.ensure_future(
+                    self.analyze.acall(problem_description=problem_description)
+                )
+            analysis = await analysis_task
+            program = await self.generate.acall(analysis=analysis.analysis)
+            
+            return dspy.Prediction(
+                validation=validation,
+                analysis=analysis,
+                program=program,
+                needs_more_info=False,
+                problem_description=problem_description
+            )
+        finally:
+            # Discard whatever speculative work is still outstanding.
+            for task in (validation_task, analysis_task, gap_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+
+class FusedProblemSolver(dspy.Module):
+    """Single-call variant of `InteractiveProblemSolver`.
+
+    One `FusedCompilation` call returns validity, gap questions, analysis and
+    program components together. The output is checked against the expected
+    schema and, only if that fails, the problem is handed to the staged
+    pipeline. The returned prediction has the same shape as the staged one,
+    plus a `fused` flag telling which path produced it.
+    """
+    
+    def __init__(self, speculative: bool = False):
+        super().__init__()
+        self.compile = StagePredict(FusedCompilation, "compile")
+        self.staged = InteractiveProblemSolver(speculative=speculative)
+        self.repair = self.staged.repair
+    
+    def forward(self, problem_description: str, additional_info: str = None):
+        fused = self.compile(
+            problem_description=problem_description,
+            additional_info=additional_info or ""
+        )
+        prediction = self._from_fused(fused)
+        if prediction is not None:
+            return prediction
+        
+        # The fused output was unusable; fall back to the staged pipeline
+        prediction = self.staged(problem_description=problem_description, additional_info=additional_info)
+        prediction.fused = False
+        return prediction
+    
+    def _from_fused(self, fused):
+        """Convert a fused prediction, or return None if it fails schema validation."""
+        for flag in (fused.is_valid, fused.has_gaps):
+            if str(flag).strip().lower() not in ("true", "false"):
+                return None
+        validation = dspy.Prediction(is_valid=str(fused.is_valid), reason=fused.reason)
+        
+        if not _is_true(fused.is_valid):
+            if not _is_true(fused.has_gaps):
+                raise ValueError(f"Problem cannot be solved with ASP: {fused.reason}")
+            try:
+                questions = json.loads(fused.questions) if isinstance(fused.questions, str) else fused.questions
+            except json.JSONDecodeError:
+                return None
+            if not isinstance(questions, list) or not questions:
+                return None
+            gap_check = dspy.Prediction(has_gaps="true", gaps="", questions=questions)
+            return dspy.Prediction(
+                validation=validation,
+                gap_check=gap_check,
+                needs_more_info=True,
+                questions=questions,
+                fused=True
+            )
+        
+        try:
+            components = json.loads(fused.program_components)
+        except (TypeError, json.JSONDecodeError):
+            return None
+        if program_components_errors(components):
+            return None
+        
+        return dspy.Prediction(
+            validation=validation,
+            analysis=dspy.Prediction(analysis=fused.analysis),
+            program=dspy.Prediction(program_components=fused.program_components),
+            needs_more_info=False,
+            fused=True
+        )
@@ -0,0 +1,286 @@
+"""Deterministic extraction of tabular instance data from problem descriptions.
+
+Descriptions often carry the instance inline: hundreds of records like
+"Task1: duration 3, priority 5;", a CSV or Markdown table or a JSON array of
+objects. Sent through every LLM stage, and echoed back by the model as
+facts, that data makes prompts and completions grow with the instance.
+`extract_tables` finds such blocks locally and replaces each with its schema
+and a few sample rows. The rows become facts that go straight into the
+program, so prompt size stays about the same however large the instance is.
+"""
+
+import csv
+import json
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Iterator, List, Optional, Set, Tuple
+from savanty.facts import format_fact, format_term
+
+
+DEFAULT_MIN_ROWS = 5
+
+# Rows shown to the LLM for each extracted table
+SAMPLE_ROWS = 3
+
+_NAME_RE = re.compile(r"([A-Za-z][A-Za-z0-9_]*)\s*:\s*$")
+_VALUE = r"-?\d+(?:\.\d+)?|[A-Za-z_][\w\-]*"
+_PAIR = rf"[A-Za-z][A-Za-z_ ]*?\s*(?:[:=]\s*|\s+)(?:{_VALUE})"
+_PAIR_RE = re.compile(rf"(?P<key>[A-Za-z][A-Za-z_ ]*?)\s*(?:[:=]\s*|\s+)(?P<value>{_VALUE})(?=\s*(?:,|$))")
+_KEY_RE = re.compile(rf"(?:^|,)\s*([A-Za-z][A-Za-z_ ]*?)\s*(?:[:=]\s*|\s+)(?:{_VALUE})(?=\s*(?:,|$))")
+# A record ends its segment or a sentence: "Task1: duration 3, priority 5."
+_RECORD_RE = re.compile(rf"\b(?P<label>[A-Za-z][\w\-]*)\s*:\s*(?P<fields>{_PAIR}(?:\s*,\s*{_PAIR})*)\s*(?:\.(?=\s|$)|$)")
+_SEGMENT_RE = re.compile(r"[^;\n]+")
+_NUMBER_RE = re.compile(r"^-?\d+(?:\.\d+)?$")
+_MARKDOWN_RULE_RE = re.compile(r"^\|?\s*:?-{3,}:?\s*(\|\s*:?-{3,}:?\s*)*\|?$")
+
+
+def extraction_enabled() -> bool:
+    """Extraction is on unless `SAVANTY_EXTRACT_TABLES` is set to 0/false/no."""
+    return os.getenv("SAVANTY_EXTRACT_TABLES", "1").lower() not in ("0", "false", "no")
+
+
+def min_rows() -> int:
+    """Rows a block needs before it is extracted (`SAVANTY_EXTRACT_MIN_ROWS`, default 5)."""
+    return int(os.getenv("SAVANTY_EXTRACT_MIN_ROWS", DEFAULT_MIN_ROWS))
+
+
+def _identifier(text: str, default: str) -> str:
+    name = re.sub(r"[^a-z0-9]+", "_", text.strip().lower()).strip("_")
+    return name if name and name[0].isalpha() else default
+
+
+def _variable(column: str) -> str:
+    return "".join(part.capitalize() for part in column.split("_")) or "X"
+
+
+def _column_type(values: List[Any]) -> str:
+    terms = [format_term(value) for value in values]
+    if all(re.match(r"^-?\d+$", term) for term in terms):
+        return "integer"
+    if all(not term.startswith('"') for term in terms):
+        return "constant"
+    if all(_NUMBER_RE.match(str(value).strip()) for value in values):
+        return "string holding a decimal number"
+    return "string"
+
+
+@dataclass
+class Table:
+    """Rows pulled out of a description, given to the program as `predicate` facts."""
+
+    predicate: str
+    columns: List[str]
+    rows: List[List[Any]]
+
+    def facts(self) -> List[str]:
+        return [format_fact(self.predicate, row) for row in self.rows]
+
+    def summary(self) -> str:
+        """What the LLM sees in place of the rows: the schema and a few samples."""
+        columns = ", ".join(f"{column} ({_column_type([row[i] for row in self.rows])})"
+                            for i, column in enumerate(self.columns))
+        signature = f"{self.predicate}({','.join(_variable(column) for column in self.columns)})"
+        samples = "\n".join(format_fact(self.predicate, row) for row in self.rows[:SAMPLE_ROWS])
+        return (f"[Data table of {len(self.rows)} rows, given as facts {signature} with columns {columns}. "
+                f"These facts are added to the program automatically: use the predicate "
+                f"{self.predicate}/{len(self.columns)} and do not list its facts. First rows:\n{samples}]")
+
+
+@dataclass
+class Extraction:
+    """The texts with their data blocks replaced by summaries, and the extracted tables."""
+
+    texts: List[Optional[str]]
+    tables: List[Table] = field(default_factory=list)
+
+    @property
+    def facts(self) -> List[str]:
+        return [fact for table in self.tables for fact in table.facts()]
+
+
+def extract_tables(*texts: Optional[str], rows: Optional[int] = None,
+                   reserved: Iterable[str] = ()) -> Extraction:
+    """Pull blocks of at least `rows` (default `min_rows()`) records out of `texts`.
+
+    Finds JSON arrays of objects or of equal-length lists, Markdown tables,
+    comma- or tab-separated blocks with a numeric column and runs of
+    "label: key value, key value" records separated by ";" or new lines.
+    Each block is replaced by `Table.summary`; predicate names are unique
+    across all `texts` and differ from the `reserved` names, e.g. those of
+    tables extracted earlier. Returns the texts unchanged when extraction is off.
+    """
+    if not extraction_enabled():
+        return Extraction(list(texts))
+    rows = min_rows() if rows is None else rows
+    extraction = Extraction([])
+    names: Set[str] = set(reserved)
+    for text in texts:
+        if not text:
+            extraction.texts.append(text)
+            continue
+        found: List[Tuple[int, int, Table]] = []
+        # Each finder skips what earlier finders took
+        for finder in (_json_tables, _markdown_tables, _delimited_tables, _record_tables):
+            for start, end, table in finder(text, rows):
+                if not any(start < taken_end and taken_start < end for taken_start, taken_end, _ in found):
+                    found.append((start, end, table))
+        found.sort(key=lambda item: item[0])
+        pieces, position = [], 0
+        for start, end, table in found:
+            table.predicate = _unique(table.predicate, names)
+            pieces.extend([text[position:start], table.summary()])
+            position = end
+            extraction.tables.append(table)
+        pieces.append(text[position:])
+        extraction.texts.append("".join(pieces))
+    return extraction
+
+
+def _unique(name: str, names: Set[str]) -> str:
+    unique, index = name, 1
+    while unique in names:
+        index += 1
+        unique = f"{name}{index}"
+    names.add(unique)
+    return unique
+
+
+def _name_before(text: str, start: int, default: str) -> str:
+    """Name a table after the heading just before it, e.g. "Tasks:" -> "tasks"."""
+    match = _NAME_RE.search(text[:start].rstrip().rsplit("\n", 1)[-1])
+    return _identifier(match.group(1), default) if match else default
+
+
+def _json_tables(text: str, rows: int) -> Iterator[Tuple[int, int, Table]]:
+    decoder = json.JSONDecoder()
+    position = 0
+    for match in re.finditer(r"\[\s*[\[{]", text):
+        if match.start() < position:
+            continue
+        try:
+            value, end = decoder.raw_decode(text, match.start())
+        except ValueError:
+            continue
+        position = end
+        if not isinstance(value, list) or len(value) < rows:
+            continue
+        if all(isinstance(item, dict) for item in value):
+            keys = list(value[0])
+            if not keys or any(list(item) != keys for item in value):
+                continue
+            records = [[item[key] for key in keys] for item in value]
+            columns = [_identifier(key, f"col{i + 1}") for i, key in enumerate(keys)]
+        elif all(isinstance(item, list) for item in value):
+            if not value[0] or any(len(item) != len(value[0]) for item in value):
+                continue
+            records = value
+            columns = [f"col{i + 1}" for i in range(len(value[0]))]
+        else:
+            continue
+        if all(not isinstance(cell, (dict, list)) and cell is not None for record in records for cell in record):
+            yield match.start(), end, Table(_name_before(text, match.start(), "row"), columns, records)
+
+
+def _lines(text: str) -> List[Tuple[int, int, str]]:
+    """(start, end, line) for every line of `text`."""
+    lines, position = [], 0
+    for line in text.split("\n"):
+        lines.append((position, position + len(line), line))
+        position += len(line) + 1
+    return lines
+
+
+def _markdown_tables(text: str, rows: int) -> Iterator[Tuple[int, int, Table]]:
+    lines = _lines(text)
+    index = 0
+    while index < len(lines):
+        end = index
+        while end < len(lines) and lines[end][2].strip().startswith("|"):
+            end += 1
+        block = [line.strip().strip("|").split("|") for _, _, line in lines[index:end]]
+        if (end - index >= rows + 2 and _MARKDOWN_RULE_RE.match(lines[index + 1][2].strip())
+                and all(len(cells) == len(block[0]) for cells in block)):
+            columns = [_identifier(cell, f"col{i + 1}") for i, cell in enumerate(block[0])]
+            records = [[cell.strip() for cell in cells] for cells in block[2:]]
+            start = lines[index][0]
+            yield start, lines[end - 1][1], Table(_name_before(text, start, "row"), columns, records)
+        index = max(end, index + 1)
+
+
+def _delimited_tables(text: str, rows: int) -> Iterator[Tuple[int, int, Table]]:
+    lines = _lines(text)
+    for delimiter in (",", "\t"):
+        index = 0
+        while index < len(lines):
+            width = _width(lines[index][2], delimiter)
+            end = index
+            while end < len(lines) and width > 1 and _width(lines[end][2], delimiter) == width:
+                end += 1
+            if end - index >= rows:
+                block = [[cell.strip() for cell in cells]
+                         for cells in csv.reader([line for _, _, line in lines[index:end]], delimiter=delimiter)]
+                table = _delimited_table(block, rows)
+                if table is not None:
+                    start = lines[index][0]
+                    table.predicate = _name_before(text, start, table.predicate)
+                    yield start, lines[end - 1][1], table
+            index = max(end, index + 1)
+
+
+def _width(line: str, delimiter: str) -> int:
+    if delimiter not in line:
+        return 0
+    return len(next(csv.reader([line], delimiter=delimiter)))
+
+
+def _delimited_table(block: List[List[str]], rows: int) -> Optional[Table]:
+    """Turn a run of delimited lines into a table, or None if it looks like prose."""
+    header = not any(_NUMBER_RE.match(cell) for cell in block[0])
+    records = block[1:] if header else block
+    if len(records) < rows:
+        return None
+    # Data cells are short and at least one column is numeric throughout
+    if any(len(cell.split()) > 4 for record in records for cell in record):
+        return None
+    if not any(all(_NUMBER_RE.match(record[i]) for record in records) for i in range(len(block[0]))):
+        return None
+    if header:
+        columns = [_identifier(cell, f"col{i + 1}") for i, cell in enumerate(block[0])]
+    else:
+        columns = [f"col{i + 1}" for i in range(len(block[0]))]
+    return Table("row", columns, records)
+
+
+def _record_tables(text: str, rows: int) -> Iterator[Tuple[int, int, Table]]:
+    run: List[Tuple[int, int, str, List[str], List[str]]] = []
+
+    def flush():
+        if len(run) >= rows:
+            labels = [label for _, _, label, _, _ in run]
+            columns = ["id"] + [_identifier(key, f"col{i + 2}") for i, key in enumerate(run[0][3])]
+            records = [[label] + values for _, _, label, _, values in run]
+            yield run[0][0], run[-1][1], Table(_label_prefix(labels, text, run[0][0]), columns, records)
+        run.clear()
+
+    for segment in _SEGMENT_RE.finditer(text):
+        match = _RECORD_RE.search(segment.group())
+        if match is None:
+            yield from flush()
+            continue
+        keys = [key.strip() for key in _KEY_RE.findall(match.group("fields"))]
+        values = [pair.group("value") for pair in _PAIR_RE.finditer(match.group("fields"))]
+        # Only the first record of a run may follow other text, and only the last be followed by it
+        if run and (segment.group()[:match.start()].strip() or run[-1][3] != keys):
+            yield from flush()
+        run.append((segment.start() + match.start(), segment.start() + match.end(), match.group("label"),
+                     keys, values))
+        if segment.group()[match.end():].strip():
+            yield from flush()
+    yield from flush()
+
+
+def _label_prefix(labels: List[str], text: str, start: int) -> str:
+    """Name records after their labels' common prefix ("Task1", "Task2" -> "task")."""
+    prefix = os.path.commonprefix(labels).rstrip("0123456789_-")
+    return _identifier(prefix, "") or _name_before(text, start, "record")
@@ -0,0 +1,198 @@
+"""Bulk and streaming loading of instance facts into Clingo."""
+
+import csv
+import json
+import os
+import re
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+
+DEFAULT_CHUNK_SIZE = 20000
+
+_CONSTANT_RE = re.compile(r"^_*[a-z][A-Za-z0-9_']*$")
+_INTEGER_RE = re.compile(r"^-?\d+$")
+
+
+def asp_name(name: str) -> str:
+    """Return the ASP predicate name for a class-style name, as clorm does ("TaskSlot" -> "taskSlot")."""
+    return name[:1].lower() + name[1:]
+
+
+def format_term(value: Any, field_type: Optional[str] = None) -> str:
+    """Render a Python value as an ASP term.
+
+    `field_type` is a clorm field type name from a predicate spec. Without
+    one, integers stay integers, valid ASP constants stay constants and
+    everything else becomes a quoted string.
+    """
+    if isinstance(value, bool):
+        value = str(value).lower()
+    if isinstance(value, int):
+        return str(value)
+    text = str(value).strip()
+    if field_type == "IntegerField" or (field_type is None and _INTEGER_RE.match(text)):
+        if _INTEGER_RE.match(text):
+            return str(int(text))
+        if field_type == "IntegerField":
+            raise ValueError(f"Expected an integer, got {value!r}")
+    if field_type != "StringField" and _CONSTANT_RE.match(text):
+        return text
+    escaped = text.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+
+def format_fact(predicate: str, args: List[Any], field_types: Optional[List[str]] = None) -> str:
+    """Render one fact, e.g. format_fact("task", ["t1", 3]) -> 'task(t1,3).'"""
+    if not args:
+        return f"{predicate}."
+    types = field_types or [None] * len(args)
+    terms = ",".join(format_term(arg, field_type) for arg, field_type in zip(args, types))
+    return f"{predicate}({terms})."
+
+
+def normalize_fact(fact: str) -> str:
+    """Return an ASP fact as a terminated statement, e.g. "task(a, 3)" -> "task(a, 3)."."""
+    fact = fact.strip()
+    if not fact:
+        return ""
+    return fact if fact.endswith(".") else fact + "."
+
+
+def iter_program_chunks(facts: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """Group facts into program text chunks of at most `chunk_size` facts.
+
+    Only one chunk is held in memory at a time, so `facts` may be a lazy
+    iterator over input larger than memory.
+    """
+    chunk = []
+    for fact in facts:
+        fact = normalize_fact(fact)
+        if not fact:
+            continue
+        chunk.append(fact)
+        if len(chunk) >= chunk_size:
+            yield "\n".join(chunk)
+            chunk = []
+    if chunk:
+        yield "\n".join(chunk)
+
+
+def facts_program(facts: Iterable[str]) -> str:
+    """Render a list of facts as a single program text."""
+    return "\n".join(normalize_fact(fact) for fact in facts if fact.strip())
+
+
+def load_facts(ctrl, facts: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE,
+               part: str = "base") -> int:
+    """Add facts to a Clingo control object in bulk.
+
+    Facts are handed to Clingo's own parser as program text, one chunk at a
+    time, which handles nested terms and quoted strings correctly and avoids
+    building a Python object per fact. Returns the number of chunks added.
+    """
+    chunks = 0
+    for chunk in iter_program_chunks(facts, chunk_size):
+        ctrl.add(part, [], chunk)
+        chunks += 1
+    return chunks
+
+
+def _field_types(predicate: str, predicates: Optional[List[Dict[str, Any]]]) -> Optional[Dict[str, str]]:
+    """Look up {field name: field type} for `predicate` in a list of predicate specs."""
+    for pred in predicates or []:
+        if pred["name"] == predicate or asp_name(pred["name"]) == asp_name(predicate):
+            return {field: str(type_name).rstrip("()") for field, type_name in pred["fields"].items()}
+    return None
+
+
+def read_csv_facts(path: str, predicate: Optional[str] = None,
+                   predicates: Optional[List[Dict[str, Any]]] = None,
+                   header: bool = True) -> Iterator[str]:
+    """Stream facts from a CSV file, one row per fact.
+
+    The predicate defaults to the file name ("tasks.csv" -> "tasks"). When a
+    matching predicate spec is given, its field types decide how each column
+    is rendered and, with a header, which column goes in which position.
+    """
+    predicate = predicate or os.path.splitext(os.path.basename(path))[0].lower()
+    field_types = _field_types(predicate, predicates)
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        columns = None
+        order = None
+        types = None
+        if header:
+            columns = [column.strip() for column in next(reader, [])]
+            if field_types and set(field_types) <= set(columns):
+                order = [columns.index(field) for field in field_types]
+                types = list(field_types.values())
+        elif field_types:
+            types = list(field_types.values())
+        for row in reader:
+            if not row:
+                continue
+            if order is not None:
+                row = [row[i] for i in order]
+            yield format_fact(asp_name(predicate), row, types)
+
+
+def read_jsonl_facts(path: str, predicate: Optional[str] = None,
+                     predicates: Optional[List[Dict[str, Any]]] = None) -> Iterator[str]:
+    """Stream facts from a JSON Lines file.
+
+    Each line may be an ASP fact string, {"predicate": name, "args": [...]},
+    a list of arguments or an object of named fields (both need `predicate`).
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                yield normalize_fact(record)
+                continue
+            name = predicate
+            if isinstance(record, dict) and "args" in record:
+                name = record.get("predicate", predicate)
+                args = record["args"]
+                types = None
+            elif isinstance(record, dict):
+                field_types = _field_types(name, predicates) if name else None
+                if field_types:
+                    args = [record[field] for field in field_types]
+                    types = list(field_types.values())
+                else:
+                    args = list(record.values())
+                    types = None
+            else:
+                args = record
+                types = None
+            if not name:
+                raise ValueError(f"{path}:{line_number}: no predicate name for record")
+            if types is None:
+                field_types = _field_types(name, predicates)
+                types = list(field_types.values()) if field_types and len(field_types) == len(args) else None
+            yield format_fact(asp_name(name), args, types)
+
+
+def read_lp_facts(path: str) -> Iterator[str]:
+    """Stream facts from a plain ASP file with one fact per line."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("%"):
+                yield line
+
+
+def read_fact_file(path: str, predicate: Optional[str] = None,
+                   predicates: Optional[List[Dict[str, Any]]] = None) -> Iterator[str]:
+    """Stream facts from a .csv, .jsonl or .lp file, chosen by extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return read_csv_facts(path, predicate, predicates)
+    if extension in (".jsonl", ".ndjson"):
+        return read_jsonl_facts(path, predicate, predicates)
+    if extension in (".lp", ".asp", ".txt"):
+        return read_lp_facts(path)
+    raise ValueError(f"Unsupported fact file format: {path}")
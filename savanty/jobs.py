@@ -0,0 +1,117 @@
+"""Background jobs that clients can poll and cancel by id.
+
+A job is an asyncio task on the server's event loop; the blocking work it
+awaits runs on the shared worker pools (see `savanty.pool`). The MCP server
+uses jobs so an agent can start a compile or a solve, carry on and collect
+the result later.
+"""
+
+import asyncio
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Dict, Optional
+
+
+JOB_STATES = ("running", "done", "failed", "cancelled")
+
+
+class Job:
+    """One background computation; `result` is set when it is done and `error` when it failed."""
+
+    def __init__(self, kind: str, task: asyncio.Task):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.task = task
+        self.state = "running"
+        self.created = time.time()
+        self.finished: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.state,
+            "elapsed": (self.finished or time.time()) - self.created,
+        }
+        if self.state == "done":
+            data["result"] = self.result
+        elif self.state == "failed":
+            data["error"] = self.error
+        return data
+
+
+class JobRegistry:
+    """The jobs of one process, by id.
+
+    Running jobs are always kept; of the finished ones only the newest
+    `max_finished` are, so clients should collect results promptly.
+    """
+
+    def __init__(self, max_finished: int = 1000):
+        self.max_finished = max_finished
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(self, kind: str, coroutine: Awaitable[Dict[str, Any]]) -> Job:
+        """Run `coroutine` as a job; its return value becomes the job's result."""
+        job = Job(kind, asyncio.ensure_future(coroutine))
+        with self._lock:
+            self._jobs[job.id] = job
+        job.task.add_done_callback(lambda task: self._finish(job, task))
+        return job
+
+    def _finish(self, job: Job, task: asyncio.Task) -> None:
+        job.finished = time.time()
+        if task.cancelled():
+            job.state = "cancelled"
+        elif task.exception() is not None:
+            job.state, job.error = "failed", str(task.exception())
+        else:
+            job.state, job.result = "done", task.result()
+        with self._lock:
+            self._finished[job.id] = None
+            while len(self._finished) > self.max_finished:
+                expired, _ = self._finished.popitem(last=False)
+                self._jobs.pop(expired, None)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        """Cancel a running job; returns the job, or None if it is unknown."""
+        job = self.get(job_id)
+        if job is not None:
+            job.task.cancel()
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        """The number of known jobs in each state."""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {state: sum(job.state == state for job in jobs) for state in JOB_STATES}
+
+
+_registry: Optional[JobRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_job_registry() -> JobRegistry:
+    """Return the process-wide job registry, keeping `SAVANTY_JOB_HISTORY` (1000) finished jobs."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = JobRegistry(max_finished=int(os.getenv("SAVANTY_JOB_HISTORY", 1000)))
+        return _registry
+
+
+def reset_job_registry() -> None:
+    global _registry
+    with _registry_lock:
+        _registry = None
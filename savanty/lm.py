@@ -0,0 +1,119 @@
+"""The language models behind the pipeline, built on first use.
+
+Importing dspy takes over a second, so nothing here imports it until an LM
+is actually needed; runs that never call the LLM (template solves,
+transcript replays, `--help`) never pay for it.
+"""
+
+import contextvars
+import os
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Union
+
+
+openai_api_key = os.getenv("OPENAI_API_KEY")
+llm_model = os.getenv("SAVANTY_LLM_MODEL", "openai/gpt-4o")
+
+_lms: Dict[str, Any] = {}
+_lms_lock = threading.Lock()
+
+# Set while a pipeline runs with an LM chosen for the whole call, which overrides stage routing
+_call_lm: contextvars.ContextVar[bool] = contextvars.ContextVar("savanty_call_lm", default=False)
+
+
+def get_lm(model: Optional[str] = None):
+    """Return the `dspy.LM` for `model` (default `SAVANTY_LLM_MODEL`), building it on first use.
+
+    LMs are kept per model name and shared by every caller and stage, so
+    each model's client and its kept-alive connections are reused.
+    """
+    model = model or llm_model
+    with _lms_lock:
+        if model not in _lms:
+            import dspy
+            # Use a placeholder if no API key is provided (will fail at runtime if actually needed)
+            _lms[model] = dspy.LM(model, api_key=openai_api_key or "YOUR_API_KEY_HERE")
+        return _lms[model]
+
+
+def reset_lms() -> None:
+    """Forget the LMs built so far."""
+    with _lms_lock:
+        _lms.clear()
+
+
+def resolve_lm(lm: Union[None, str, Any] = None):
+    """Pick the LM for a pipeline run.
+
+    `lm` may be an LM object or a model name. Without one, an LM the
+    application configured through `dspy.configure` is used, and the
+    default model otherwise.
+    """
+    if lm is not None:
+        return get_lm(lm) if isinstance(lm, str) else lm
+    import dspy
+    return dspy.settings.lm or get_lm()
+
+
+def stage_models() -> Dict[str, str]:
+    """The models stages are routed to, from `SAVANTY_STAGE_MODELS`.
+
+    The variable holds comma-separated `stage=model` pairs, e.g.
+    "validate=openai/gpt-4o-mini,identify_gaps=openai/gpt-4o-mini"; stages
+    not listed use the default LM.
+    """
+    routes = {}
+    for pair in os.getenv("SAVANTY_STAGE_MODELS", "").split(","):
+        stage, equals, model = pair.partition("=")
+        if equals and stage.strip() and model.strip():
+            routes[stage.strip()] = model.strip()
+    return routes
+
+
+def stage_lm(stage: str):
+    """The LM routed to `stage` (see `stage_models`), or None to use the call's LM.
+
+    Routing is skipped while `lm_context` runs with an LM passed for the
+    whole call.
+    """
+    if _call_lm.get():
+        return None
+    model = stage_models().get(stage)
+    return get_lm(model) if model else None
+
+
+def model_key(lm: Union[None, str, Any] = None) -> str:
+    """`model_name(lm)` plus the stage routing that applies with it, for cache keys."""
+    name = model_name(lm)
+    routes = stage_models() if lm is None else {}
+    if routes:
+        name += "|" + ",".join(f"{stage}={model}" for stage, model in sorted(routes.items()))
+    return name
+
+
+def model_name(lm: Union[None, str, Any] = None) -> str:
+    """The model name of `lm` as passed to `resolve_lm`, e.g. for cache keys."""
+    if lm is None:
+        return llm_model
+    if isinstance(lm, str):
+        return lm
+    return getattr(lm, "model", None) or llm_model
+
+
+@contextmanager
+def lm_context(lm: Union[None, str, Any] = None):
+    """Run the block with `resolve_lm(lm)` and token usage tracking (see `savanty.metrics`).
+
+    The setting only applies to the current thread or task, so concurrent
+    calls can each use their own LM. An `lm` given here applies to every
+    stage; without one, stages listed in `SAVANTY_STAGE_MODELS` use their
+    own model (see `stage_lm`).
+    """
+    import dspy
+    token = _call_lm.set(lm is not None)
+    try:
+        with dspy.context(lm=resolve_lm(lm), track_usage=True):
+            yield
+    finally:
+        _call_lm.reset(token)
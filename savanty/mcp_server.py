@@ -0,0 +1,214 @@
+"""Model Context Protocol server for Savanty.
+
+Imported only for `--mcp`. The tools never block the event loop: LLM stages
+run on the "llm" pool and Clingo on the "solve" pool, so one MCP server
+handles many calls at once, up to `SAVANTY_MAX_CONCURRENCY`. They use the
+same process-wide pools, program cache, template store and LLM schedulers as
+the HTTP API, which they share when both are served by one process (see
+`savanty.server.create_app`).
+
+Compiling and solving are separate tools, and every call can either wait for
+its result or return a job id right away (`wait=False`) to be polled with
+`job_status` or stopped with `cancel_job`, so an agent can pipeline its calls.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from typing import Any, Dict, List, Optional, Union
+from savanty.solver import (
+    validate_and_parse_problem,
+    solve_program,
+    remember_template_result,
+    template_warm_start,
+    compile_template,
+    result_from_error,
+    ProblemSolverResult,
+    SolverOptions,
+)
+from savanty.pool import PoolSaturatedError, RequestLimiter, get_pool
+from savanty.problem_templates import ProblemTemplate, get_template_store, parse_template_ref
+from savanty.jobs import JobRegistry, get_job_registry
+from savanty.warm_start import previous_atoms
+
+
+class SavantyTools:
+    """The MCP tools, kept free of fastmcp so they can be reused and tested.
+
+    `max_concurrency` and `max_queue` bound the calls running and waiting
+    at once, as in the HTTP API (`SAVANTY_MAX_CONCURRENCY`, `SAVANTY_MAX_QUEUE`).
+    """
+
+    def __init__(self, max_concurrency: Optional[int] = None, max_queue: Optional[int] = None,
+                 jobs: Optional[JobRegistry] = None):
+        self.limiter = RequestLimiter(
+            max_concurrency=max_concurrency or int(os.getenv("SAVANTY_MAX_CONCURRENCY", 32)),
+            max_queue=max_queue if max_queue is not None else int(os.getenv("SAVANTY_MAX_QUEUE", 64)),
+        )
+        self.jobs = jobs or get_job_registry()
+
+    async def compile_problem(self, problem_description: str, additional_info: str = "",
+                              template_id: Optional[str] = None, wait: bool = True) -> Dict[str, Any]:
+        """Compile an optimization problem into an ASP encoding and save it as a template, without solving it.
+
+        Returns the saved template (its `id` and `version` can be passed to
+        `solve_with_facts`), or `needs_more_info` with `questions` to answer
+        in `additional_info`. With `wait=False`, returns a job to poll with
+        `job_status` instead.
+        """
+        return await self._start("compile", wait, self._compile, problem_description, additional_info, template_id)
+
+    async def solve_problem(self, problem_description: str, additional_info: str = "",
+                            facts: Optional[List[str]] = None, time_limit: Optional[float] = None,
+                            conflict_limit: Optional[int] = None, threads: Optional[Union[int, str]] = None,
+                            wait: bool = True) -> Dict[str, Any]:
+        """Solve an optimization problem described in natural language.
+
+        `facts` are extra ASP facts for the instance, and `time_limit`
+        (seconds), `conflict_limit` and `threads` bound the search. Returns
+        the solution, its atoms and cost, or `needs_more_info` with
+        `questions`. With `wait=False`, returns a job to poll with
+        `job_status` instead.
+        """
+        try:
+            options = SolverOptions(time_limit=time_limit, conflict_limit=conflict_limit, threads=threads)
+        except ValueError as e:
+            return ProblemSolverResult(error=str(e)).to_dict()
+        return await self._start("solve", wait, self._solve, problem_description, additional_info, facts, options)
+
+    async def solve_with_facts(self, template_id: str, facts: Optional[List[str]] = None,
+                               time_limit: Optional[float] = None, conflict_limit: Optional[int] = None,
+                               threads: Optional[Union[int, str]] = None,
+                               warm_start: Optional[Dict[str, Any]] = None,
+                               warm_start_template: Optional[str] = None, wait: bool = True) -> Dict[str, Any]:
+        """Solve a compiled template (e.g. "shifts" or "shifts@3") against new ASP facts, without any LLM call.
+
+        Takes the same search limits as `solve_problem`. `warm_start` is a
+        previous result of the template (or its `atoms`) to start the search
+        from, or `warm_start_template` names a template (e.g. "shifts") whose
+        last solution to start from; the result's `warm_start` tells how much
+        of it was kept. With `wait=False`, returns a job to poll with
+        `job_status` instead.
+        """
+        try:
+            options = SolverOptions(time_limit=time_limit, conflict_limit=conflict_limit, threads=threads)
+            template = get_template_store().get(*parse_template_ref(template_id))
+            atoms = previous_atoms(template_warm_start(warm_start_template) if warm_start_template else warm_start)
+        except (KeyError, ValueError) as e:
+            return ProblemSolverResult(error=str(e)).to_dict()
+        return await self._start("solve", wait, self._solve_program, template.problem_info(facts), options, atoms,
+                                 template)
+
+    async def job_status(self, job_id: str) -> Dict[str, Any]:
+        """Report a job's status ("running", "done", "failed" or "cancelled") and, once done, its result."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return {"job_id": job_id, "error": f"Job '{job_id}' not found or expired"}
+        return job.to_dict()
+
+    async def cancel_job(self, job_id: str) -> Dict[str, Any]:
+        """Cancel a running job and discard its result.
+
+        On a thread solve pool a Clingo search in progress stops right away;
+        on a process or isolated pool it runs to completion (or to its time
+        limit) in the worker first.
+        """
+        job = self.jobs.cancel(job_id)
+        if job is None:
+            return {"job_id": job_id, "error": f"Job '{job_id}' not found or expired"}
+        await asyncio.wait({job.task})
+        return job.to_dict()
+
+    async def _start(self, kind: str, wait: bool, fn, *args) -> Dict[str, Any]:
+        job = self.jobs.start(kind, self._limited(fn, *args))
+        if wait:
+            try:
+                await asyncio.wait({job.task})
+            except asyncio.CancelledError:
+                # The client gave up on the call, so nobody will collect the result
+                job.task.cancel()
+                raise
+            if job.state == "done":
+                return job.result
+        return job.to_dict()
+
+    async def _limited(self, fn, *args) -> Dict[str, Any]:
+        async with self.limiter.slot():
+            return await fn(*args)
+
+    async def _compile(self, problem_description: str, additional_info: str,
+                       template_id: Optional[str]) -> Dict[str, Any]:
+        try:
+            template = await get_pool("llm").run(compile_template, problem_description, additional_info,
+                                                 template_id)
+        except PoolSaturatedError:
+            raise
+        except Exception as e:
+            return result_from_error(e).to_dict()
+        return template.to_dict()
+
+    async def _solve(self, problem_description: str, additional_info: str, facts: Optional[List[str]],
+                     options: SolverOptions) -> Dict[str, Any]:
+        try:
+            problem_info = await get_pool("llm").run(validate_and_parse_problem, problem_description,
+                                                     additional_info)
+        except PoolSaturatedError:
+            raise
+        except Exception as e:
+            return result_from_error(e).to_dict()
+        if facts:
+            problem_info = dict(problem_info, facts=list(problem_info.get("facts", [])) + list(facts))
+        return await self._solve_program(problem_info, options)
+
+    async def _solve_program(self, problem_info: Dict[str, Any], options: SolverOptions,
+                             warm_start: Optional[Dict[str, Any]] = None,
+                             template: Optional[ProblemTemplate] = None) -> Dict[str, Any]:
+        pool = get_pool("solve")
+        options = options.with_resolved_threads(pool.pending + 1)
+        # A thread worker can be told to stop; a process worker finishes and its result is dropped
+        stop = threading.Event() if pool.kind == "thread" else None
+        solve = functools.partial(solve_program, stop=stop) if stop is not None else solve_program
+        try:
+            result = await pool.run(solve, problem_info, options=options, warm_start=warm_start)
+            if template is not None:
+                await asyncio.to_thread(remember_template_result, template, result)
+        except asyncio.CancelledError:
+            if stop is not None:
+                stop.set()
+            raise
+        except PoolSaturatedError:
+            raise
+        except Exception as e:
+            result = result_from_error(e)
+        return result.to_dict()
+
+
+def create_mcp_app(tools: Optional[SavantyTools] = None):
+    """Create the FastMCP server with the Savanty tools and the `solve_optimization` prompt."""
+    from fastmcp import FastMCP
+
+    tools = tools or SavantyTools()
+    mcp_app = FastMCP("Savanty Optimizer")
+    for tool in (tools.compile_problem, tools.solve_problem, tools.solve_with_facts,
+                 tools.job_status, tools.cancel_job):
+        mcp_app.tool(tool)
+
+    @mcp_app.prompt(name="solve_optimization")
+    async def solve_optimization(problem: str) -> str:
+        """Solve an optimization problem using Savanty.
+
+        Args:
+            problem: The optimization problem description
+
+        Returns:
+            The solution to the optimization problem
+        """
+        result = await tools.solve_problem(problem)
+        if result.get("error"):
+            return f"Error: {result['error']}"
+        if result.get("needs_more_info"):
+            return "More information is needed:\n" + "\n".join(f"- {q}" for q in result["questions"])
+        return f"Solution: {result['solution']}"
+
+    return mcp_app
@@ -0,0 +1,258 @@
+"""Per-stage timing, token and Clingo statistics, exported in Prometheus format."""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Tuple
+
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+SIZE_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000, 10000000)
+
+# Clingo statistics kept per solve: name -> path in `Control.statistics`
+CLINGO_STATISTICS = {
+    "rules": ("problem", "lp", "rules"),
+    "atoms": ("problem", "lp", "atoms"),
+    "choices": ("solving", "solvers", "choices"),
+    "conflicts": ("solving", "solvers", "conflicts"),
+    "solve_seconds": ("summary", "times", "solve"),
+    "total_seconds": ("summary", "times", "total"),
+}
+
+
+class Histogram:
+    """A Prometheus-style cumulative histogram."""
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+
+def _labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """Process-wide histograms and counters, rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._histograms: Dict[str, Dict[tuple, Histogram]] = {}
+        self._counters: Dict[str, Dict[tuple, float]] = {}
+        self._help: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, value: float, buckets: Tuple[float, ...] = TIME_BUCKETS,
+                help: str = "", **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            if key not in series:
+                series[key] = Histogram(buckets)
+            series[key].observe(value)
+            self._help.setdefault(name, help)
+
+    def inc(self, name: str, value: float = 1, help: str = "", **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+            self._help.setdefault(name, help)
+
+    def render(self, gauges: Optional[Dict[str, List[Tuple[Dict[str, str], float]]]] = None,
+               counters: Optional[Dict[str, List[Tuple[Dict[str, str], float]]]] = None) -> str:
+        """Return every metric in the Prometheus text exposition format.
+
+        `gauges` and `counters` add values kept elsewhere (pool load,
+        coalescing counters), as {name: [(labels, value), ...]}.
+        """
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# HELP {name} {self._help.get(name, '')}".rstrip())
+                lines.append(f"# TYPE {name} histogram")
+                for key, histogram in sorted(series.items()):
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        lines.append(name + "_bucket" + _labels(key, 'le="%s"' % bound) + f" {count}")
+                    lines.append(name + "_bucket" + _labels(key, 'le="+Inf"') + f" {histogram.count}")
+                    lines.append(f"{name}_sum{_labels(key)} {histogram.sum}")
+                    lines.append(f"{name}_count{_labels(key)} {histogram.count}")
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# HELP {name} {self._help.get(name, '')}".rstrip())
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_labels(key)} {value}")
+        for kind, extra in (("gauge", gauges), ("counter", counters)):
+            for name, values in sorted((extra or {}).items()):
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in values:
+                    lines.append(f"{name}{_labels(tuple(sorted(labels.items())))} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Return the process-wide metrics registry."""
+    return _registry
+
+
+class Profile:
+    """Timings, LLM token counts and Clingo statistics of one request.
+
+    Spans are kept in the order they finished. A profile may be filled from
+    several threads, e.g. the LLM and solve pools working for one request.
+    """
+
+    def __init__(self):
+        self.spans: List[Dict[str, Any]] = []
+        self.tokens: Dict[str, Dict[str, int]] = {}
+        self.clingo: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add_span(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.spans.append({"name": name, "seconds": seconds})
+
+    def add_tokens(self, stage: str, prompt_tokens: int, completion_tokens: int) -> None:
+        with self._lock:
+            counts = self.tokens.setdefault(stage, {"prompt_tokens": 0, "completion_tokens": 0})
+            counts["prompt_tokens"] += prompt_tokens
+            counts["completion_tokens"] += completion_tokens
+
+    def merge(self, data: Optional[Dict[str, Any]]) -> None:
+        """Fold in a profile recorded elsewhere (e.g. by a worker process), given as `to_dict` data."""
+        if not data:
+            return
+        for span in data.get("spans", []):
+            self.add_span(span["name"], span["seconds"])
+        for stage, counts in data.get("tokens", {}).items():
+            self.add_tokens(stage, counts["prompt_tokens"], counts["completion_tokens"])
+        with self._lock:
+            self.clingo.update(data.get("clingo", {}))
+
+    def total(self, name: str) -> float:
+        """Total seconds spent in spans called `name`."""
+        return sum(span["seconds"] for span in self.spans if span["name"] == name)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"spans": list(self.spans), "tokens": {k: dict(v) for k, v in self.tokens.items()},
+                    "clingo": dict(self.clingo)}
+
+
+_current_profile: contextvars.ContextVar = contextvars.ContextVar("savanty_profile", default=None)
+
+
+def current_profile() -> Optional[Profile]:
+    return _current_profile.get()
+
+
+@contextmanager
+def profiling():
+    """Collect a `Profile` for the code in this block.
+
+    Nested blocks share the outer profile. Thread pools submitted to
+    through `savanty.pool` carry it along; work done in another process is
+    returned with its result and merged by the caller.
+    """
+    profile = _current_profile.get()
+    if profile is not None:
+        yield profile
+        return
+    profile = Profile()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+
+@contextmanager
+def span(name: str):
+    """Time a stage into the current profile and the `savanty_stage_seconds` histogram."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        _registry.observe("savanty_stage_seconds", seconds, stage=name,
+                          help="Time spent in each pipeline stage")
+        profile = _current_profile.get()
+        if profile is not None:
+            profile.add_span(name, seconds)
+
+
+def record_lm_usage(stage: str, usage: Optional[Dict[str, Dict[str, Any]]]) -> None:
+    """Record the token usage DSPy reports for one LM stage, as {model: {...tokens}}."""
+    prompt_tokens = completion_tokens = 0
+    for counts in (usage or {}).values():
+        prompt_tokens += int((counts or {}).get("prompt_tokens") or 0)
+        completion_tokens += int((counts or {}).get("completion_tokens") or 0)
+    if not prompt_tokens and not completion_tokens:
+        return
+    help = "LLM tokens used by each stage"
+    _registry.inc("savanty_llm_tokens_total", prompt_tokens, help=help, stage=stage, kind="prompt")
+    _registry.inc("savanty_llm_tokens_total", completion_tokens, help=help, stage=stage, kind="completion")
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.add_tokens(stage, prompt_tokens, completion_tokens)
+
+
+def clingo_statistics(statistics: Dict[str, Any]) -> Dict[str, float]:
+    """Pick the statistics in `CLINGO_STATISTICS` out of `Control.statistics`."""
+    summary = {}
+    for name, path in CLINGO_STATISTICS.items():
+        value = statistics
+        try:
+            for key in path:
+                value = value[key]
+        except (KeyError, TypeError):
+            continue
+        summary[name] = float(value)
+    return summary
+
+
+def record_clingo_statistics(statistics: Dict[str, Any]) -> Dict[str, float]:
+    """Record a solve's Clingo statistics and return the summary kept in profiles."""
+    summary = clingo_statistics(statistics)
+    for name, value in summary.items():
+        if name.endswith("_seconds"):
+            continue
+        _registry.observe(f"savanty_clingo_{name}", value, buckets=SIZE_BUCKETS,
+                          help=f"Clingo {name} per solve")
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.merge({"clingo": summary})
+    return summary
+
+
+def format_profile(profile: Dict[str, Any]) -> str:
+    """Render `Profile.to_dict` data as a short human-readable report."""
+    lines = ["Profile:"]
+    for item in profile.get("spans", []):
+        lines.append(f"  {item['name']:<20} {item['seconds'] * 1000:10.1f} ms")
+    for stage, counts in profile.get("tokens", {}).items():
+        lines.append(f"  tokens {stage:<13} {counts['prompt_tokens']:>6} prompt {counts['completion_tokens']:>6} completion")
+    clingo = profile.get("clingo", {})
+    if clingo:
+        lines.append("  clingo " + ", ".join(f"{name}={value:g}" for name, value in clingo.items()))
+    return "\n".join(lines)
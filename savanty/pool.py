@@ -0,0 +1,199 @@
+"""Bounded worker pools that keep blocking solver work off the event loop."""
+
+import asyncio
+import contextvars
+import os
+import threading
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Optional
+
+
+class PoolSaturatedError(RuntimeError):
+    """Raised when a pool or limiter cannot accept more work.
+
+    `status_code` is the HTTP status the API should answer with: 429 when
+    the per-process request queue is full, 503 when a worker pool is.
+    """
+
+    def __init__(self, message: str, status_code: int = 503, retry_after: int = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class WorkerPool:
+    """A thread, process or isolated-process executor with a bounded backlog.
+
+    "isolated" uses `savanty.workers.IsolatedExecutor`: pre-started worker
+    processes with per-job memory, CPU and wall-clock limits, configured by
+    `SAVANTY_WORKER_MEMORY_MB`, `SAVANTY_WORKER_CPU_SECONDS` and
+    `SAVANTY_WORKER_TIMEOUT`.
+
+    At most `max_workers` jobs run at once and at most `max_queue` more may
+    wait for a worker; anything beyond that is rejected immediately with
+    `PoolSaturatedError` instead of piling up.
+    """
+
+    def __init__(self, name: str, kind: str = "thread", max_workers: Optional[int] = None,
+                 max_queue: int = 64):
+        if kind not in ("thread", "process", "isolated"):
+            raise ValueError(f"Unknown pool kind: {kind}")
+        self.name = name
+        self.kind = kind
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[Executor] = None
+
+    @property
+    def pending(self) -> int:
+        """Jobs currently running or waiting for a worker."""
+        return self._pending
+
+    @property
+    def load(self) -> float:
+        """Fraction of workers currently busy."""
+        return min(self._pending, self.max_workers) / self.max_workers
+
+    def _get_executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                if self.kind == "process":
+                    self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+                elif self.kind == "isolated":
+                    from savanty.workers import IsolatedExecutor
+                    self._executor = IsolatedExecutor(
+                        max_workers=self.max_workers,
+                        memory_limit_mb=_env_int("SAVANTY_WORKER_MEMORY_MB", 2048),
+                        cpu_limit=_env_float("SAVANTY_WORKER_CPU_SECONDS", 300.0),
+                        timeout=_env_float("SAVANTY_WORKER_TIMEOUT", None),
+                    )
+                else:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=f"savanty-{self.name}"
+                    )
+            return self._executor
+
+    def _acquire(self) -> None:
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise PoolSaturatedError(f"The {self.name} pool is at capacity", status_code=503)
+            self._pending += 1
+
+    def _release(self, _future=None) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def submit(self, fn: Callable, *args, **kwargs):
+        """Submit a job and return a `concurrent.futures.Future`.
+
+        Thread jobs run in a copy of the caller's context, so context
+        variables such as the current request profile carry over.
+        """
+        self._acquire()
+        try:
+            if self.kind == "thread":
+                future = self._get_executor().submit(contextvars.copy_context().run, fn, *args, **kwargs)
+            else:
+                future = self._get_executor().submit(fn, *args, **kwargs)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` on the pool and await its result."""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+
+class RequestLimiter:
+    """Caps in-flight requests per process and the number waiting behind them."""
+
+    def __init__(self, max_concurrency: int = 32, max_queue: int = 64):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one request slot, waiting in the queue if all are taken."""
+        if self.active >= self.max_concurrency and self.waiting >= self.max_queue:
+            raise PoolSaturatedError("Too many concurrent requests", status_code=429)
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _env_float(name: str, default: Optional[float]) -> Optional[float]:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def _pool_settings(name: str):
+    if name == "llm":
+        # LLM stages wait on the network, so threads are enough and can be plentiful.
+        return "thread", _env_int("SAVANTY_LLM_WORKERS", 32)
+    if name == "stream":
+        # Streaming solves report models through callbacks, so they need threads.
+        return "thread", _env_int("SAVANTY_SOLVE_WORKERS", None)
+    return os.getenv("SAVANTY_SOLVE_POOL", "thread"), _env_int("SAVANTY_SOLVE_WORKERS", None)
+
+
+def get_pool(name: str) -> WorkerPool:
+    """Return the process-wide pool for `name` ("llm", "solve" or "stream").
+
+    Configured through `SAVANTY_LLM_WORKERS`, `SAVANTY_SOLVE_WORKERS`,
+    `SAVANTY_SOLVE_POOL` ("thread", "process" or "isolated") and
+    `SAVANTY_POOL_QUEUE`.
+    """
+    with _pools_lock:
+        if name not in _pools:
+            kind, max_workers = _pool_settings(name)
+            _pools[name] = WorkerPool(name, kind=kind, max_workers=max_workers,
+                                      max_queue=_env_int("SAVANTY_POOL_QUEUE", 64))
+        return _pools[name]
+
+
+def pool_stats():
+    """Return {name: {"kind", "max_workers", "pending"}} for every process-wide pool."""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: {"kind": pool.kind, "max_workers": pool.max_workers, "pending": pool.pending}
+            for pool in pools}
+
+
+def shutdown_pools(wait: bool = True) -> None:
+    """Shut down every process-wide pool; they are recreated on next use."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait)
@@ -0,0 +1,73 @@
+"""Clorm predicate classes built directly from parsed predicate specs."""
+
+import functools
+import threading
+from typing import Dict, Any, List, Tuple
+from clorm import Predicate, ConstantField, IntegerField, StringField, SimpleField, RawField
+
+
+FIELD_TYPES = {
+    "ConstantField": ConstantField,
+    "IntegerField": IntegerField,
+    "StringField": StringField,
+    "SimpleField": SimpleField,
+    "RawField": RawField,
+}
+
+
+_build_lock = threading.Lock()
+
+
+def schema_fingerprint(pred: Dict[str, Any]) -> Tuple[str, Tuple[Tuple[str, str], ...]]:
+    """Return a hashable description of a predicate spec: its name plus field names and types."""
+    fields = tuple((str(field), str(type_name).strip().rstrip("()"))
+                   for field, type_name in pred["fields"].items())
+    return str(pred["name"]), fields
+
+
+@functools.lru_cache(maxsize=1024)
+def _predicate_class(name: str, fields: Tuple[Tuple[str, str], ...]) -> type:
+    namespace = {"__module__": __name__, "__qualname__": name}
+    for field, type_name in fields:
+        if type_name not in FIELD_TYPES:
+            raise ValueError(f"Unknown field type '{type_name}' for {name}.{field}")
+        if not field.isidentifier() or field.startswith("_"):
+            raise ValueError(f"Invalid field name '{field}' for predicate {name}")
+        namespace[field] = FIELD_TYPES[type_name]
+    if not name.isidentifier():
+        raise ValueError(f"Invalid predicate name '{name}'")
+    return type(name, (Predicate,), namespace)
+
+
+def build_predicate(pred: Dict[str, Any]) -> type:
+    """Build (or reuse) the clorm `Predicate` subclass for one predicate spec.
+
+    Classes are memoized by `schema_fingerprint`, so a schema that has been
+    seen before costs a dictionary lookup and the same class object is
+    shared by every request that uses it.
+    """
+    fingerprint = schema_fingerprint(pred)
+    # The lock makes sure concurrent first uses of a schema share one class.
+    with _build_lock:
+        return _predicate_class(*fingerprint)
+
+
+def build_predicates(predicates: List[Dict[str, Any]]) -> Dict[str, type]:
+    """Build the predicate classes for one request.
+
+    The result is a fresh namespace owned by the caller, keyed by both the
+    class name and the ASP predicate name (e.g. "Task" and "task"), so
+    concurrent requests never see each other's classes.
+    """
+    namespace = {}
+    for pred in predicates:
+        cls = build_predicate(pred)
+        namespace[cls.__name__] = cls
+        namespace.setdefault(cls.meta.name, cls)
+    return namespace
+
+
+def clear_predicate_cache() -> None:
+    """Forget all memoized predicate classes."""
+    with _build_lock:
+        _predicate_class.cache_clear()
@@ -0,0 +1,232 @@
+"""Reusable problem templates: an encoding compiled once and re-solved with new facts."""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from typing import Dict, Any, Optional, List, Tuple
+from savanty.program_check import program_components_errors
+
+
+DEFAULT_TEMPLATE_DIR = os.path.join(os.path.expanduser("~"), ".local", "share", "savanty", "templates")
+
+# The parts of the program components that make up the encoding; facts are supplied per solve.
+TEMPLATE_KEYS = ("predicates", "constraints", "optimize")
+
+_TEMPLATE_ID_RE = re.compile(r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$")
+
+
+class TemplateNotFoundError(KeyError):
+    """Raised when a template id or version does not exist."""
+
+    def __str__(self):
+        return self.args[0] if self.args else "Template not found"
+
+
+def encoding_fingerprint(program_components: Dict[str, Any]) -> str:
+    """Hash the encoding part of program components (everything but the facts)."""
+    encoding = {key: program_components.get(key) for key in TEMPLATE_KEYS}
+    return hashlib.sha256(json.dumps(encoding, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def parse_template_ref(ref: str) -> Tuple[str, Optional[int]]:
+    """Split "id" or "id@version" into the id and an optional version number."""
+    template_id, _, version = ref.partition("@")
+    if version:
+        if not version.isdigit():
+            raise ValueError(f"Invalid template version '{version}'")
+        return template_id, int(version)
+    return template_id, None
+
+
+class ProblemTemplate:
+    """One saved version of a compiled encoding.
+
+    `program_components` holds the predicates, constraints and optimize
+    statement; `example_facts` keeps the facts the LLM extracted when the
+    template was compiled, for reference only.
+    """
+
+    def __init__(self, template_id: str, version: int, program_components: Dict[str, Any],
+                 description: str = "", example_facts: List[str] = None,
+                 created: Optional[float] = None):
+        self.id = template_id
+        self.version = version
+        self.program_components = {key: program_components[key] for key in TEMPLATE_KEYS}
+        self.description = description
+        self.example_facts = example_facts or []
+        self.created = created if created is not None else time.time()
+
+    @property
+    def fingerprint(self) -> str:
+        return encoding_fingerprint(self.program_components)
+
+    def problem_info(self, facts: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Return program components for `solve_program`, with `facts` as the instance."""
+        return dict(self.program_components, facts=list(facts or []))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "version": self.version,
+            "created": self.created,
+            "description": self.description,
+            "fingerprint": self.fingerprint,
+            "program_components": self.program_components,
+            "example_facts": self.example_facts,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProblemTemplate":
+        return cls(data["id"], data["version"], data["program_components"],
+                   description=data.get("description", ""),
+                   example_facts=data.get("example_facts"), created=data.get("created"))
+
+
+class TemplateStore:
+    """Directory of versioned templates, one JSON file per version.
+
+    Saving an encoding under an existing id adds a new version unless it is
+    identical to the latest one. Files are written atomically, so several
+    processes can share one directory.
+    """
+
+    def __init__(self, directory: str = DEFAULT_TEMPLATE_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _template_dir(self, template_id: str) -> str:
+        if not _TEMPLATE_ID_RE.match(template_id):
+            raise ValueError(f"Invalid template id '{template_id}'")
+        return os.path.join(self.directory, template_id)
+
+    def versions(self, template_id: str) -> List[int]:
+        """Return the saved versions of a template, oldest first."""
+        try:
+            names = os.listdir(self._template_dir(template_id))
+        except OSError:
+            return []
+        return sorted(int(name[1:-5]) for name in names
+                      if name.startswith("v") and name.endswith(".json") and name[1:-5].isdigit())
+
+    def save(self, program_components: Dict[str, Any], template_id: Optional[str] = None,
+             description: str = "") -> ProblemTemplate:
+        """Save an encoding as a new template version and return it.
+
+        Without `template_id` the id is derived from the encoding itself, so
+        saving the same encoding twice yields the same template.
+        """
+        errors = program_components_errors(dict(program_components, facts=program_components.get("facts", [])))
+        if errors:
+            raise ValueError("Invalid program components: " + "; ".join(errors))
+        template_id = template_id or encoding_fingerprint(program_components)[:12]
+        directory = self._template_dir(template_id)
+        with self._lock:
+            versions = self.versions(template_id)
+            if versions:
+                latest = self.get(template_id, versions[-1])
+                if latest.fingerprint == encoding_fingerprint(program_components):
+                    return latest
+            template = ProblemTemplate(template_id, (versions[-1] if versions else 0) + 1,
+                                       program_components, description=description,
+                                       example_facts=program_components.get("facts"))
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(template.to_dict(), f, indent=2)
+                # link() fails if another process saved this version first
+                os.link(tmp_path, os.path.join(directory, f"v{template.version}.json"))
+            except FileExistsError:
+                raise RuntimeError(f"Template '{template_id}' was modified concurrently, please retry")
+            finally:
+                os.remove(tmp_path)
+        return template
+
+    def get(self, template_id: str, version: Optional[int] = None) -> ProblemTemplate:
+        """Load a template version, the latest one by default."""
+        if version is None:
+            versions = self.versions(template_id)
+            if not versions:
+                raise TemplateNotFoundError(f"Template '{template_id}' not found")
+            version = versions[-1]
+        path = os.path.join(self._template_dir(template_id), f"v{version}.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return ProblemTemplate.from_dict(json.load(f))
+        except FileNotFoundError:
+            raise TemplateNotFoundError(f"Template '{template_id}' version {version} not found")
+
+    def save_result(self, template: ProblemTemplate, atoms: Dict[str, List[list]]) -> None:
+        """Keep `atoms` as the last solution of a template version, for later warm starts."""
+        directory = self._template_dir(template.id)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(atoms, f)
+            os.replace(tmp_path, os.path.join(directory, f"v{template.version}.last.json"))
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def last_result(self, template_id: str, version: Optional[int] = None) -> Optional[Dict[str, List[list]]]:
+        """Return the atoms of the last solution of a template version (the latest by default), if any."""
+        template = self.get(template_id, version)
+        path = os.path.join(self._template_dir(template_id), f"v{template.version}.last.json")
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Summarize every template: id, latest version and description."""
+        if not os.path.isdir(self.directory):
+            return []
+        summaries = []
+        for template_id in sorted(os.listdir(self.directory)):
+            if not _TEMPLATE_ID_RE.match(template_id) or not self.versions(template_id):
+                continue
+            template = self.get(template_id)
+            summaries.append({"id": template.id, "version": template.version,
+                              "description": template.description, "created": template.created})
+        return summaries
+
+    def delete(self, template_id: str) -> bool:
+        """Remove every version of a template. Returns True if it existed."""
+        versions = self.versions(template_id)
+        directory = self._template_dir(template_id)
+        for version in versions:
+            for name in (f"v{version}.json", f"v{version}.last.json"):
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+        try:
+            os.rmdir(directory)
+        except OSError:
+            pass
+        return bool(versions)
+
+
+_template_store: Optional[TemplateStore] = None
+_template_store_lock = threading.Lock()
+
+
+def get_template_store() -> TemplateStore:
+    """Return the process-wide template store, located by `SAVANTY_TEMPLATE_DIR`."""
+    global _template_store
+    with _template_store_lock:
+        if _template_store is None:
+            _template_store = TemplateStore(os.getenv("SAVANTY_TEMPLATE_DIR", DEFAULT_TEMPLATE_DIR))
+        return _template_store
+
+
+def reset_template_store() -> None:
+    """Forget the process-wide store so the next lookup re-reads the environment."""
+    global _template_store
+    with _template_store_lock:
+        _template_store = None
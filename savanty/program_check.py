@@ -0,0 +1,402 @@
+"""Static checks of generated program components, run before any grounding.
+
+Catches what would otherwise only surface once `Control` is set up and
+grounding has started, or never finish: malformed components, syntax
+errors, unsafe variables, predicates that are used but never defined, and
+encodings whose grounding would be far too large.
+"""
+
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from clingo import Control
+from clingo import ast
+from savanty.facts import asp_name
+
+
+DEFAULT_MAX_GROUND_SIZE = 50_000_000
+
+# Appended to every rule of the safety probe, so grounding checks the rules without instantiating them
+_NEVER = "__savanty_never"
+
+_UNSAFE_RE = re.compile(r"'([^']+)' is unsafe")
+
+Signature = Tuple[str, int]
+
+
+class GroundingTooLargeError(ValueError):
+    """Raised before grounding a program whose estimated size exceeds the limit."""
+
+
+@dataclass
+class ProgramCheck:
+    """Outcome of `check_program`: what is wrong, and the estimated grounding size."""
+
+    errors: List[str] = field(default_factory=list)
+    ground_size: int = 0
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+
+def program_components_errors(components: Any) -> List[str]:
+    """Check parsed program components against the structure the solver expects.
+
+    Returns a list of problems; an empty list means the components are usable.
+    """
+    if not isinstance(components, dict):
+        return ["program components must be a JSON object"]
+    errors = []
+    predicates = components.get("predicates")
+    if not isinstance(predicates, list):
+        errors.append("'predicates' must be a list")
+    else:
+        for i, pred in enumerate(predicates):
+            if not isinstance(pred, dict) or not isinstance(pred.get("name"), str):
+                errors.append(f"predicate {i} must have a string 'name'")
+            elif not isinstance(pred.get("fields"), dict):
+                errors.append(f"predicate {pred['name']} must have a 'fields' object")
+    for key in ("facts", "constraints"):
+        value = components.get(key)
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            errors.append(f"'{key}' must be a list of strings")
+    if not isinstance(components.get("optimize"), str):
+        errors.append("'optimize' must be a string")
+    return errors
+
+
+def max_ground_size() -> int:
+    """The grounding size limit, from `SAVANTY_MAX_GROUND_SIZE`; 0 turns the limit off."""
+    return int(os.getenv("SAVANTY_MAX_GROUND_SIZE", DEFAULT_MAX_GROUND_SIZE))
+
+
+def _statements(components: Dict[str, Any]) -> List[str]:
+    statements = [statement for statement in components["constraints"] if statement.strip()]
+    if components["optimize"].strip():
+        statements.append(components["optimize"])
+    return statements
+
+
+def _message(text: str) -> str:
+    # "<string>:1:5-7: error: syntax error, ..." -> "syntax error, ..."
+    return text.strip().splitlines()[0].split("error: ", 1)[-1]
+
+
+def parse_statement(statement: str) -> Tuple[List[ast.AST], List[str]]:
+    """Parse one ASP statement string with Clingo's parser and check its variables are safe.
+
+    Returns the parsed statements and a list of errors. Safety is checked by
+    grounding the statement with an extra body atom that is never true, so
+    nothing is instantiated however large the encoding is.
+    """
+    messages: List[str] = []
+    nodes: List[ast.AST] = []
+    try:
+        ast.parse_string(statement, nodes.append, logger=lambda code, text: messages.append(text))
+    except RuntimeError:
+        return [], [_message(text) for text in messages if "error" in text] or ["syntax error"]
+
+    ctrl = Control(logger=lambda code, text: messages.append(text))
+    with ast.ProgramBuilder(ctrl) as builder:
+        for node in nodes:
+            if node.ast_type in (ast.ASTType.Rule, ast.ASTType.Minimize, ast.ASTType.ShowTerm):
+                never = ast.Literal(node.location, ast.Sign.NoSign,
+                                    ast.SymbolicAtom(ast.Function(node.location, _NEVER, [], 0)))
+                node = node.update(body=list(node.body) + [never])
+            builder.add(node)
+    try:
+        ctrl.ground([("base", [])])
+    except RuntimeError:
+        unsafe = [name for text in messages for name in _UNSAFE_RE.findall(text)]
+        if unsafe:
+            return nodes, [f"unsafe variables {', '.join(dict.fromkeys(unsafe))}"]
+        return nodes, [_message(text) for text in messages if "error" in text] or ["grounding error"]
+    return nodes, []
+
+
+def fact_signature(fact: str) -> Signature:
+    """Return the (name, arity) of a fact such as "item(a,3)." without parsing it fully."""
+    fact = fact.strip().rstrip(".").strip()
+    name, paren, arguments = fact.partition("(")
+    if not paren:
+        return name.strip(), 0
+    arguments = arguments.rsplit(")", 1)[0]
+    if not arguments.strip():
+        return name.strip(), 0
+    if "(" not in arguments and '"' not in arguments:
+        return name.strip(), arguments.count(",") + 1
+    depth, arity, quoted = 0, 1, False
+    for char in arguments:
+        if quoted:
+            quoted = char != '"'
+        elif char == '"':
+            quoted = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            arity += 1
+    return name.strip(), arity
+
+
+def fact_counts(facts: Iterable[str]) -> Dict[Signature, int]:
+    """Count facts per (name, arity)."""
+    counts: Dict[Signature, int] = {}
+    for fact in facts:
+        name, paren, arguments = fact.partition("(")
+        if not paren:
+            signature = (name.strip().rstrip(".").strip(), 0)
+            if not signature[0]:
+                continue
+        elif "(" in arguments or '"' in arguments:
+            signature = fact_signature(fact)
+        else:
+            # The common flat case, e.g. "item(a,3,4).", without a full scan
+            signature = (name.strip(), arguments.count(",") + 1)
+        counts[signature] = counts.get(signature, 0) + 1
+    return counts
+
+
+def _children(node: ast.AST):
+    for key in node.child_keys:
+        value = getattr(node, key)
+        if isinstance(value, ast.AST):
+            yield value
+        elif value is not None:
+            yield from value
+
+
+def _atom_signatures(symbol: ast.AST) -> List[Signature]:
+    if symbol.ast_type == ast.ASTType.Pool:
+        return [signature for argument in symbol.arguments for signature in _atom_signatures(argument)]
+    if symbol.ast_type == ast.ASTType.UnaryOperation:
+        return [("-" + name, arity) for name, arity in _atom_signatures(symbol.argument)]
+    if symbol.ast_type == ast.ASTType.Function and symbol.name:
+        return [(symbol.name, len(symbol.arguments))]
+    return []
+
+
+def _variables(node: ast.AST) -> Set[str]:
+    if node.ast_type == ast.ASTType.Variable:
+        return set() if node.name == "_" else {node.name}
+    return set().union(*(_variables(child) for child in _children(node)))
+
+
+def _interval_size(node: ast.AST) -> int:
+    """How many values the intervals and pools in a term stand for, e.g. 3 for "color(1..3)"."""
+    if node.ast_type == ast.ASTType.Interval:
+        try:
+            return max(0, node.right.symbol.number - node.left.symbol.number + 1)
+        except (AttributeError, RuntimeError):
+            return 1
+    if node.ast_type == ast.ASTType.Pool:
+        return sum(_interval_size(argument) for argument in node.arguments)
+    size = 1
+    for child in _children(node):
+        size *= _interval_size(child)
+    return size
+
+
+def _collect(node: ast.AST, role: str, used: Set[Signature], defined: Set[Signature]) -> None:
+    """Sort the atoms under `node` into those it defines (heads) and those it uses (bodies, conditions)."""
+    if node.ast_type == ast.ASTType.SymbolicAtom:
+        (defined if role == "head" else used).update(_atom_signatures(node.symbol))
+        return
+    if node.ast_type == ast.ASTType.ConditionalLiteral:
+        _collect(node.literal, role, used, defined)
+        for literal in node.condition:
+            _collect(literal, "body", used, defined)
+        return
+    if node.ast_type == ast.ASTType.BodyAggregateElement:
+        for literal in node.condition:
+            _collect(literal, "body", used, defined)
+        return
+    for child in _children(node):
+        _collect(child, role, used, defined)
+
+
+def _atoms(literals: Iterable[ast.AST]) -> List[Tuple[Signature, Set[str], ast.AST]]:
+    """The positive atoms among `literals`, with their variables, for join estimates."""
+    atoms = []
+    for literal in literals:
+        if literal.ast_type != ast.ASTType.Literal or literal.sign != ast.Sign.NoSign:
+            continue
+        atom = literal.atom
+        if atom.ast_type == ast.ASTType.SymbolicAtom:
+            for signature in _atom_signatures(atom.symbol):
+                atoms.append((signature, _variables(atom.symbol), atom.symbol))
+        elif atom.ast_type == ast.ASTType.Comparison:
+            # "I = 1..N" binds I to N values
+            size = _interval_size(atom)
+            if size > 1:
+                atoms.append((("", size), _variables(atom), atom))
+    return atoms
+
+
+def _join_size(atoms, counts: Dict[Signature, int],
+               domains: Dict[str, int]) -> Tuple[int, Dict[str, int]]:
+    """Upper bound on the instances of a conjunction: join the atoms, smallest first.
+
+    `domains` estimates how many values each variable bound so far takes.
+    An atom that binds new variables multiplies the size by its instances
+    per binding of the variables it shares (its count divided by their
+    domains); atoms over bound variables only filter. Returns the size and
+    the domains of every variable bound by the join.
+    """
+    domains = dict(domains)
+    size = 1
+    for signature, variables, _ in sorted(atoms, key=lambda atom: _count(atom[0], counts)):
+        new = variables - set(domains)
+        if not new:
+            continue
+        shared = 1
+        for variable in variables & set(domains):
+            shared *= domains[variable]
+        factor = max(1, _count(signature, counts) // shared)
+        size *= factor
+        for variable in new:
+            domains[variable] = factor
+    return size, domains
+
+
+def _count(signature: Signature, counts: Dict[Signature, int]) -> int:
+    if signature[0] == "":
+        return signature[1]
+    return max(1, counts.get(signature, 0))
+
+
+def _statement_size(node: ast.AST, counts: Dict[Signature, int], derived: Dict[Signature, int]) -> int:
+    """Estimate how many ground instances a statement produces; head atoms are added to `derived`."""
+    if node.ast_type not in (ast.ASTType.Rule, ast.ASTType.Minimize):
+        return 0
+    body_size, domains = _join_size(_atoms(node.body), counts, {})
+    elements = 0
+    for literal in node.body:
+        for element in _elements(literal):
+            elements += _join_size(_atoms(element.condition), counts, domains)[0]
+    if node.ast_type == ast.ASTType.Minimize:
+        return body_size * max(1, elements)
+
+    head = node.head
+    if head.ast_type == ast.ASTType.Literal:
+        size = body_size * max(1, elements) * _interval_size(head)
+        if head.atom.ast_type == ast.ASTType.SymbolicAtom:
+            for signature in _atom_signatures(head.atom.symbol):
+                derived[signature] = derived.get(signature, 0) + size
+        return size
+    size = body_size * max(1, elements)
+    for element in _elements(head):
+        literal = element.literal if element.ast_type == ast.ASTType.ConditionalLiteral else element.condition.literal
+        condition = (element.condition if element.ast_type == ast.ASTType.ConditionalLiteral
+                     else element.condition.condition)
+        instances = body_size * _join_size(_atoms(condition), counts, domains)[0] * _interval_size(literal)
+        size += instances
+        if literal.atom.ast_type == ast.ASTType.SymbolicAtom:
+            for signature in _atom_signatures(literal.atom.symbol):
+                derived[signature] = derived.get(signature, 0) + instances
+    return size
+
+
+def _elements(node: ast.AST) -> List[ast.AST]:
+    """The elements of an aggregate or disjunction (or a conditional literal itself)."""
+    if node.ast_type == ast.ASTType.Literal:
+        node = node.atom
+    if node.ast_type == ast.ASTType.ConditionalLiteral:
+        return [node]
+    if node.ast_type in (ast.ASTType.Aggregate, ast.ASTType.BodyAggregate, ast.ASTType.HeadAggregate,
+                         ast.ASTType.Disjunction):
+        return list(node.elements)
+    return []
+
+
+def estimate_ground_size(nodes: List[ast.AST], counts: Dict[Signature, int]) -> int:
+    """Estimate the number of ground rules from the fact counts per predicate.
+
+    Each rule's body is bounded by joining its atoms (see `_join_size`) and
+    each aggregate or choice element by its own condition. Predicates
+    derived by rules are counted by a few passes over the program, so
+    recursive definitions are only roughly accounted for. The result is an
+    order-of-magnitude guide, not an exact count.
+    """
+    total = 0
+    derived: Dict[Signature, int] = {}
+    for _ in range(3):
+        known = dict(counts)
+        for signature, size in derived.items():
+            known[signature] = known.get(signature, 0) + size
+        derived = {}
+        total = sum(_statement_size(node, known, derived) for node in nodes)
+    return total + sum(counts.values())
+
+
+def check_program(components: Dict[str, Any], limit: Optional[int] = None) -> ProgramCheck:
+    """Check program components without grounding them.
+
+    Reports malformed components, statements that fail to parse or have
+    unsafe variables, atoms over predicates that are neither declared,
+    given as facts nor derived by any rule (or used with another arity), and
+    an estimated grounding size above `limit` (default `max_ground_size()`).
+    """
+    errors = program_components_errors(components)
+    if errors:
+        return ProgramCheck(errors)
+
+    declared: Dict[str, int] = {}
+    for pred in components["predicates"]:
+        declared[asp_name(pred["name"])] = len(pred["fields"])
+    counts = fact_counts(components["facts"])
+    defined: Set[Signature] = {(name, arity) for name, arity in declared.items()} | set(counts)
+    used: Set[Signature] = set()
+    nodes: List[ast.AST] = []
+    for statement in _statements(components):
+        statement_nodes, statement_errors = parse_statement(statement)
+        errors.extend(f"`{statement.strip()}`: {error}" for error in statement_errors)
+        nodes.extend(statement_nodes)
+        for node in statement_nodes:
+            if node.ast_type == ast.ASTType.Rule:
+                _collect(node.head, "head", used, defined)
+                for literal in node.body:
+                    _collect(literal, "body", used, defined)
+            elif node.ast_type == ast.ASTType.External:
+                _collect(node.atom, "head", used, defined)
+            else:
+                _collect(node, "body", used, defined)
+
+    names = {name: arity for name, arity in defined}
+    for name, arity in sorted(used - defined):
+        if name in names:
+            errors.append(f"{name}/{arity} is used but {name} is defined with arity {names[name]}")
+        else:
+            errors.append(f"{name}/{arity} is used but never declared, given as a fact or derived by a rule")
+
+    ground_size = estimate_ground_size(nodes, counts) if not errors else 0
+    limit = max_ground_size() if limit is None else limit
+    if limit and ground_size > limit:
+        errors.append(f"the estimated grounding size {ground_size:,} exceeds the limit of {limit:,}")
+    return ProgramCheck(errors, ground_size)
+
+
+def check_ground_size(problem_info: Dict[str, Any], limit: Optional[int] = None) -> int:
+    """Estimate the grounding size of `problem_info`, raising `GroundingTooLargeError` above `limit`.
+
+    Facts streamed from fact files are not counted. Statements that fail to
+    parse are skipped; grounding reports them.
+    """
+    limit = max_ground_size() if limit is None else limit
+    if not limit:
+        return 0
+    nodes: List[ast.AST] = []
+    for statement in _statements(problem_info):
+        try:
+            ast.parse_string(statement, nodes.append, logger=lambda code, text: None)
+        except RuntimeError:
+            continue
+    size = estimate_ground_size(nodes, fact_counts(problem_info["facts"]))
+    if size > limit:
+        raise GroundingTooLargeError(
+            f"Estimated grounding size {size:,} exceeds the limit of {limit:,} (SAVANTY_MAX_GROUND_SIZE)"
+        )
+    return size
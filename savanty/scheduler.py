@@ -0,0 +1,285 @@
+"""Admission control for LLM calls: per-model rate limits, concurrency caps and traffic priority.
+
+Every LLM stage call takes a slot from the scheduler of its model before it
+is sent. A slot is granted only while the model's request and token
+buckets have room for the call and fewer than `max_concurrency` calls are
+in flight, so a burst of requests waits its turn here instead of running
+into the provider's rate limits and retrying. Interactive calls are always
+admitted ahead of waiting batch calls; within a priority, calls are
+admitted in arrival order.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Any, List, Optional
+from savanty.metrics import get_metrics
+
+
+PRIORITIES = ("interactive", "batch")
+
+# Tokens reserved for a call's completion until its real usage is known
+DEFAULT_COMPLETION_TOKENS = 1000
+
+_priority: contextvars.ContextVar[str] = contextvars.ContextVar("savanty_traffic_priority", default="interactive")
+
+
+@contextmanager
+def traffic_priority(priority: str):
+    """Run the block's LLM calls at `priority` ("interactive" or "batch")."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority '{priority}', expected one of: {', '.join(PRIORITIES)}")
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> str:
+    return _priority.get()
+
+
+def estimate_tokens(inputs: Dict[str, Any], completion_tokens: int = DEFAULT_COMPLETION_TOKENS) -> int:
+    """A rough token count for a call: about four characters per prompt token, plus the completion."""
+    characters = sum(len(str(value)) for value in inputs.values() if value is not None)
+    # The prompt also carries the signature's instructions and field descriptions
+    return characters // 4 + 300 + completion_tokens
+
+
+class TokenBucket:
+    """Refills at `rate` units per second up to `capacity`; a rate of 0 never limits."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount: float, now: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)."""
+        if not self.rate:
+            return 0.0
+        self._refill(now)
+        # A call larger than the whole bucket waits for a full bucket rather than forever
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float) -> None:
+        if self.rate:
+            self.level -= min(amount, self.capacity)
+
+
+class _Waiter:
+    def __init__(self, priority: str, sequence: int, tokens: int):
+        self.key = (PRIORITIES.index(priority), sequence)
+        self.tokens = tokens
+        self.wake = None
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return self.key < other.key
+
+
+class ModelScheduler:
+    """Admits the LLM calls for one model; see the module docstring.
+
+    `requests_per_minute` and `tokens_per_minute` are the provider quota
+    (0 means unlimited) and `max_concurrency` caps the calls in flight.
+    """
+
+    def __init__(self, model: str, max_concurrency: int = 16, requests_per_minute: float = 0,
+                 tokens_per_minute: float = 0):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.requests = TokenBucket(requests_per_minute / 60, requests_per_minute / 60 * 10 or None)
+        self.tokens = TokenBucket(tokens_per_minute / 60, tokens_per_minute / 60 * 10 or None)
+        self.in_flight = 0
+        self.admitted = 0
+        self.throttled = 0
+        self._paused_until = 0.0
+        self._queue: List[_Waiter] = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._queue)
+
+    def _enqueue(self, priority: str, tokens: int) -> _Waiter:
+        waiter = _Waiter(priority, next(self._sequence), tokens)
+        with self._lock:
+            heapq.heappush(self._queue, waiter)
+        return waiter
+
+    def _try_admit(self, waiter: _Waiter) -> Optional[float]:
+        """Admit `waiter` if it is first in line and there is room; otherwise return how long to wait.
+
+        None means "until another call finishes".
+        """
+        with self._lock:
+            if self._queue[0] is not waiter or self.in_flight >= self.max_concurrency:
+                return None
+            now = time.monotonic()
+            delay = max(self._paused_until - now, self.requests.delay(1, now),
+                        self.tokens.delay(waiter.tokens, now))
+            if delay > 0:
+                return delay
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(waiter.tokens)
+            self.in_flight += 1
+            self.admitted += 1
+            waiters = list(self._queue)
+        # The next in line may be admissible now
+        self._notify(waiters)
+        return 0.0
+
+    def _leave(self, waiter: _Waiter) -> None:
+        """Drop a waiter that gave up (e.g. a cancelled task)."""
+        with self._lock:
+            if waiter in self._queue:
+                self._queue.remove(waiter)
+                heapq.heapify(self._queue)
+            waiters = list(self._queue)
+        self._notify(waiters)
+
+    def _release(self, reserved: int, used: Optional[int]) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if used is not None:
+                # Settle the estimate against the usage the provider reported
+                self.tokens.take(used - reserved)
+            waiters = list(self._queue)
+        self._notify(waiters)
+
+    def _notify(self, waiters: List[_Waiter]) -> None:
+        for waiter in waiters:
+            if waiter.wake is not None:
+                waiter.wake()
+
+    def throttle(self, seconds: float = 1.0) -> None:
+        """Back off after the provider answered 429, so queued calls do not pile on."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self.throttled += 1
+
+    @contextmanager
+    def slot(self, tokens: int, priority: Optional[str] = None):
+        """Hold an admission slot for one call from this thread.
+
+        The body may set `used` on the yielded object to the tokens the
+        call really used, which settles the estimate taken from the bucket.
+        """
+        waiter = self._enqueue(priority or current_priority(), tokens)
+        event = threading.Event()
+        waiter.wake = event.set
+        started = time.monotonic()
+        try:
+            while True:
+                event.clear()
+                delay = self._try_admit(waiter)
+                if delay == 0.0:
+                    break
+                event.wait(delay)
+        except BaseException:
+            self._leave(waiter)
+            raise
+        usage = _Usage()
+        self._observe_wait(waiter, time.monotonic() - started)
+        try:
+            yield usage
+        finally:
+            self._release(tokens, usage.used)
+
+    @asynccontextmanager
+    async def aslot(self, tokens: int, priority: Optional[str] = None):
+        """Like `slot`, for a coroutine: waiting does not block the event loop."""
+        waiter = self._enqueue(priority or current_priority(), tokens)
+        loop = asyncio.get_running_loop()
+        event = asyncio.Event()
+        waiter.wake = lambda: loop.call_soon_threadsafe(event.set)
+        started = time.monotonic()
+        try:
+            while True:
+                event.clear()
+                delay = self._try_admit(waiter)
+                if delay == 0.0:
+                    break
+                try:
+                    await asyncio.wait_for(event.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            self._leave(waiter)
+            raise
+        usage = _Usage()
+        self._observe_wait(waiter, time.monotonic() - started)
+        try:
+            yield usage
+        finally:
+            self._release(tokens, usage.used)
+
+    def _observe_wait(self, waiter: _Waiter, seconds: float) -> None:
+        get_metrics().observe("savanty_llm_queue_seconds", seconds, help="Time LLM calls waited for admission",
+                              model=self.model, priority=PRIORITIES[waiter.key[0]])
+
+    def stats(self) -> Dict[str, Any]:
+        return {"in_flight": self.in_flight, "waiting": self.waiting, "admitted": self.admitted,
+                "throttled": self.throttled}
+
+
+class _Usage:
+    used: Optional[int] = None
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value else default
+
+
+_schedulers: Dict[str, ModelScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(model: str) -> ModelScheduler:
+    """Return the process-wide scheduler for `model`.
+
+    Each model gets its own quota from `SAVANTY_LLM_RPM`, `SAVANTY_LLM_TPM`
+    (0, the default, means unlimited) and `SAVANTY_LLM_MAX_INFLIGHT` (16).
+    """
+    with _schedulers_lock:
+        if model not in _schedulers:
+            _schedulers[model] = ModelScheduler(
+                model,
+                max_concurrency=int(_env_float("SAVANTY_LLM_MAX_INFLIGHT", 16)),
+                requests_per_minute=_env_float("SAVANTY_LLM_RPM", 0),
+                tokens_per_minute=_env_float("SAVANTY_LLM_TPM", 0),
+            )
+        return _schedulers[model]
+
+
+def scheduler_stats() -> Dict[str, Dict[str, Any]]:
+    """Return {model: {"in_flight", "waiting", "admitted", "throttled"}} for every scheduler."""
+    with _schedulers_lock:
+        schedulers = list(_schedulers.values())
+    return {scheduler.model: scheduler.stats() for scheduler in schedulers}
+
+
+def reset_schedulers() -> None:
+    """Forget every scheduler; they are recreated from the environment on next use."""
+    with _schedulers_lock:
+        _schedulers.clear()
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    """Whether an LM call failed because the provider rate-limited it (HTTP 429)."""
+    return type(error).__name__ == "RateLimitError" or getattr(error, "status_code", None) == 429
@@ -0,0 +1,519 @@
+"""HTTP API for Savanty.
+
+Imported only when the web server runs (or by applications that mount the
+API), so command-line runs do not pay for FastAPI at startup.
+"""
+
+import asyncio
+import contextlib
+import json
+import os
+import threading
+import uuid
+from typing import Optional, Callable, Dict, Any, Union, List
+from fastapi import FastAPI, Form, HTTPException, Request
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from savanty.solver import (
+    validate_and_parse_problem,
+    solve_program,
+    solve_template,
+    template_warm_start,
+    compile_template,
+    result_from_error,
+    ProblemSolverResult,
+    SolverOptions,
+)
+from savanty.pool import PoolSaturatedError, RequestLimiter, get_pool, pool_stats
+from savanty.problem_templates import get_template_store, parse_template_ref
+from savanty.session import SolveSession
+from savanty.session_store import get_session_store
+from savanty.warm_start import previous_atoms
+from savanty.coalesce import coalesce_key, coalescing_enabled, coalescing_stats, get_single_flight
+from savanty.metrics import get_metrics, profiling
+from savanty.batch import parse_problem_stream, solve_batch
+from savanty.scheduler import scheduler_stats
+
+
+class SolverOptionsRequest(BaseModel):
+    time_limit: Optional[float] = None
+    conflict_limit: Optional[int] = None
+    threads: Optional[Union[int, str]] = None
+    parallel_mode: Optional[str] = None
+    opt_strategy: Optional[str] = None
+    configuration: Optional[str] = None
+
+    def solver_options(self) -> SolverOptions:
+        return SolverOptions(
+            time_limit=self.time_limit,
+            conflict_limit=self.conflict_limit,
+            threads=self.threads,
+            parallel_mode=self.parallel_mode,
+            opt_strategy=self.opt_strategy,
+            configuration=self.configuration,
+        )
+
+
+class SolveRequest(SolverOptionsRequest):
+    problem_description: str = ""
+    additional_info: str = ""
+    session_id: Optional[str] = None
+    facts: List[str] = []
+    profile: bool = False
+
+
+class TemplateRequest(BaseModel):
+    problem_description: str
+    additional_info: str = ""
+    template_id: Optional[str] = None
+
+
+class TemplateSolveRequest(SolverOptionsRequest):
+    facts: List[str] = []
+    version: Optional[int] = None
+    # A previous result (or its atoms), or a session or template whose last solution to start from
+    warm_start: Optional[Dict[str, Any]] = None
+    warm_start_session: Optional[str] = None
+    warm_start_template: Optional[str] = None
+
+
+async def solve_async(problem_description: str, additional_info: str = "",
+                      options: Optional[SolverOptions] = None,
+                      on_model: Optional[Callable[[Dict[str, Any]], None]] = None,
+                      stop: Optional[threading.Event] = None) -> ProblemSolverResult:
+    """Run `solve_optimization_problem` without blocking the event loop.
+
+    The LLM stages run on the "llm" thread pool and the Clingo stage on the
+    "solve" pool (threads or processes, see `savanty.pool.get_pool`). Solves
+    that report improving models through `on_model` use the "stream" thread
+    pool, since the callback cannot cross a process boundary. Setting `stop`
+    ends the search early with the best model so far; like `on_model`, it
+    needs a thread pool, so it is only honoured together with `on_model`.
+    """
+    try:
+        problem_info = await get_pool("llm").run(
+            validate_and_parse_problem, problem_description, additional_info
+        )
+    except PoolSaturatedError:
+        raise
+    except Exception as e:
+        return result_from_error(e)
+    pool = get_pool("stream" if on_model is not None else "solve")
+    if options is not None:
+        # Resolve "auto" here: a process worker cannot see this pool's load
+        options = options.with_resolved_threads(pool.pending + 1)
+    try:
+        if on_model is not None:
+            return await pool.run(solve_program, problem_info, options=options, on_model=on_model, stop=stop)
+        return await pool.run(solve_program, problem_info, options=options)
+    except PoolSaturatedError:
+        raise
+    except Exception as e:
+        # e.g. an isolated worker killed for overrunning its limits
+        return result_from_error(e)
+
+
+async def solve_session_async(session: SolveSession, additional_info: str = "",
+                              facts: Optional[List[str]] = None,
+                              options: Optional[SolverOptions] = None) -> ProblemSolverResult:
+    """Run one turn of a session without blocking the event loop.
+
+    Like `solve_async`, but the LLM stages continue from the session's
+    earlier turns. The solve itself runs `solve_program` on the "solve" pool,
+    so sessions work with process pools and across server processes.
+    The result carries the turn's profile.
+    """
+    with profiling() as profile:
+        result = await _solve_session_turn(session, additional_info, facts, options)
+        # A worker process returns its own profile; thread workers filled ours
+        if result.profile:
+            profile.merge(result.profile)
+    result.profile = profile.to_dict()
+    return result
+
+
+async def _solve_session_turn(session: SolveSession, additional_info: str,
+                              facts: Optional[List[str]],
+                              options: Optional[SolverOptions]) -> ProblemSolverResult:
+    # The session's own lock covers the bookkeeping; it is taken off the event
+    # loop, since another turn may hold it while its LLM stages run
+    try:
+        problem_info = await get_pool("llm").run(session.start_turn, additional_info, facts)
+    except PoolSaturatedError:
+        raise
+    except Exception as e:
+        return result_from_error(e)
+    if problem_info is None:
+        return ProblemSolverResult(needs_more_info=True, questions=session.questions)
+    # New facts mean a fresh grounding, as in `SolveSession.solve`: start it from the last solution
+    previous = session.last_result
+    warm_start = previous.atoms if facts and previous is not None and previous.atoms else None
+    pool = get_pool("solve")
+    if options is not None:
+        options = options.with_resolved_threads(pool.pending + 1)
+    try:
+        result = await pool.run(solve_program, problem_info, options=options, warm_start=warm_start)
+    except PoolSaturatedError:
+        raise
+    except Exception as e:
+        result = result_from_error(e)
+    await asyncio.to_thread(session.finish_turn, result)
+    return result
+
+
+def _solve_response(result: ProblemSolverResult, session_id: Optional[str] = None,
+                    profile: bool = False) -> Dict[str, Any]:
+    """Build the JSON body for a solve result, raising HTTPException on errors."""
+    if result.needs_more_info:
+        body = {
+            "needs_more_info": True,
+            "questions": result.questions,
+            "log": "Please provide more information to solve this problem."
+        }
+    elif result.error:
+        raise HTTPException(status_code=400, detail={
+            "error": result.error,
+            "session_id": session_id,
+            "log": f"Error occurred while solving: {result.error}"
+        })
+    else:
+        body = {
+            "solution": result.solution,
+            "atoms": result.atoms,
+            "cost": result.cost,
+            "optimal": result.optimal,
+            "models": result.models,
+            "log": "Problem solved successfully."
+        }
+        if result.warm_start:
+            body["warm_start"] = result.warm_start
+    if session_id is not None:
+        body["session_id"] = session_id
+    if profile:
+        body["profile"] = result.profile
+    return body
+
+
+class _DuplexStreamingResponse(StreamingResponse):
+    """A StreamingResponse that starts while the endpoint is still reading the request body.
+
+    Starlette's version listens on `receive` for a disconnect while it
+    streams, which would swallow the body chunks the endpoint is waiting for.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await self.stream_response(send)
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def create_app(max_concurrency: Optional[int] = None, max_queue: Optional[int] = None, mcp_app=None):
+    """Create and configure the FastAPI application.
+
+    `max_concurrency` caps the requests solved at once by this process and
+    `max_queue` the number allowed to wait for a slot; further requests are
+    rejected with 429. They default to `SAVANTY_MAX_CONCURRENCY` (32) and
+    `SAVANTY_MAX_QUEUE` (64). A FastMCP server (see
+    `savanty.mcp_server.create_mcp_app`) passed as `mcp_app` is served at
+    /mcp over streamable HTTP.
+    """
+    mcp_http = mcp_app.http_app(path="/") if mcp_app is not None else None
+    app = FastAPI(title="Savanty API", version="0.2.0", lifespan=mcp_http.lifespan if mcp_http else None)
+    if mcp_http is not None:
+        app.mount("/mcp", mcp_http)
+    limiter = RequestLimiter(
+        max_concurrency=max_concurrency or int(os.getenv("SAVANTY_MAX_CONCURRENCY", 32)),
+        max_queue=max_queue if max_queue is not None else int(os.getenv("SAVANTY_MAX_QUEUE", 64)),
+    )
+
+    @app.exception_handler(PoolSaturatedError)
+    async def pool_saturated(request, exc: PoolSaturatedError):
+        return JSONResponse(
+            status_code=exc.status_code,
+            content={"detail": {"error": str(exc), "log": "Server is busy, please retry later."}},
+            headers={"Retry-After": str(exc.retry_after)},
+        )
+
+    @app.get("/", response_class=HTMLResponse)
+    async def index():
+        """Render the main dashboard page."""
+        return """
+        <html>
+            <head>
+                <title>Savanty - Optimization Problem Solver</title>
+            </head>
+            <body>
+                <h1>Savanty - Optimization Problem Solver</h1>
+                <form action="/solve" method="post">
+                    <label for="problem_description">Problem Description:</label><br>
+                    <textarea id="problem_description" name="problem_description" rows="4" cols="50"></textarea><br>
+                    <label for="additional_info">Additional Information (optional):</label><br>
+                    <textarea id="additional_info" name="additional_info" rows="2" cols="50"></textarea><br>
+                    <input type="submit" value="Solve">
+                </form>
+            </body>
+        </html>
+        """
+
+    @app.post("/solve")
+    async def solve(request: SolveRequest):
+        """Solve an optimization problem.
+
+        Every response carries a `session_id`. Sending it back with the
+        answers in `additional_info` (or extra `facts`) continues the same
+        conversation without re-running the stages already done.
+
+        Identical requests arriving while one is being solved wait for it and
+        share its result instead of solving again; each new conversation
+        still gets its own session id.
+        """
+        store = get_session_store()
+        try:
+            if request.session_id:
+                session = store.get(request.session_id)
+                if session is None:
+                    raise HTTPException(status_code=404, detail={
+                        "error": f"Session '{request.session_id}' not found or expired",
+                        "log": "Please start again with the full problem description."
+                    })
+            elif request.problem_description:
+                session = None
+            else:
+                raise HTTPException(status_code=400, detail={
+                    "error": "Either problem_description or session_id is required",
+                    "log": "Nothing to solve."
+                })
+            options = request.solver_options()
+            
+            async def run_turn():
+                turn_session = session or SolveSession(request.problem_description)
+                async with limiter.slot():
+                    result = await solve_session_async(
+                        turn_session, request.additional_info, facts=request.facts, options=options
+                    )
+                return result, turn_session.to_state()
+            
+            if coalescing_enabled():
+                key = coalesce_key("turn", request.session_id, request.problem_description,
+                                   request.additional_info, request.facts, options.to_dict())
+                result, state = await get_single_flight("http").do_async(key, run_turn)
+            else:
+                result, state = await run_turn()
+            session = SolveSession.from_state(state, session_id=None if request.session_id else uuid.uuid4().hex)
+            if result.error and session.program_components is None:
+                # Nothing worth continuing from
+                return _solve_response(result)
+            store.put(session)
+            return _solve_response(result, session.id, profile=request.profile)
+        except (HTTPException, PoolSaturatedError):
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=400, detail={
+                "error": str(e),
+                "log": f"Error occurred while solving: {str(e)}"
+            })
+
+    @app.post("/solve/stream")
+    async def solve_stream(request: SolveRequest):
+        """Solve an optimization problem, streaming improving models as server-sent events.
+
+        Emits a `model` event with the cost and atoms of each improving model
+        and ends with a `result` event carrying the final result.
+        """
+        try:
+            if request.session_id or not request.problem_description:
+                raise ValueError("/solve/stream takes a problem_description; sessions are continued through /solve")
+            options = request.solver_options()
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail={
+                "error": str(e),
+                "log": f"Invalid request: {str(e)}"
+            })
+        
+        # Take the request slot up front so a full server answers 429 before streaming starts
+        slot = contextlib.AsyncExitStack()
+        await slot.enter_async_context(limiter.slot())
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stop = threading.Event()
+        
+        def publish(model_info: Dict[str, Any]):
+            loop.call_soon_threadsafe(queue.put_nowait, ("model", model_info))
+        
+        async def run():
+            async with slot:
+                try:
+                    result = await solve_async(
+                        request.problem_description, request.additional_info,
+                        options=options, on_model=publish, stop=stop
+                    )
+                    await queue.put(("result", result.to_dict()))
+                except Exception as e:
+                    await queue.put(("result", ProblemSolverResult(error=str(e)).to_dict()))
+        
+        # Start solving right away so the slot is released even if the client never reads
+        task = asyncio.ensure_future(run())
+        
+        async def events():
+            finished = False
+            try:
+                while True:
+                    event, data = await queue.get()
+                    yield _sse(event, data)
+                    if event == "result":
+                        finished = True
+                        break
+                await task
+            finally:
+                if not finished:
+                    # The client went away: end the search and free the worker and the slot
+                    stop.set()
+        
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/solve/batch")
+    async def solve_batch_endpoint(request: Request, concurrency: int = 8, skip: str = ""):
+        """Solve a JSONL body of problems, streaming one JSON result per line in completion order.
+
+        The body is read as it arrives and at most `concurrency` problems are
+        solved at once, each under its own request slot. `skip` is a
+        comma-separated list of ids to pass over, e.g. the ids a client
+        already holds from an interrupted batch.
+        """
+        if concurrency < 1:
+            raise HTTPException(status_code=400, detail={"error": "concurrency must be at least 1"})
+        skipped = [problem_id for problem_id in skip.split(",") if problem_id]
+        
+        async def results():
+            async for record in solve_batch(parse_problem_stream(request.stream()), concurrency=concurrency,
+                                            skip=skipped, slot=limiter.slot):
+                yield json.dumps(record, default=str) + "\n"
+        
+        return _DuplexStreamingResponse(results(), media_type="application/x-ndjson")
+
+    @app.get("/metrics")
+    async def metrics():
+        """Stage latency histograms, token counters, Clingo statistics, pool and LLM scheduler load in Prometheus format."""
+        pools = pool_stats()
+        coalescing = coalescing_stats()
+        schedulers = scheduler_stats()
+        text = get_metrics().render(
+            gauges={
+                "savanty_pool_pending": [({"pool": name}, stats["pending"]) for name, stats in pools.items()],
+                "savanty_pool_workers": [({"pool": name}, stats["max_workers"]) for name, stats in pools.items()],
+                "savanty_requests_active": [({}, limiter.active)],
+                "savanty_requests_waiting": [({}, limiter.waiting)],
+                "savanty_llm_in_flight": [({"model": model}, stats["in_flight"]) for model, stats in schedulers.items()],
+                "savanty_llm_waiting": [({"model": model}, stats["waiting"]) for model, stats in schedulers.items()],
+            },
+            counters={
+                "savanty_coalesce_calls_total": [({"group": name}, stats["calls"]) for name, stats in coalescing.items()],
+                "savanty_coalesced_total": [({"group": name}, stats["coalesced"]) for name, stats in coalescing.items()],
+                "savanty_llm_throttled_total": [({"model": model}, stats["throttled"]) for model, stats in schedulers.items()],
+            },
+        )
+        return PlainTextResponse(text, media_type="text/plain; version=0.0.4")
+
+    @app.get("/stats")
+    async def stats():
+        """Report how many solve requests were coalesced with identical in-flight ones."""
+        return {"coalescing": coalescing_stats()}
+
+    @app.get("/sessions/{session_id}")
+    async def get_session(session_id: str):
+        """Return the saved state of a session: questions, stage outputs and program."""
+        session = get_session_store().get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail={"error": f"Session '{session_id}' not found or expired"})
+        return session.to_state()
+
+    @app.delete("/sessions/{session_id}")
+    async def delete_session(session_id: str):
+        """Forget a session."""
+        if not get_session_store().delete(session_id):
+            raise HTTPException(status_code=404, detail={"error": f"Session '{session_id}' not found or expired"})
+        return {"deleted": session_id}
+
+    @app.post("/templates")
+    async def create_template(request: TemplateRequest):
+        """Compile a problem once with the LLM and save its encoding as a template."""
+        try:
+            async with limiter.slot():
+                template = await get_pool("llm").run(
+                    compile_template, request.problem_description, request.additional_info,
+                    request.template_id
+                )
+        except PoolSaturatedError:
+            raise
+        except Exception as e:
+            result = result_from_error(e)
+            if result.needs_more_info:
+                return _solve_response(result)
+            raise HTTPException(status_code=400, detail={
+                "error": result.error,
+                "log": f"Error occurred while compiling: {result.error}"
+            })
+        return template.to_dict()
+
+    @app.get("/templates")
+    async def list_templates():
+        """List saved templates with their latest version."""
+        return {"templates": get_template_store().list()}
+
+    @app.get("/templates/{template_id}")
+    async def get_template(template_id: str, version: Optional[int] = None):
+        """Return a saved template, the latest version unless `version` is given."""
+        try:
+            ref_id, ref_version = parse_template_ref(template_id)
+            return get_template_store().get(ref_id, version or ref_version).to_dict()
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail={"error": str(e)})
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail={"error": str(e)})
+
+    @app.post("/templates/{template_id}/solve")
+    async def solve_with_template(template_id: str, request: TemplateSolveRequest):
+        """Solve a saved template with new facts; no LLM call is made."""
+        try:
+            options = request.solver_options()
+            ref_id, ref_version = parse_template_ref(template_id)
+            template = get_template_store().get(ref_id, request.version or ref_version)
+            previous = request.warm_start
+            if request.warm_start_session:
+                session = get_session_store().get(request.warm_start_session)
+                if session is None:
+                    raise KeyError(f"Session '{request.warm_start_session}' not found or expired")
+                if session.last_result is None or not session.last_result.atoms:
+                    raise ValueError(f"Session '{request.warm_start_session}' has no solution to start from")
+                previous = session.last_result.atoms
+            elif request.warm_start_template:
+                previous = template_warm_start(request.warm_start_template)
+            warm_start = previous_atoms(previous)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail={"error": str(e)})
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail={"error": str(e)})
+        
+        async def run_solve():
+            async with limiter.slot():
+                pool = get_pool("solve")
+                try:
+                    return await pool.run(solve_template, template, request.facts,
+                                          options=options.with_resolved_threads(pool.pending + 1),
+                                          warm_start=warm_start)
+                except PoolSaturatedError:
+                    raise
+                except Exception as e:
+                    return result_from_error(e)
+        
+        if coalescing_enabled():
+            key = coalesce_key("template", template.id, template.version, request.facts, options.to_dict(),
+                               warm_start)
+            result = await get_single_flight("http").do_async(key, run_solve)
+        else:
+            result = await run_solve()
+        return _solve_response(result)
+
+    return app
@@ -0,0 +1,289 @@
+"""Multi-turn solving sessions that keep LLM and grounding work between turns."""
+
+import json
+import threading
+import time
+import uuid
+from typing import Dict, Any, Optional, List, Callable
+from savanty.cache import get_program_cache
+from savanty.facts import normalize_fact
+from savanty.solver import (
+    ProblemSolverResult,
+    SolverOptions,
+    build_control,
+    program_cache_key,
+    result_from_error,
+    run_pipeline,
+    search,
+)
+from savanty.pool import get_pool
+from savanty.metrics import profiling, span
+from savanty.warm_start import WarmStart
+
+
+def _is_integrity_constraint(statement: str) -> bool:
+    return statement.strip().startswith(":-")
+
+
+def _json_value(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float, bool, list, dict)):
+        return value
+    return str(value)
+
+
+def prediction_stages(prediction) -> Dict[str, Dict[str, Any]]:
+    """Extract the outputs of each stage in a pipeline prediction as plain data."""
+    stages = {}
+    for name in ("validation", "gap_check", "analysis"):
+        stage = prediction.get(name) if hasattr(prediction, "get") else getattr(prediction, name, None)
+        if stage is not None and hasattr(stage, "items"):
+            stages[name] = {key: _json_value(value) for key, value in stage.items()}
+    return stages
+
+
+class SolveSession:
+    """A problem solved over several turns, e.g. while answering gap questions.
+
+    The session keeps what earlier turns produced so later ones only pay for
+    the difference:
+
+    * LLM stages: each answer is refined into the description refined so far
+      (earlier answers are not re-processed), the predictions of the last
+      turn are kept in `prediction`, and turns that only add facts or
+      constraints make no LLM call at all.
+    * Clingo: the grounded `Control` stays alive between turns. Integrity
+      constraints added later (by `add_constraints` or by a regenerated
+      program that only adds constraints) are grounded in their own
+      `#program` part and the next solve reuses everything else; turns that
+      change nothing re-solve without grounding. New facts or a changed
+      encoding need a fresh grounding, because Clingo never re-instantiates
+      rules grounded in earlier steps; that solve is warm-started from the
+      last solution (see `savanty.warm_start`).
+
+    Calls on one session are serialized by a lock.
+    """
+
+    def __init__(self, problem_description: str, pipeline: Optional[str] = None,
+                 speculative: Optional[bool] = None, session_id: Optional[str] = None):
+        self.id = session_id or uuid.uuid4().hex
+        self.problem_description = problem_description
+        self.refined_description = problem_description
+        self.additional_info: List[str] = []
+        self.pipeline = pipeline
+        self.speculative = speculative
+        self.prediction = None
+        self.stages: Dict[str, Dict[str, Any]] = {}
+        self.questions: List[str] = []
+        self.program_components: Optional[Dict[str, Any]] = None
+        self.facts: List[str] = []
+        self.data_facts: List[str] = []
+        self.constraints: List[str] = []
+        self.fact_files: List[str] = []
+        self.last_result: Optional[ProblemSolverResult] = None
+        self.turns = 0
+        self.groundings = 0
+        self._ctrl = None
+        self._ctrl_key = None
+        self._grounded_constraints: List[str] = []
+        self._parts = 0
+        self._lock = threading.RLock()
+
+    @property
+    def problem_info(self) -> Optional[Dict[str, Any]]:
+        """Program components including the facts and constraints added in later turns."""
+        if self.program_components is None:
+            return None
+        components = dict(self.program_components)
+        components["facts"] = list(components["facts"]) + self.facts
+        components["constraints"] = list(components["constraints"]) + self.constraints
+        return components
+
+    def add_facts(self, facts: List[str]) -> None:
+        """Add instance facts for the next solve; no LLM call is made."""
+        with self._lock:
+            self.facts.extend(normalize_fact(fact) for fact in facts if fact.strip())
+
+    def add_constraints(self, constraints: List[str]) -> None:
+        """Add ASP statements for the next solve; no LLM call is made."""
+        with self._lock:
+            self.constraints.extend(constraint.strip() for constraint in constraints if constraint.strip())
+
+    def add_fact_files(self, fact_files: List[str]) -> None:
+        with self._lock:
+            self.fact_files.extend(path for path in fact_files if path not in self.fact_files)
+
+    def compile(self, additional_info: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Bring the program components up to date with `additional_info`.
+
+        Returns the components, or None when the LLM asked for more
+        information (see `questions`). Raises ValueError like
+        `validate_and_parse_problem`.
+        """
+        with self._lock:
+            if additional_info:
+                self.additional_info.append(additional_info)
+            elif self.program_components is not None:
+                return self.program_components
+
+            cache = get_program_cache()
+            cache_key = program_cache_key(self.problem_description, "\n".join(self.additional_info),
+                                          self.pipeline)
+            components = cache.get(cache_key) if cache is not None else None
+            if components is None:
+                with span("pipeline"):
+                    prediction = run_pipeline(self.refined_description, additional_info,
+                                              speculative=self.speculative, pipeline=self.pipeline,
+                                              data_facts=self.data_facts)
+                self.prediction = prediction
+                # The refined description only summarizes extracted data, so keep the rows
+                self.data_facts = list(getattr(prediction, "data_facts", None) or self.data_facts)
+                self.stages.update(prediction_stages(prediction))
+                refined = getattr(prediction, "problem_description", None)
+                if not refined and additional_info:
+                    refined = f"{self.refined_description}\n{additional_info}"
+                self.refined_description = refined or self.refined_description
+                if prediction.needs_more_info:
+                    self.questions = list(prediction.questions)
+                    return None
+                components = prediction.components
+                if cache is not None:
+                    cache.set(cache_key, components)
+
+            self.questions = []
+            self.program_components = components
+            return components
+
+    def _encoding_key(self, arguments: List[str]) -> tuple:
+        """Everything that, when changed, needs a fresh grounding (all but added constraints)."""
+        info = self.problem_info
+        return (json.dumps([info["predicates"], info["facts"], info["optimize"]], sort_keys=True),
+                tuple(self.fact_files), tuple(arguments))
+
+    def _drop_control(self) -> None:
+        self._ctrl = None
+        self._ctrl_key = None
+        self._grounded_constraints = []
+
+    def _prepare_control(self, options: SolverOptions):
+        """Return a control object with everything grounded, reusing the live one if possible."""
+        key = self._encoding_key(options.clingo_arguments())
+        constraints = self.problem_info["constraints"]
+        grounded = set(self._grounded_constraints)
+        if self._ctrl is not None:
+            added = [constraint for constraint in dict.fromkeys(constraints) if constraint not in grounded]
+            # Only integrity constraints can be grounded on top: rules with
+            # heads could redefine atoms that are already grounded.
+            if (key != self._ctrl_key or not grounded <= set(constraints)
+                    or not all(map(_is_integrity_constraint, added))):
+                self._drop_control()
+            elif added:
+                self._parts += 1
+                part = f"turn_{self._parts}"
+                self._ctrl.add(part, [], "\n".join(added))
+                self._ctrl.ground([(part, [])])
+                self._grounded_constraints = list(constraints)
+        if self._ctrl is None:
+            self._ctrl = build_control(self.problem_info, fact_files=self.fact_files, options=options)
+            self._ctrl_key = key
+            self._grounded_constraints = list(constraints)
+            self.groundings += 1
+        return self._ctrl
+
+    def start_turn(self, additional_info: Optional[str] = None, facts: Optional[List[str]] = None,
+                   fact_files: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """Count a turn, apply its information and data, and return the program to solve.
+
+        For turns solved outside the session, e.g. by `solve_program` on a
+        worker pool; report their result with `finish_turn`. Returns None
+        when the LLM asked for more information and raises like `compile`.
+        """
+        with self._lock:
+            self.turns += 1
+            if facts:
+                self.add_facts(facts)
+            if fact_files:
+                self.add_fact_files(fact_files)
+            if self.compile(additional_info) is None:
+                return None
+            return self.problem_info
+
+    def finish_turn(self, result: ProblemSolverResult) -> None:
+        """Record the result of a turn started with `start_turn`."""
+        with self._lock:
+            self.last_result = result
+
+    def solve(self, additional_info: Optional[str] = None, facts: Optional[List[str]] = None,
+              fact_files: Optional[List[str]] = None,
+              options: Optional[SolverOptions] = None,
+              on_model: Optional[Callable[[Dict[str, Any]], None]] = None) -> ProblemSolverResult:
+        """Run one turn: apply new information and data, then solve.
+
+        Arguments are as for `solve_optimization_problem`; `facts` are extra
+        ASP facts. Returns a needs-more-info result when the LLM asks
+        questions, which are answered by calling `solve` again.
+        """
+        with profiling() as profile:
+            result = self._solve(additional_info, facts, fact_files, options, on_model)
+        result.profile = profile.to_dict()
+        return result
+
+    def _solve(self, additional_info, facts, fact_files, options, on_model) -> ProblemSolverResult:
+        options = options or SolverOptions()
+        with self._lock:
+            try:
+                if self.start_turn(additional_info, facts, fact_files) is None:
+                    return ProblemSolverResult(needs_more_info=True, questions=self.questions)
+            except Exception as e:
+                return result_from_error(e)
+
+            started = time.monotonic()
+            try:
+                if options.threads == "auto":
+                    options = options.with_resolved_threads(get_pool("solve").pending)
+                groundings = self.groundings
+                ctrl = self._prepare_control(options)
+                warm_start = None
+                if self.groundings != groundings and self.last_result is not None and self.last_result.atoms:
+                    # A fresh grounding lost the solver's state: start again from the last solution
+                    warm_start = WarmStart(self.last_result.atoms)
+                    warm_start.prepare(ctrl)
+                result = search(ctrl, options, on_model=on_model, started=started, warm_start=warm_start)
+            except Exception as e:
+                # The control object may be half-updated; rebuild it next time
+                self._drop_control()
+                return result_from_error(e)
+            self.last_result = result
+            return result
+
+    # Fields saved by `to_state`; the live Control and the raw prediction are not.
+    _STATE_FIELDS = ("problem_description", "refined_description", "additional_info", "pipeline",
+                     "speculative", "stages", "questions", "program_components", "facts",
+                     "data_facts", "constraints", "fact_files", "turns")
+
+    def to_state(self) -> Dict[str, Any]:
+        """Return the session as JSON-serializable data, e.g. for a session store."""
+        with self._lock:
+            state = {"id": self.id}
+            for name in self._STATE_FIELDS:
+                state[name] = getattr(self, name)
+            state["last_result"] = self.last_result.to_dict() if self.last_result else None
+            return json.loads(json.dumps(state))
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], session_id: Optional[str] = None) -> "SolveSession":
+        """Rebuild a session from `to_state` data; its program is grounded again on first solve.
+
+        With `session_id` the copy gets a new identity instead of the saved one.
+        """
+        session = cls(state["problem_description"], session_id=session_id or state["id"])
+        for name in cls._STATE_FIELDS:
+            if name in state:
+                setattr(session, name, state[name])
+        if state.get("last_result"):
+            session.last_result = ProblemSolverResult(**state["last_result"])
+        return session
+
+    def close(self) -> None:
+        """Release the grounded program."""
+        with self._lock:
+            self._drop_control()
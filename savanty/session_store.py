@@ -0,0 +1,189 @@
+"""Stores that keep solve sessions between HTTP requests."""
+
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from savanty.session import SolveSession
+
+
+DEFAULT_SESSION_DB = os.path.join(os.path.expanduser("~"), ".cache", "savanty", "sessions.db")
+DEFAULT_SESSION_TTL = 3600
+DEFAULT_MAX_SESSIONS = 1000
+
+
+class SessionStore(abc.ABC):
+    """Base class for session stores.
+
+    Sessions are saved as `SolveSession.to_state` data, so a session saved by
+    one process can be continued by another sharing the same backend.
+    Subclasses implement `_load`, `_save` and `delete`. Concurrent turns on
+    the same session are not merged; the last one saved wins.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_SESSION_TTL):
+        self.ttl = ttl
+
+    def get(self, session_id: str) -> Optional[SolveSession]:
+        """Return the session, or None if it does not exist or has expired."""
+        state = self._load(session_id)
+        return SolveSession.from_state(state) if state is not None else None
+
+    def put(self, session: SolveSession) -> None:
+        self._save(session.id, session.to_state())
+
+    def _expired(self, updated: float) -> bool:
+        return bool(self.ttl) and time.time() - updated > self.ttl
+
+    @abc.abstractmethod
+    def _load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return the saved state, or None if it does not exist or has expired."""
+
+    @abc.abstractmethod
+    def _save(self, session_id: str, state: Dict[str, Any]) -> None:
+        """Save the state, replacing any earlier one."""
+
+    @abc.abstractmethod
+    def delete(self, session_id: str) -> bool:
+        """Forget a session; returns whether it existed."""
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU store, holding at most `max_sessions` sessions."""
+
+    def __init__(self, max_sessions: int = DEFAULT_MAX_SESSIONS, ttl: float = DEFAULT_SESSION_TTL):
+        super().__init__(ttl)
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def _load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            updated, state = entry
+            if self._expired(updated):
+                del self._sessions[session_id]
+                return None
+            self._sessions.move_to_end(session_id)
+            # Stored as text so callers never share mutable state
+            return json.loads(state)
+
+    def _save(self, session_id: str, state: Dict[str, Any]) -> None:
+        with self._lock:
+            self._sessions[session_id] = (time.time(), json.dumps(state))
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+
+class SQLiteSessionStore(SessionStore):
+    """Store backed by an SQLite file, shared by every process that opens it.
+
+    Several uvicorn workers (or hosts sharing a file system) can point at
+    the same file to continue each other's conversations. Expired sessions
+    are purged from time to time as new ones are saved.
+    """
+
+    PURGE_EVERY = 100
+
+    def __init__(self, path: str = DEFAULT_SESSION_DB, ttl: float = DEFAULT_SESSION_TTL):
+        super().__init__(ttl)
+        self.path = path
+        self._local = threading.local()
+        self._saves = 0
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS sessions "
+                         "(id TEXT PRIMARY KEY, state TEXT NOT NULL, updated REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        # sqlite3 connections must stay on the thread that created them
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, session_id: str) -> Optional[Dict[str, Any]]:
+        row = self._connect().execute(
+            "SELECT state, updated FROM sessions WHERE id = ?", (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        if self._expired(row[1]):
+            self.delete(session_id)
+            return None
+        return json.loads(row[0])
+
+    def _save(self, session_id: str, state: Dict[str, Any]) -> None:
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO sessions (id, state, updated) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET state = excluded.state, updated = excluded.updated",
+                (session_id, json.dumps(state), time.time()),
+            )
+        self._saves += 1
+        if self.ttl and self._saves % self.PURGE_EVERY == 0:
+            self.purge()
+
+    def delete(self, session_id: str) -> bool:
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,)).rowcount > 0
+
+    def purge(self) -> int:
+        """Delete expired sessions and return how many were removed."""
+        if not self.ttl:
+            return 0
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM sessions WHERE updated < ?",
+                                (time.time() - self.ttl,)).rowcount
+
+
+_session_store: Optional[SessionStore] = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Return the process-wide session store.
+
+    `SAVANTY_SESSION_STORE` selects "memory" (default) or "sqlite", whose
+    file is `SAVANTY_SESSION_DB`. Sessions expire `SAVANTY_SESSION_TTL`
+    seconds after their last turn, and the memory store keeps at most
+    `SAVANTY_MAX_SESSIONS`.
+    """
+    global _session_store
+    with _session_store_lock:
+        if _session_store is None:
+            backend = os.getenv("SAVANTY_SESSION_STORE", "memory")
+            ttl = float(os.getenv("SAVANTY_SESSION_TTL", DEFAULT_SESSION_TTL))
+            if backend == "memory":
+                _session_store = MemorySessionStore(
+                    max_sessions=int(os.getenv("SAVANTY_MAX_SESSIONS", DEFAULT_MAX_SESSIONS)), ttl=ttl
+                )
+            elif backend == "sqlite":
+                _session_store = SQLiteSessionStore(os.getenv("SAVANTY_SESSION_DB", DEFAULT_SESSION_DB), ttl=ttl)
+            else:
+                raise ValueError(f"Unknown session store '{backend}', expected 'memory' or 'sqlite'")
+        return _session_store
+
+
+def reset_session_store() -> None:
+    """Forget the process-wide store so the next lookup re-reads the environment."""
+    global _session_store
+    with _session_store_lock:
+        _session_store = None
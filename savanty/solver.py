@@ -2,34 +2,180 @@
 
 import os
 import json
-from typing import Dict, Any, Optional, List
-from clorm import Predicate, ConstantField, IntegerField
+import threading
+import time
+import warnings
+from dataclasses import dataclass, asdict, replace
+from typing import Dict, Any, Optional, List, Callable, Union
+from clingo import SymbolType
 from clorm.clingo import Control
-import dspy
-from savanty.dspy_modules import InteractiveProblemSolver
+from savanty.cache import ProgramCache, get_program_cache
+from savanty.predicates import build_predicates
+from savanty.facts import load_facts, read_fact_file
+from savanty.pool import get_pool
+from savanty.problem_templates import ProblemTemplate, get_template_store, parse_template_ref
+from savanty.coalesce import coalesce_key, coalescing_enabled, get_single_flight
+from savanty.metrics import current_profile, get_metrics, profiling, record_clingo_statistics, span
+from savanty.program_check import check_ground_size, check_program, fact_signature, program_components_errors
+from savanty.extraction import extract_tables
+from savanty.warm_start import WarmStart, previous_atoms
+# The LM is built on the first LLM call, not here (see savanty.lm)
+from savanty.lm import llm_model, lm_context, model_key
 
+# Run independent pipeline stages concurrently (see InteractiveProblemSolver)
+speculative_mode = os.getenv("SAVANTY_SPECULATIVE", "").lower() in ("1", "true", "yes")
+# "staged" runs one LLM call per stage, "fused" compiles in a single call
+pipeline_mode = os.getenv("SAVANTY_PIPELINE", "staged")
+# How many times generated programs that fail the static checks are sent back to be fixed
+repair_attempts = int(os.getenv("SAVANTY_REPAIR_ATTEMPTS", 2))
 
-# Configure DSPy with OpenAI
-openai_api_key = os.getenv("OPENAI_API_KEY")
-llm_model = os.getenv("SAVANTY_LLM_MODEL", "openai/gpt-4o")
-# Use a placeholder if no API key is provided (will fail at runtime if actually needed)
-lm = dspy.LM(llm_model, api_key=openai_api_key or "YOUR_API_KEY_HERE")
-dspy.settings.configure(lm=lm)
+PIPELINES = ("staged", "fused")
+
+
+def _get_pipeline(pipeline: Optional[str]):
+    """Return the DSPy module class and signatures for a pipeline name."""
+    # Imported here: dspy is only loaded once a pipeline is actually needed
+    from savanty.dspy_modules import (
+        InteractiveProblemSolver,
+        FusedProblemSolver,
+        PIPELINE_SIGNATURES,
+        FUSED_PIPELINE_SIGNATURES,
+    )
+    name = pipeline or pipeline_mode
+    if name == "staged":
+        return InteractiveProblemSolver, PIPELINE_SIGNATURES
+    if name == "fused":
+        return FusedProblemSolver, FUSED_PIPELINE_SIGNATURES
+    raise ValueError(f"Unknown pipeline '{name}', expected one of: {', '.join(PIPELINES)}")
 
 
 class ProblemSolverResult:
-    """Wrapper class for problem solver results."""
+    """Wrapper class for problem solver results.
+
+    For solved problems `atoms` holds the final model grouped by predicate,
+    `cost` its cost vector (empty without an optimize statement), `optimal`
+    whether Clingo proved it optimal and `models` how many models were seen.
+    `profile` holds per-stage timings, LLM tokens and Clingo statistics
+    (see `savanty.metrics.Profile`). `warm_start` reports how much of a
+    previous solution a warm-started solve reused (see
+    `savanty.warm_start.WarmStart.report`).
+    """
     
     def __init__(self, needs_more_info: bool = False, questions: List[str] = None, 
-                 solution: str = None, error: str = None):
+                 solution: str = None, error: str = None,
+                 atoms: Dict[str, List[list]] = None, cost: List[int] = None,
+                 optimal: Optional[bool] = None, models: int = 0,
+                 profile: Optional[Dict[str, Any]] = None,
+                 warm_start: Optional[Dict[str, Any]] = None):
         self.needs_more_info = needs_more_info
         self.questions = questions or []
         self.solution = solution
         self.error = error
+        self.atoms = atoms
+        self.cost = cost or []
+        self.optimal = optimal
+        self.models = models
+        self.profile = profile
+        self.warm_start = warm_start
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the result as JSON-serializable data."""
+        return {
+            "needs_more_info": self.needs_more_info,
+            "questions": self.questions,
+            "solution": self.solution,
+            "error": self.error,
+            "atoms": self.atoms,
+            "cost": self.cost,
+            "optimal": self.optimal,
+            "models": self.models,
+            "profile": self.profile,
+            "warm_start": self.warm_start,
+        }
+
+
+PARALLEL_MODES = ("compete", "split")
+OPT_STRATEGIES = ("bb", "usc")
+CONFIGURATIONS = ("auto", "frumpy", "jumpy", "tweety", "handy", "crafty", "trendy", "many")
+
+# How often a search with a `stop` event checks it, in seconds
+STOP_POLL_SECONDS = 0.1
+
+
+def available_cpus() -> int:
+    """Number of CPUs this process may run on."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def auto_thread_count(active_solves: int = 1) -> int:
+    """Share the available CPUs evenly between the solves currently running."""
+    return max(1, available_cpus() // max(1, active_solves))
+
+
+@dataclass
+class SolverOptions:
+    """Options for the Clingo stage.
+
+    `time_limit` is a wall-clock budget in seconds, counted from the start of
+    the Clingo stage, and `conflict_limit` caps the number of conflicts. When
+    either runs out the best model found so far is returned with
+    `optimal=False`.
+
+    `threads` is a thread count or "auto" (see `auto_thread_count`);
+    `parallel_mode` is "compete" (portfolio) or "split" (search space
+    splitting), `opt_strategy` is "bb" (branch-and-bound) or "usc"
+    (core-guided) and `configuration` one of Clingo's presets.
+    """
+    
+    time_limit: Optional[float] = None
+    conflict_limit: Optional[int] = None
+    threads: Optional[Union[int, str]] = None
+    parallel_mode: Optional[str] = None
+    opt_strategy: Optional[str] = None
+    configuration: Optional[str] = None
+
+    def __post_init__(self):
+        if isinstance(self.threads, str) and self.threads != "auto":
+            self.threads = int(self.threads)
+        if isinstance(self.threads, int) and self.threads < 1:
+            raise ValueError("threads must be at least 1")
+        for name, value, choices in (("parallel_mode", self.parallel_mode, PARALLEL_MODES),
+                                     ("opt_strategy", self.opt_strategy, OPT_STRATEGIES),
+                                     ("configuration", self.configuration, CONFIGURATIONS)):
+            if value is not None and value not in choices:
+                raise ValueError(f"Invalid {name} '{value}', expected one of: {', '.join(choices)}")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    def with_resolved_threads(self, active_solves: int = 1) -> "SolverOptions":
+        """Return a copy with threads="auto" replaced by a concrete count."""
+        if self.threads != "auto":
+            return self
+        return replace(self, threads=auto_thread_count(active_solves))
+
+    def clingo_arguments(self) -> List[str]:
+        """Translate the options into Clingo command-line arguments."""
+        arguments = []
+        threads = self.with_resolved_threads().threads
+        if threads and threads > 1:
+            arguments.append(f"--parallel-mode={threads},{self.parallel_mode or 'compete'}")
+        if self.opt_strategy:
+            arguments.append(f"--opt-strategy={self.opt_strategy}")
+        if self.configuration:
+            arguments.append(f"--configuration={self.configuration}")
+        return arguments
 
 
 def generate_clorm_predicates(predicates: list) -> str:
-    """Generate Clorm predicate classes from parsed predicates."""
+    """Generate Clorm predicate class source from parsed predicates.
+
+    Used to show users the generated code; solving builds the classes
+    directly with `savanty.predicates.build_predicates`.
+    """
     predicate_code = ""
     for pred in predicates:
         fields = ", ".join([f"{field} = {type}" for field, type in pred['fields'].items()])
@@ -54,71 +200,445 @@ def generate_asp_program(problem_info: Dict[str, Any]) -> str:
 """
 
 
-def validate_and_parse_problem(description: str, additional_info: str = None) -> Dict[str, Any]:
-    """Validate and parse the optimization problem using DSPy."""
+def program_cache_key(description: str, additional_info: str = None,
+                      pipeline: Optional[str] = None, lm=None) -> str:
+    """Return the program cache key for a problem under a model (the default one and its stage routing) and pipeline."""
+    from savanty.dspy_modules import signature_fingerprint
+    _, signatures = _get_pipeline(pipeline)
+    return ProgramCache.make_key(description, additional_info, model_key(lm),
+                                 signature_fingerprint(signatures))
+
+
+def invalidate_cached_program(description: str, additional_info: str = None,
+                              pipeline: Optional[str] = None) -> bool:
+    """Drop the cached program for a problem so the next solve recompiles it."""
+    cache = get_program_cache()
+    if cache is None:
+        return False
+    return cache.invalidate(program_cache_key(description, additional_info, pipeline))
+
+
+def run_pipeline(description: str, additional_info: str = None,
+                 speculative: Optional[bool] = None,
+                 pipeline: Optional[str] = None, lm=None,
+                 data_facts: Optional[List[str]] = None):
+    """Run the DSPy pipeline once, without the cache, and return its prediction.
+
+    When the problem is complete the parsed program components are set as
+    `prediction.components`. Components that fail the static checks of
+    `savanty.program_check.check_program` are sent back to the LLM with the
+    diagnostics up to `repair_attempts` times (`SAVANTY_REPAIR_ATTEMPTS`);
+    `prediction.repairs` counts the attempts made. Failures are raised as
+    ValueError. `lm` is an LM or model name for this call (see
+    `savanty.lm.resolve_lm`).
+
+    Tabular data in the description and additional information is extracted
+    first (see `savanty.extraction`): the LLM only sees its schema and a few
+    rows, and the rows are added to the components' facts. They are also set
+    as `prediction.data_facts`, together with `data_facts` extracted by
+    earlier turns of the same problem.
+    """
+    solver_class, _ = _get_pipeline(pipeline)
+    
     # Create the interactive problem solver
-    solver = InteractiveProblemSolver()
+    solver = solver_class(
+        speculative=speculative_mode if speculative is None else speculative
+    )
+    
+    with span("extract"):
+        # Tables of earlier turns keep their predicates; new ones get other names
+        reserved = {fact_signature(fact)[0] for fact in data_facts or []}
+        extraction = extract_tables(description, additional_info, reserved=reserved)
+    description, additional_info = extraction.texts
+    data_facts = list(data_facts or []) + extraction.facts
+    if extraction.tables:
+        get_metrics().inc("savanty_extracted_rows_total", len(extraction.facts),
+                          help="Rows of tabular data extracted from descriptions instead of sent to the LLM")
     
     try:
         # Run the DSPy pipeline
-        result = solver.forward(problem_description=description, additional_info=additional_info)
-        
-        # If the solver needs more information, return the questions
-        if result.needs_more_info:
-            raise ValueError("NEEDS_MORE_INFO:" + json.dumps(result.questions))
-        
-        # Parse the program components
-        program_components = json.loads(result.program.program_components)
-        
-        return program_components
+        with lm_context(lm):
+            result = solver.forward(problem_description=description, additional_info=additional_info)
+            
+            # Parse and check the program components
+            if not result.needs_more_info:
+                result.components, result.repairs = repair_program(
+                    solver.repair, json.loads(result.program.program_components), result.analysis.analysis,
+                    data_facts=data_facts
+                )
+        result.data_facts = data_facts
+        return result
     except json.JSONDecodeError as e:
         raise ValueError(f"Failed to parse program components from LLM output: {str(e)}")
     except Exception as e:
-        # Check if this is a "needs more info" error
-        if str(e).startswith("NEEDS_MORE_INFO:"):
-            raise
         raise ValueError(f"Error in DSPy processing: {str(e)}")
 
 
-def solve_optimization_problem(problem_description: str, additional_info: str = None) -> ProblemSolverResult:
-    """Solve an optimization problem given its description using DSPy."""
-    try:
-        # Step 1: Validate and parse the problem using DSPy
-        problem_info = validate_and_parse_problem(problem_description, additional_info)
-        
-        # Step 2: Generate Clorm predicates
-        predicate_code = generate_clorm_predicates(problem_info['predicates'])
-        exec(predicate_code, globals())
-        
-        # Step 3: Construct the ASP program
-        asp_program = generate_asp_program(problem_info)
-        
-        # Step 4: Solve the optimization problem
-        ctrl = Control(unifier=[globals()[pred['name']] for pred in problem_info['predicates']])
-        
-        # Add facts
-        for fact in problem_info['facts']:
-            if '(' in fact and ')' in fact:
-                predicate_name, *args = fact.split('(')
-                args = args[0].rstrip(')').split(',')
-                predicate_class = globals()[predicate_name]
-                ctrl.add_fact(predicate_class(*args))
-        
-        ctrl.add_program(asp_program)
-        
-        solution = None
-        with ctrl.solve(yield_=True) as sh:
-            for model in sh:
-                solution = model.facts(atoms=True)
-        
-        return ProblemSolverResult(solution=str(solution) if solution else "No solution found")
-    except ValueError as e:
+def repair_program(repair, components: Any, analysis: str, attempts: Optional[int] = None,
+                   data_facts: Optional[List[str]] = None):
+    """Check program components and have `repair` (the "repair" stage) fix them until they pass.
+
+    Returns the passing components, with `data_facts` added to their facts,
+    and the number of repair attempts made, or raises ValueError with the
+    remaining diagnostics after `attempts` (default `repair_attempts`)
+    failed ones. The data facts are checked but never sent to the LLM.
+    """
+    attempts = repair_attempts if attempts is None else attempts
+    data_facts = data_facts or []
+    
+    def with_data(components):
+        if not data_facts or program_components_errors(components):
+            return components
+        return dict(components, facts=list(components["facts"]) + data_facts)
+    
+    errors = check_program(with_data(components)).errors
+    made = 0
+    while errors:
+        if made >= attempts:
+            get_metrics().inc("savanty_program_repairs_total", outcome="failed",
+                              help="Generated programs sent back for repair, by final outcome")
+            raise ValueError("Generated program failed static checks: " + "; ".join(errors))
+        made += 1
+        fixed = repair(analysis=analysis, program_components=json.dumps(components),
+                       diagnostics="\n".join(errors))
+        try:
+            components = json.loads(fixed.repaired_components)
+        except (TypeError, json.JSONDecodeError) as e:
+            errors = [f"the repaired program components are not valid JSON: {e}"]
+            continue
+        errors = check_program(with_data(components)).errors
+    if made:
+        get_metrics().inc("savanty_program_repairs_total", outcome="repaired",
+                          help="Generated programs sent back for repair, by final outcome")
+    return with_data(components), made
+
+
+def validate_and_parse_problem(description: str, additional_info: str = None,
+                               use_cache: bool = True,
+                               speculative: Optional[bool] = None,
+                               pipeline: Optional[str] = None, lm=None) -> Dict[str, Any]:
+    """Validate and parse the optimization problem using DSPy.
+
+    Parsed program components are cached on disk, so a repeated problem skips
+    the LLM pipeline entirely. `speculative` overrides `SAVANTY_SPECULATIVE`,
+    `pipeline` ("staged" or "fused") overrides `SAVANTY_PIPELINE` and `lm`
+    (an LM or model name) overrides `SAVANTY_LLM_MODEL`.
+    """
+    _get_pipeline(pipeline)
+    cache = get_program_cache() if use_cache else None
+    cache_key = None
+    if cache is not None:
+        cache_key = program_cache_key(description, additional_info, pipeline, lm=lm)
+        cached = cache.get(cache_key)
+        get_metrics().inc("savanty_program_cache_total", result="hit" if cached is not None else "miss",
+                          help="Program cache lookups")
+        if cached is not None:
+            return cached
+    
+    with span("pipeline"):
+        result = run_pipeline(description, additional_info, speculative=speculative, pipeline=pipeline, lm=lm)
+    
+    # If the solver needs more information, return the questions
+    if result.needs_more_info:
+        raise ValueError("NEEDS_MORE_INFO:" + json.dumps(result.questions))
+    
+    if cache is not None:
+        cache.set(cache_key, result.components)
+    
+    return result.components
+
+
+def symbol_to_json(symbol) -> Any:
+    """Convert a Clingo symbol to a JSON value.
+
+    Numbers become ints, strings stay strings, constants become their name
+    and anything compound (functions, tuples) its ASP text.
+    """
+    if symbol.type == SymbolType.Number:
+        return symbol.number
+    if symbol.type == SymbolType.String:
+        return symbol.string
+    if symbol.type == SymbolType.Function and not symbol.arguments and symbol.name:
+        return symbol.name
+    return str(symbol)
+
+
+def symbols_to_atoms(symbols) -> Dict[str, List[list]]:
+    """Group model symbols by predicate name as lists of JSON arguments."""
+    atoms: Dict[str, List[list]] = {}
+    for symbol in symbols:
+        atoms.setdefault(symbol.name, []).append([symbol_to_json(arg) for arg in symbol.arguments])
+    for rows in atoms.values():
+        rows.sort(key=lambda row: json.dumps(row))
+    return dict(sorted(atoms.items()))
+
+
+def result_from_error(error: Exception) -> ProblemSolverResult:
+    """Turn an error raised while compiling or solving into a result."""
+    message = str(error)
+    if isinstance(error, ValueError):
         # Check if this is a "needs more info" error
-        if str(e).startswith("NEEDS_MORE_INFO:"):
-            questions_json = str(e)[16:]  # Remove "NEEDS_MORE_INFO:" prefix
+        if message.startswith("NEEDS_MORE_INFO:"):
+            questions_json = message[16:]  # Remove "NEEDS_MORE_INFO:" prefix
             questions = json.loads(questions_json)
             return ProblemSolverResult(needs_more_info=True, questions=questions)
+        return ProblemSolverResult(error=message)
+    return ProblemSolverResult(error=f"Error solving optimization problem: {message}")
+
+
+def build_control(problem_info: Dict[str, Any], fact_files: Optional[List[str]] = None,
+                  options: Optional[SolverOptions] = None) -> Control:
+    """Create a Clingo control object and ground program components in its "base" part.
+
+    Raises `GroundingTooLargeError` without grounding anything when the
+    estimated grounding size is over `SAVANTY_MAX_GROUND_SIZE`.
+
+    `options.threads` must already be resolved (see `SolverOptions.with_resolved_threads`).
+    """
+    options = options or SolverOptions()
+    # Refuse encodings whose grounding would run away before paying for any of it
+    check_ground_size(problem_info)
+    # Build Clorm predicate classes for this request
+    predicate_classes = build_predicates(problem_info['predicates'])
+    
+    # Construct the ASP program
+    asp_program = generate_asp_program(problem_info)
+    
+    ctrl = Control(arguments=options.clingo_arguments(),
+                   unifier=list(dict.fromkeys(predicate_classes.values())))
+    
+    # Add facts in bulk, then any external instance data
+    with span("load_facts"):
+        load_facts(ctrl, problem_info['facts'])
+        for path in fact_files or []:
+            load_facts(ctrl, read_fact_file(path, predicates=problem_info['predicates']))
+    
+    with span("ground"):
+        ctrl.add("base", [], asp_program)
+        ctrl.ground([("base", [])])
+    return ctrl
+
+
+def search(ctrl: Control, options: Optional[SolverOptions] = None,
+           on_model: Optional[Callable[[Dict[str, Any]], None]] = None,
+           started: Optional[float] = None,
+           stop: Optional[threading.Event] = None,
+           warm_start: Optional[WarmStart] = None) -> ProblemSolverResult:
+    """Solve a grounded control object within the budgets in `options`.
+
+    `started` is when the time budget began (default: now). Setting `stop`
+    ends the search early like an expired time limit. A prepared
+    `warm_start` first bounds the search by the previous solution, when it
+    is still feasible, and its reuse is reported in the result. The control
+    object can be searched again afterwards, e.g. after grounding more parts.
+    """
+    options = options or SolverOptions()
+    started = time.monotonic() if started is None else started
+    ctrl.configuration.solve.solve_limit = str(options.conflict_limit) if options.conflict_limit else "umax,umax"
+    
+    # Only keep the raw symbols of each improving model; converting them
+    # is deferred until we know which model is the final one.
+    best = {"symbols": None, "cost": [], "models": 0}
+    
+    def record_model(model):
+        best["models"] += 1
+        best["symbols"] = model.symbols(atoms=True)
+        best["cost"] = list(model.cost)
+        if on_model is not None:
+            on_model({
+                "models": best["models"],
+                "cost": best["cost"],
+                "atoms": symbols_to_atoms(best["symbols"]),
+                "elapsed": time.monotonic() - started,
+            })
+    
+    deadline = None if options.time_limit is None else started + options.time_limit
+    
+    def wait(handle):
+        if deadline is None and stop is None:
+            handle.wait()
+            return
+        while True:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if (remaining is not None and remaining <= 0) or (stop is not None and stop.is_set()):
+                # Out of time or stopped: end the search and keep the best model so far
+                handle.cancel()
+                return
+            # Wake up regularly to notice a stop request
+            step = STOP_POLL_SECONDS if remaining is None else min(remaining, STOP_POLL_SECONDS)
+            if handle.wait(step if stop is not None else remaining):
+                return
+    
+    try:
+        if warm_start is not None:
+            with span("warm_start"):
+                warm_start.bound(ctrl, wait)
+        with span("solve"), ctrl.solve(on_model=record_model, async_=True) as handle:
+            wait(handle)
+            exhausted = handle.get().exhausted
+    finally:
+        if warm_start is not None:
+            warm_start.reset(ctrl)
+    record_clingo_statistics(ctrl.statistics)
+    
+    final_symbols, cost, models = best["symbols"], best["cost"], best["models"]
+    if final_symbols is None and warm_start is not None and warm_start.symbols is not None:
+        # Stopped before finding anything as good: the previous solution still stands
+        final_symbols, cost, exhausted = warm_start.symbols, warm_start.cost, False
+    if final_symbols is None:
+        return ProblemSolverResult(solution="No solution found", optimal=False, models=0,
+                                   warm_start=warm_start.report(None) if warm_start is not None else None)
+    
+    atoms = symbols_to_atoms(final_symbols)
+    return ProblemSolverResult(
+        solution=" ".join(str(symbol) for symbol in sorted(final_symbols)),
+        atoms=atoms,
+        cost=cost,
+        # Without an objective any model is optimal
+        optimal=exhausted if cost else True,
+        models=models,
+        warm_start=warm_start.report(atoms) if warm_start is not None else None,
+    )
+
+
+def solve_program(problem_info: Dict[str, Any],
+                  fact_files: Optional[List[str]] = None,
+                  options: Optional[SolverOptions] = None,
+                  on_model: Optional[Callable[[Dict[str, Any]], None]] = None,
+                  stop: Optional[threading.Event] = None,
+                  warm_start: Any = None) -> ProblemSolverResult:
+    """Ground and solve parsed program components with Clingo.
+
+    This is the CPU-bound half of `solve_optimization_problem`; it makes no
+    LLM calls and only takes plain data, so it can run on a process pool.
+    `fact_files` are extra .csv/.jsonl/.lp instance files, streamed into
+    Clingo alongside the facts in `problem_info`. If given, `on_model` is
+    called with {"models", "cost", "atoms", "elapsed"} for every improving
+    model as Clingo finds it, and setting `stop` (thread workers only) ends
+    the search early with the best model found so far. `warm_start` is a
+    previous solution of the same encoding (a `ProblemSolverResult`, its
+    `to_dict` or its atoms) to start from (see `savanty.warm_start`).
+    """
+    options = options or SolverOptions()
+    started = time.monotonic()
+    # A profile started by the caller (same thread or a thread pool) collects
+    # this solve; otherwise, e.g. in a worker process, it is returned with the result.
+    own_profile = current_profile() is None
+    with profiling() as profile:
+        try:
+            if options.threads == "auto":
+                options = options.with_resolved_threads(get_pool("solve").pending)
+            atoms = previous_atoms(warm_start)
+            ctrl = build_control(problem_info, fact_files=fact_files, options=options)
+            warm = None
+            if atoms is not None:
+                warm = WarmStart(atoms)
+                warm.prepare(ctrl)
+            result = search(ctrl, options, on_model=on_model, started=started, stop=stop, warm_start=warm)
+        except Exception as e:
+            result = result_from_error(e)
+    if own_profile:
+        result.profile = profile.to_dict()
+    return result
+
+
+def solve_optimization_problem(problem_description: str, additional_info: str = None,
+                               fact_files: Optional[List[str]] = None,
+                               options: Optional[SolverOptions] = None,
+                               on_model: Optional[Callable[[Dict[str, Any]], None]] = None,
+                               lm=None, warm_start: Any = None) -> ProblemSolverResult:
+    """Solve an optimization problem given its description using DSPy.
+
+    See `solve_program` for `fact_files`, `options`, `on_model` and `warm_start`, and
+    `validate_and_parse_problem` for `lm`.
+    Concurrent calls with the same normalized input and options share one
+    computation (see `savanty.coalesce`) unless they stream models through
+    `on_model` or `SAVANTY_COALESCE=0` is set.
+    """
+    if on_model is None and coalescing_enabled():
+        key = coalesce_key("solve", problem_description, additional_info or "",
+                           [os.path.abspath(path) for path in fact_files or []],
+                           (options or SolverOptions()).to_dict(), pipeline_mode, model_key(lm),
+                           getattr(warm_start, "atoms", warm_start))
+        return get_single_flight("solve").do(key, _solve_optimization_problem, problem_description,
+                                             additional_info, fact_files, options, lm=lm, warm_start=warm_start)
+    return _solve_optimization_problem(problem_description, additional_info, fact_files, options, on_model, lm,
+                                       warm_start)
+
+
+def _solve_optimization_problem(problem_description: str, additional_info: str = None,
+                                fact_files: Optional[List[str]] = None,
+                                options: Optional[SolverOptions] = None,
+                                on_model: Optional[Callable[[Dict[str, Any]], None]] = None,
+                                lm=None, warm_start: Any = None) -> ProblemSolverResult:
+    with profiling() as profile:
+        try:
+            # Validate and parse the problem using DSPy
+            problem_info = validate_and_parse_problem(problem_description, additional_info, lm=lm)
+        except Exception as e:
+            result = result_from_error(e)
         else:
+            result = solve_program(problem_info, fact_files=fact_files, options=options, on_model=on_model,
+                                   warm_start=warm_start)
+    result.profile = profile.to_dict()
+    return result
+
+
+def compile_template(problem_description: str, additional_info: str = None,
+                     template_id: Optional[str] = None) -> ProblemTemplate:
+    """Compile a problem with the LLM pipeline and save its encoding as a template.
+
+    Raises ValueError as `validate_and_parse_problem` does, including the
+    NEEDS_MORE_INFO case.
+    """
+    problem_info = validate_and_parse_problem(problem_description, additional_info)
+    description = problem_description if not additional_info else f"{problem_description}\n{additional_info}"
+    return get_template_store().save(problem_info, template_id=template_id, description=description)
+
+
+def solve_template(template: Union[str, ProblemTemplate], facts: Optional[List[str]] = None,
+                   fact_files: Optional[List[str]] = None,
+                   options: Optional[SolverOptions] = None,
+                   on_model: Optional[Callable[[Dict[str, Any]], None]] = None,
+                   warm_start: Any = None) -> ProblemSolverResult:
+    """Solve a saved template against new instance data, without any LLM call.
+
+    `template` is a `ProblemTemplate` or a reference like "shifts" or
+    "shifts@3". `facts` are ASP facts and `fact_files` instance files, and
+    `warm_start` a previous solution, as in `solve_program`. A solution is
+    kept as the template version's last result, which later solves can
+    warm-start from (see `TemplateStore.last_result`).
+    """
+    if isinstance(template, str):
+        try:
+            template = get_template_store().get(*parse_template_ref(template))
+        except (KeyError, ValueError) as e:
             return ProblemSolverResult(error=str(e))
-    except Exception as e:
-        return ProblemSolverResult(error=f"Error solving optimization problem: {str(e)}")
\ No newline at end of file
+    result = solve_program(template.problem_info(facts), fact_files=fact_files,
+                           options=options, on_model=on_model, warm_start=warm_start)
+    remember_template_result(template, result)
+    return result
+
+
+def remember_template_result(template: ProblemTemplate, result: ProblemSolverResult) -> None:
+    """Keep a solution as the template version's last result, for `template_warm_start`."""
+    if not result.atoms:
+        return
+    try:
+        get_template_store().save_result(template, result.atoms)
+    except OSError as e:
+        # A read-only template store still solves; it just can't offer a warm start later
+        warnings.warn(f"Could not keep the last result of template '{template.id}': {e}", RuntimeWarning)
+
+
+def template_warm_start(template_ref: str) -> Dict[str, List[list]]:
+    """Return the atoms of a template's last solution, for warm-starting another solve.
+
+    Raises KeyError for an unknown template and ValueError when the template
+    has not been solved yet.
+    """
+    template_id, version = parse_template_ref(template_ref)
+    atoms = get_template_store().last_result(template_id, version)
+    if not atoms:
+        raise ValueError(f"Template '{template_ref}' has no solution to start from")
+    return atoms
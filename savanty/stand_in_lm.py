@@ -0,0 +1,87 @@
+"""A deterministic stand-in for `dspy.LM`, for benchmarks and tests without network access."""
+
+import asyncio
+import json
+import random
+import time
+from contextlib import contextmanager
+from typing import Dict, Any
+import dspy
+from dspy.clients.engines.dummy_engine import AsyncDummyEngine, DummyEngine
+from dspy.utils import DummyLM
+from savanty.dspy_modules import STAGE_SIGNATURES
+
+
+def _output_marker(signature) -> str:
+    """The part of a ChatAdapter prompt that names the output fields it asks for."""
+    markers = [f"`[[ ## {name} ## ]]`" for name in signature.output_fields]
+    return "starting with the field " + ", then ".join(markers) + ", and then ending"
+
+
+def _field_text(value: Any) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+class _DelayedEngine(DummyEngine):
+    """DummyLM's engine, answering each canonical request after the stand-in's latency."""
+
+    # Without the legacy shortcut DSPy sends canonical requests to `complete`
+    complete_legacy = None
+
+    def complete(self, request):
+        time.sleep(self.owner._delay())
+        return super().complete(request)
+
+
+class _AsyncDelayedEngine(AsyncDummyEngine):
+    """Async counterpart of `_DelayedEngine`, waiting without blocking the event loop."""
+
+    complete_legacy = None
+
+    async def complete(self, request):
+        await asyncio.sleep(self.sync.owner._delay())
+        return DummyEngine.complete(self.sync, request)
+
+
+class StandInLM(DummyLM):
+    """Deterministic stand-in for `dspy.LM` that replays recorded stage outputs.
+
+    `responses` maps stage names (see `STAGE_SIGNATURES`) to their output
+    fields; each request is answered with the outputs of the stage whose
+    fields it asks for. Every call waits `latency` seconds, varied by up to
+    the fraction `jitter` with a seeded generator, to stand in for a remote
+    model without any network access. The wait happens in DummyLM's engine,
+    so calls take DSPy's engine path rather than the deprecated `forward`.
+    """
+
+    def __init__(self, responses: Dict[str, Dict[str, Any]], latency: float = 0.0,
+                 jitter: float = 0.0, seed: int = 0):
+        answers = {}
+        for stage, fields in responses.items():
+            answers[_output_marker(STAGE_SIGNATURES[stage])] = {
+                name: _field_text(value) for name, value in fields.items()
+            }
+        super().__init__(answers)
+        self.latency = latency
+        self.jitter = jitter
+        self._random = random.Random(seed)
+        self._engine_spec = _DelayedEngine(self)
+        self._async_engine_spec = _AsyncDelayedEngine(self._engine_spec)
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency * (1 + self.jitter * (2 * self._random.random() - 1)))
+
+
+@contextmanager
+def stand_in_lm(lm: dspy.BaseLM):
+    """Use `lm` instead of the LM configured in `savanty.solver` for this block."""
+    previous = dspy.settings.lm
+    dspy.settings.configure(lm=lm)
+    try:
+        yield lm
+    finally:
+        dspy.settings.configure(lm=previous)
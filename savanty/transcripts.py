@@ -0,0 +1,138 @@
+"""Recorded LM transcripts, replayed to rerun the pipeline without calling the LLM."""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Optional
+from savanty.cache import normalize_text
+from savanty.metrics import get_metrics
+
+
+TRANSCRIPT_MODES = ("record", "replay", "strict")
+
+
+class TranscriptMissError(LookupError):
+    """Raised in strict replay when a stage call was never recorded."""
+
+
+def transcript_key(stage: str, fingerprint: str, inputs: Dict[str, Any]) -> str:
+    """Hash what a stage call depends on: the stage, its signature and its (normalized) inputs."""
+    normalized = {name: normalize_text(value) if isinstance(value, str) else value
+                  for name, value in inputs.items()}
+    payload = json.dumps([stage, fingerprint, normalized], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Transcript:
+    """Append-only file of LM stage calls and their outputs, indexed by `transcript_key`.
+
+    Each line is "<key>\\t<json record>", so opening a transcript only reads
+    the keys to build an offset index and a lookup reads one line. A key
+    recorded twice is served from its latest line. Modes:
+
+    * "record": every call goes to the LLM and is appended.
+    * "replay": recorded calls are served from the file; misses go to the
+      LLM and are appended, so the transcript fills up as it is used.
+    * "strict": misses raise `TranscriptMissError` and the LLM is never
+      called, e.g. for air-gapped batch jobs.
+
+    One process should write a transcript at a time; any number can replay it.
+    """
+
+    def __init__(self, path: str, mode: str = "replay"):
+        if mode not in TRANSCRIPT_MODES:
+            raise ValueError(f"Unknown transcript mode '{mode}', expected one of: {', '.join(TRANSCRIPT_MODES)}")
+        self.path = path
+        self.mode = mode
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        self._index: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._load_index()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def _load_index(self) -> None:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                key, tab, _ = line.partition(b"\t")
+                if tab and line.endswith(b"\n"):
+                    self._index[key.decode("ascii")] = offset
+                offset += len(line)
+
+    def _read(self, offset: int) -> Dict[str, Any]:
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return json.loads(f.readline().partition(b"\t")[2])
+
+    def lookup(self, stage: str, fingerprint: str, inputs: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the recorded outputs of a stage call, or None when it should go to the LLM."""
+        if self.mode == "record":
+            return None
+        key = transcript_key(stage, fingerprint, inputs)
+        with self._lock:
+            offset = self._index.get(key)
+            if offset is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        get_metrics().inc("savanty_transcript_lookups_total", result="hit" if offset is not None else "miss",
+                          help="LM transcript lookups by result")
+        if offset is None:
+            if self.mode == "strict":
+                raise TranscriptMissError(f"No recorded '{stage}' call for these inputs in {self.path}")
+            return None
+        return self._read(offset)["outputs"]
+
+    def record(self, stage: str, fingerprint: str, inputs: Dict[str, Any], outputs: Dict[str, Any],
+               model: Optional[str] = None) -> None:
+        """Append a stage call made against the LLM."""
+        key = transcript_key(stage, fingerprint, inputs)
+        record = {"stage": stage, "model": model, "created": time.time(), "inputs": inputs, "outputs": outputs}
+        line = (key + "\t" + json.dumps(record, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+        with self._lock:
+            with open(self.path, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(line)
+            self._index[key] = offset
+            self.recorded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "mode": self.mode, "entries": len(self), "hits": self.hits,
+                "misses": self.misses, "recorded": self.recorded}
+
+
+_transcript: Optional[Transcript] = None
+_transcript_lock = threading.Lock()
+
+
+def get_transcript() -> Optional[Transcript]:
+    """Return the process-wide transcript, or None when none is configured.
+
+    `SAVANTY_TRANSCRIPT` names the file and `SAVANTY_TRANSCRIPT_MODE` picks
+    "record", "replay" (default) or "strict".
+    """
+    global _transcript
+    path = os.getenv("SAVANTY_TRANSCRIPT")
+    if not path:
+        return None
+    with _transcript_lock:
+        if _transcript is None:
+            _transcript = Transcript(path, os.getenv("SAVANTY_TRANSCRIPT_MODE", "replay"))
+        return _transcript
+
+
+def reset_transcript() -> None:
+    """Forget the process-wide transcript so the next lookup re-reads the environment."""
+    global _transcript
+    with _transcript_lock:
+        _transcript = None
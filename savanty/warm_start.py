@@ -0,0 +1,126 @@
+"""Warm-starting a solve from a previous solution of the same encoding.
+
+When an encoding is solved again with slightly changed facts, the previous
+optimum is usually close to the new one. `WarmStart` steers Clingo toward
+it in two ways:
+
+* Domain heuristics make the solver first try the previous truth value of
+  every atom it had, so the first model found is typically the previous
+  solution or a close neighbour.
+* If the previous solution is still feasible (checked with one solve under
+  assumptions that fix it), its cost under the new facts becomes the
+  initial bound of the optimization, so the search only looks for models
+  at least as good.
+
+Afterwards `report` says how much of the previous solution the new one kept.
+"""
+
+import json
+from typing import Any, Dict, Iterable, List, Optional
+from clingo import HeuristicType
+
+
+def previous_atoms(previous: Any) -> Optional[Dict[str, List[list]]]:
+    """Return the atoms of a previous solution: a `ProblemSolverResult`, its `to_dict` or an atoms mapping."""
+    atoms = getattr(previous, "atoms", previous)
+    if atoms is None:
+        return None
+    if isinstance(atoms, dict) and isinstance(atoms.get("atoms"), dict):
+        # A result dict; a predicate named "atoms" would map to a list
+        atoms = atoms["atoms"]
+    if not isinstance(atoms, dict):
+        raise ValueError("A warm start needs a previous result with atoms")
+    return atoms or None
+
+
+def _key(arguments: Iterable[Any]) -> str:
+    return json.dumps(list(arguments))
+
+
+class WarmStart:
+    """A previous solution, applied to a freshly grounded control object.
+
+    `atoms` is the previous model as `symbols_to_atoms` returns it (the
+    `atoms` of a `ProblemSolverResult`). Atoms that are facts of the new
+    instance are left alone: only the atoms the solver decides are steered.
+    """
+
+    def __init__(self, atoms: Dict[str, List[list]]):
+        self.atoms = {name: {_key(arguments) for arguments in rows} for name, rows in atoms.items()}
+        self.previous = sum(len(keys) for keys in self.atoms.values())
+        self.matched = 0
+        self.cost: Optional[List[int]] = None
+        self.symbols = None
+        self._assumptions: List[int] = []
+
+    def prepare(self, ctrl) -> None:
+        """Add sign heuristics for the previous atoms to a grounded control object."""
+        from savanty.solver import symbol_to_json
+
+        arities = {(name, len(json.loads(key))) for name, keys in self.atoms.items() for key in keys}
+        decided = set()
+        with ctrl.backend() as backend:
+            for name, arity in sorted(arities):
+                wanted = self.atoms[name]
+                for atom in ctrl.symbolic_atoms.by_signature(name, arity):
+                    if atom.is_fact:
+                        continue
+                    decided.add(name)
+                    value = _key(symbol_to_json(argument) for argument in atom.symbol.arguments) in wanted
+                    if value:
+                        self.matched += 1
+                        backend.add_heuristic(atom.literal, HeuristicType.Sign, 1, 1, [])
+                    self._assumptions.append(atom.literal if value else -atom.literal)
+        # Atoms that are facts now (e.g. derived while grounding) say nothing about reuse
+        self.atoms = {name: keys for name, keys in self.atoms.items() if name in decided}
+        self.previous = sum(len(keys) for keys in self.atoms.values())
+        if self.matched:
+            configuration = ctrl.configuration.solver
+            for index in range(len(configuration)):
+                configuration[index].heuristic = "Domain"
+
+    def bound(self, ctrl, wait) -> None:
+        """Check whether the previous solution is still feasible and, if so, bound the search by its cost.
+
+        `wait(handle)` waits for a solve handle within the caller's time budget.
+        """
+        if not self.matched:
+            return
+        found = {}
+
+        def record(model):
+            found["symbols"] = model.symbols(atoms=True)
+            found["cost"] = list(model.cost)
+
+        # Clorm's wrapper only takes symbolic assumptions; the literals go to Clingo directly
+        control = getattr(ctrl, "control_", ctrl)
+        with control.solve(assumptions=self._assumptions, on_model=record, async_=True) as handle:
+            wait(handle)
+        if found:
+            self.symbols, self.cost = found["symbols"], found["cost"]
+            if self.cost:
+                ctrl.configuration.solve.opt_mode = "opt," + ",".join(map(str, self.cost))
+
+    @staticmethod
+    def reset(ctrl) -> None:
+        """Drop the bound, so later solves on the same control object start unbounded."""
+        ctrl.configuration.solve.opt_mode = "opt"
+
+    def report(self, atoms: Optional[Dict[str, List[list]]]) -> Dict[str, Any]:
+        """How much of the previous solution the new one kept.
+
+        `reused` is the fraction of the previous atoms (over the predicates
+        the solver decides) that are also in the new solution; `feasible`
+        tells whether the previous solution still was one, and `bound` is its
+        cost under the new facts, used as the initial bound.
+        """
+        kept = sum(_key(arguments) in self.atoms.get(name, ())
+                   for name, rows in (atoms or {}).items() for arguments in rows)
+        return {
+            "previous_atoms": self.previous,
+            "kept_atoms": kept,
+            "reused": kept / self.previous if self.previous else 0.0,
+            "feasible": self.symbols is not None,
+            "bound": self.cost,
+        }
+
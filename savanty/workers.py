@@ -0,0 +1,209 @@
+"""Pre-forked, resource-limited worker processes for the Clingo stage."""
+
+import multiprocessing
+import os
+import pickle
+import queue
+import signal
+import sys
+import threading
+import zlib
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - not available on Windows
+    resource = None
+
+
+class WorkerLimitError(RuntimeError):
+    """Raised when a job overruns its worker's memory, CPU or wall-clock limit."""
+
+
+def encode_job(fn, args: tuple, kwargs: dict) -> bytes:
+    """Serialize a job into the compact form sent to a worker."""
+    return zlib.compress(pickle.dumps((fn, args, kwargs), protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def decode_job(payload: bytes) -> Tuple[Any, tuple, dict]:
+    return pickle.loads(zlib.decompress(payload))
+
+
+def _apply_limits(memory_limit_mb: Optional[int], cpu_limit: Optional[float]):
+    """Lower this process's soft limits for one job and return the previous ones."""
+    if resource is None:
+        return None
+    previous = (resource.getrlimit(resource.RLIMIT_AS), resource.getrlimit(resource.RLIMIT_CPU))
+    if memory_limit_mb:
+        soft, hard = previous[0]
+        limit = memory_limit_mb * 1024 * 1024
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+    if cpu_limit:
+        # RLIMIT_CPU counts the whole life of the process, so add to what is used already
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        soft, hard = previous[1]
+        limit = int(usage.ru_utime + usage.ru_stime + cpu_limit) + 1
+        if hard != resource.RLIM_INFINITY:
+            limit = min(limit, hard)
+        resource.setrlimit(resource.RLIMIT_CPU, (limit, hard))
+    return previous
+
+
+def _restore_limits(previous) -> None:
+    if previous is None:
+        return
+    resource.setrlimit(resource.RLIMIT_AS, previous[0])
+    resource.setrlimit(resource.RLIMIT_CPU, previous[1])
+
+
+def _out_of_memory(value: Any) -> bool:
+    """Whether a job result reports a failed allocation (e.g. Clingo's std::bad_alloc)."""
+    error = getattr(value, "error", None)
+    return bool(error) and ("bad_alloc" in error or "MemoryError" in error)
+
+
+def _worker_main(conn, memory_limit_mb: Optional[int], cpu_limit: Optional[float]) -> None:
+    """Serve jobs from `conn` until the parent closes it."""
+    # Let the parent decide when workers stop; Ctrl-C goes to the server only.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            payload = conn.recv_bytes()
+        except (EOFError, OSError):
+            return
+        recycle = False
+        previous = _apply_limits(memory_limit_mb, cpu_limit)
+        try:
+            fn, args, kwargs = decode_job(payload)
+            ok, value = True, fn(*args, **kwargs)
+            recycle = _out_of_memory(value)
+        except MemoryError:
+            ok, value, recycle = False, WorkerLimitError("Solver worker exceeded its memory limit"), True
+        except BaseException as e:
+            ok, value = False, e
+        finally:
+            _restore_limits(previous)
+        try:
+            response = pickle.dumps((ok, value, recycle), protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            response = pickle.dumps((False, RuntimeError(f"{type(value).__name__}: {value}"), recycle))
+        conn.send_bytes(zlib.compress(response))
+        if recycle:
+            return
+
+
+class _Worker:
+    def __init__(self, ctx, memory_limit_mb: Optional[int], cpu_limit: Optional[float]):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, memory_limit_mb, cpu_limit),
+            name="savanty-clingo-worker", daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+def _default_context():
+    if sys.platform.startswith("linux"):
+        ctx = multiprocessing.get_context("forkserver")
+        # Import the solver once in the fork server so every worker starts warm.
+        ctx.set_forkserver_preload(["savanty.solver"])
+        return ctx
+    return multiprocessing.get_context("spawn")
+
+
+class IsolatedExecutor(Executor):
+    """Executor that runs each job in a pre-started, resource-limited worker process.
+
+    Each job gets `memory_limit_mb` of address space (RLIMIT_AS), `cpu_limit`
+    seconds of CPU (RLIMIT_CPU) and `timeout` seconds of wall-clock time. A
+    worker that overruns is killed and replaced and the job fails with
+    `WorkerLimitError`, leaving the calling process untouched. Jobs and
+    results cross the process boundary as compressed pickles, so functions
+    must be importable module-level callables.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, memory_limit_mb: Optional[int] = None,
+                 cpu_limit: Optional[float] = None, timeout: Optional[float] = None, ctx=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.memory_limit_mb = memory_limit_mb
+        self.cpu_limit = cpu_limit
+        self.timeout = timeout
+        self._ctx = ctx or _default_context()
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self.respawns = 0
+        for _ in range(self.max_workers):
+            self._idle.put(self._spawn())
+        self._dispatch = ThreadPoolExecutor(max_workers=self.max_workers,
+                                            thread_name_prefix="savanty-isolated")
+
+    def _spawn(self) -> _Worker:
+        return _Worker(self._ctx, self.memory_limit_mb, self.cpu_limit)
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new jobs after shutdown")
+            return self._dispatch.submit(self._run, encode_job(fn, args, kwargs))
+
+    def _run(self, payload: bytes) -> Any:
+        worker = self._idle.get()
+        healthy = False
+        try:
+            try:
+                worker.conn.send_bytes(payload)
+                if not worker.conn.poll(self.timeout):
+                    raise WorkerLimitError(f"Solver worker exceeded its time limit of {self.timeout}s")
+                response = worker.conn.recv_bytes()
+            except (EOFError, OSError):
+                raise WorkerLimitError(self._death_reason(worker))
+            ok, value, recycle = pickle.loads(zlib.decompress(response))
+            healthy = not recycle
+            if ok:
+                return value
+            raise value
+        finally:
+            if not healthy:
+                worker.kill()
+                with self._lock:
+                    self.respawns += 1
+                    replace = not self._shutdown
+                # Start the replacement outside the lock, so other submits need not wait for it
+                worker = self._spawn() if replace else None
+                if worker is not None:
+                    with self._lock:
+                        if self._shutdown:
+                            # Shut down while it started: nobody will collect it from the idle queue
+                            worker.kill()
+                            worker = None
+            if worker is not None:
+                self._idle.put(worker)
+
+    def _death_reason(self, worker: _Worker) -> str:
+        worker.process.join(1)
+        if worker.process.exitcode == -signal.SIGXCPU:
+            return f"Solver worker exceeded its CPU limit of {self.cpu_limit}s"
+        if worker.process.exitcode == -signal.SIGKILL:
+            return "Solver worker was killed, most likely for exceeding its memory limit"
+        return f"Solver worker died unexpectedly (exit code {worker.process.exitcode})"
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._lock:
+            self._shutdown = True
+        self._dispatch.shutdown(wait=wait, cancel_futures=cancel_futures)
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                break
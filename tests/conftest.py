@@ -0,0 +1,62 @@
+"""Shared pytest fixtures."""
+
+import pytest
+from savanty.cache import reset_program_cache
+from savanty.problem_templates import reset_template_store
+from savanty.session_store import reset_session_store
+from savanty.coalesce import reset_single_flights
+from savanty.scheduler import reset_schedulers
+from savanty.transcripts import reset_transcript
+
+
+@pytest.fixture(autouse=True)
+def isolated_program_cache(tmp_path, monkeypatch):
+    """Point the program cache at a per-test directory."""
+    monkeypatch.setenv("SAVANTY_CACHE_DIR", str(tmp_path / "program-cache"))
+    reset_program_cache()
+    yield
+    reset_program_cache()
+
+
+@pytest.fixture(autouse=True)
+def isolated_template_store(tmp_path, monkeypatch):
+    """Point the template store at a per-test directory."""
+    monkeypatch.setenv("SAVANTY_TEMPLATE_DIR", str(tmp_path / "templates"))
+    reset_template_store()
+    yield
+    reset_template_store()
+
+
+@pytest.fixture(autouse=True)
+def isolated_session_store(tmp_path, monkeypatch):
+    """Give every test fresh session stores."""
+    monkeypatch.setenv("SAVANTY_SESSION_DB", str(tmp_path / "sessions.db"))
+    reset_session_store()
+    yield
+    reset_session_store()
+
+
+@pytest.fixture(autouse=True)
+def fresh_single_flights():
+    """Start every test with zeroed coalescing counters."""
+    reset_single_flights()
+    yield
+
+
+@pytest.fixture(autouse=True)
+def fresh_schedulers():
+    """Give every test its own LLM schedulers, built from its environment."""
+    reset_schedulers()
+    yield
+    reset_schedulers()
+
+
+@pytest.fixture(autouse=True)
+def no_transcript(monkeypatch):
+    """Run without an LM transcript unless a test configures one."""
+    # Set rather than deleted, so values the CLI writes are undone too
+    monkeypatch.setenv("SAVANTY_TRANSCRIPT", "")
+    monkeypatch.setenv("SAVANTY_TRANSCRIPT_MODE", "replay")
+    reset_transcript()
+    yield
+    reset_transcript()
@@ -0,0 +1,159 @@
+"""Tests for batch solving of JSONL problem files."""
+
+import asyncio
+import json
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from click.testing import CliRunner
+from savanty.batch import parse_problem_stream, parse_problems, read_checkpoint, run_batch, solve_batch
+from savanty.bench import make_problem
+from savanty.pool import WorkerPool
+
+
+KNAPSACK = make_problem("knapsack", 5)
+
+
+def fake_compile(description, additional_info=""):
+    if "broken" in description:
+        raise ValueError("Error in DSPy processing: no model")
+    return KNAPSACK.program_components
+
+
+def write_problems(path, problems):
+    path.write_text("".join(json.dumps(problem) + "\n" for problem in problems))
+
+
+def test_parse_problems():
+    """Test that problems get line-number ids by default and invalid lines become error records."""
+    lines = ['{"id": "a", "problem_description": "x"}\n', "\n", '{"problem_description": "y"}\n', "[1]\n"]
+
+    problems = list(parse_problems(lines))
+
+    assert [problem["id"] for problem in problems] == ["a", 3, 4]
+    assert problems[2]["error"].startswith("Line 4 is not a valid problem")
+
+
+def test_parse_problem_stream_splits_chunks():
+    """Test that a byte stream is split into problems across chunk boundaries."""
+    async def chunks():
+        for chunk in [b'{"id": 1, "problem_', b'description": "x"}\n{"problem_desc', b'ription": "y"}']:
+            yield chunk
+
+    async def collect():
+        return [problem async for problem in parse_problem_stream(chunks())]
+
+    assert asyncio.run(collect()) == [{"id": 1, "problem_description": "x"},
+                                      {"id": 2, "problem_description": "y"}]
+
+
+def test_read_checkpoint_retries_errors_and_drops_a_torn_line(tmp_path):
+    """Test that the checkpoint skips solved ids only and truncates a torn last line."""
+    out = tmp_path / "results.jsonl"
+    out.write_text('{"id": 1, "error": null}\n{"id": "2", "error": "boom"}\n'
+                   '{"id": 3, "error": "boom"}\n{"id": 3, "error": null}\n{"id": 4, "err')
+
+    assert read_checkpoint(str(out)) == {"1", "3"}
+    assert out.read_text().endswith('{"id": 3, "error": null}\n')
+    assert read_checkpoint(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_solve_batch_bounds_concurrency_and_yields_in_completion_order():
+    """Test that a batch solves at most `concurrency` problems at once and yields them as they finish."""
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow_compile(description, additional_info=""):
+        with lock:
+            running.append(description)
+            peak.append(len(running))
+        time.sleep({"slow": 0.2, "fast": 0.01}[description.split()[0]])
+        with lock:
+            running.remove(description)
+        return KNAPSACK.program_components
+
+    problems = [{"id": index, "problem_description": f"{speed} {index}"}
+                for index, speed in enumerate(["slow", "fast", "fast", "fast"])]
+    pool = WorkerPool("test-batch", kind="thread", max_workers=2)
+
+    async def collect():
+        return [record async for record in solve_batch(iter(problems), concurrency=2, skip=["3"],
+                                                        solve_pool=pool, defaults={"time_limit": 5})]
+
+    with patch("savanty.batch.validate_and_parse_problem", side_effect=slow_compile):
+        records = asyncio.run(collect())
+    pool.shutdown()
+
+    assert [record["id"] for record in records] == [1, 2, 0]
+    assert max(peak) == 2
+    assert all(record["error"] is None and record["cost"] for record in records)
+
+
+@patch("savanty.batch.validate_and_parse_problem", side_effect=fake_compile)
+def test_run_batch_resumes_from_the_output_file(mock_compile, tmp_path):
+    """Test that a rerun skips problems already solved in the output file and retries errors."""
+    source = tmp_path / "problems.jsonl"
+    out = tmp_path / "results.jsonl"
+    write_problems(source, [{"id": "a", "problem_description": "pack a"},
+                            {"id": "b", "problem_description": "broken b"},
+                            {"id": "c", "problem_description": "pack c", "facts": ["item(extra, 1, 1)"]},
+                            {"id": "d"}])
+
+    counts = run_batch(str(source), str(out), concurrency=2)
+
+    assert counts == {"skipped": 0, "solved": 2, "needs_more_info": 0, "errors": 2}
+    records = {record["id"]: record for record in map(json.loads, out.read_text().splitlines())}
+    assert records["d"]["error"] == "problem_description is required"
+    assert "item(extra,1,1)" not in records["a"]["solution"]
+
+    write_problems(source, [{"id": "a", "problem_description": "pack a"},
+                            {"id": "b", "problem_description": "pack b"},
+                            {"id": "c", "problem_description": "pack c"},
+                            {"id": "d", "problem_description": "pack d"}])
+    mock_compile.reset_mock()
+    counts = run_batch(str(source), str(out))
+
+    assert counts == {"skipped": 2, "solved": 2, "needs_more_info": 0, "errors": 0}
+    assert sorted(call.args[0] for call in mock_compile.call_args_list) == ["pack b", "pack d"]
+    assert len(out.read_text().splitlines()) == 6
+
+
+@patch("savanty.batch.validate_and_parse_problem", side_effect=fake_compile)
+def test_batch_cli(mock_compile, tmp_path):
+    """Test that --batch reports each problem and exits with 1 when any failed."""
+    from savanty.cli import main
+
+    source = tmp_path / "problems.jsonl"
+    out = tmp_path / "results.jsonl"
+    write_problems(source, [{"id": "a", "problem_description": "pack a"},
+                            {"id": "b", "problem_description": "broken b"}])
+
+    result = CliRunner().invoke(main, ['--batch', str(source), '--out', str(out), '--solve-pool', 'thread',
+                                       '--time-limit', '5'])
+    assert result.exit_code == 1
+    assert "a: solved in" in result.output
+    assert "Solved 1, needs more information 0, errors 1, skipped 0" in result.output
+
+    result = CliRunner().invoke(main, ['--batch', str(source)])
+    assert result.exit_code == 2
+    assert "--batch requires --out" in result.output
+
+
+@patch("savanty.batch.validate_and_parse_problem", side_effect=fake_compile)
+def test_solve_batch_endpoint_streams_ndjson(mock_compile):
+    """Test that /solve/batch streams one JSON result per line and honours `skip`."""
+    from fastapi.testclient import TestClient
+    from savanty.server import create_app
+
+    body = "\n".join(json.dumps({"id": name, "problem_description": f"{name} items"})
+                     for name in ["pack", "broken", "skipped"])
+    response = TestClient(create_app()).post("/solve/batch?concurrency=2&skip=skipped", content=body)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    records = {record["id"]: record for record in map(json.loads, response.text.splitlines())}
+    assert set(records) == {"pack", "broken"}
+    assert records["pack"]["cost"]
+    assert "no model" in records["broken"]["error"]
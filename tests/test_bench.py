@@ -0,0 +1,88 @@
+"""Tests for the offline benchmark harness."""
+
+import json
+import pytest
+from click.testing import CliRunner
+from savanty.bench import FAMILIES, compare_results, make_problem, percentiles, run_benchmark
+from savanty.stand_in_lm import StandInLM, stand_in_lm
+from savanty.solver import run_pipeline, solve_program
+
+
+@pytest.mark.parametrize("pipeline", ["staged", "fused"])
+def test_stand_in_lm_replays_stage_outputs(pipeline):
+    """Test that the stand-in LM makes both pipelines produce the family's program."""
+    problem = make_problem("knapsack", 5)
+
+    with stand_in_lm(StandInLM(problem.responses())):
+        prediction = run_pipeline(problem.description, pipeline=pipeline)
+
+    assert not prediction.needs_more_info
+    assert prediction.components == problem.program_components
+
+
+@pytest.mark.parametrize("family", sorted(FAMILIES))
+def test_families_are_deterministic_and_solvable(family):
+    """Test that each family generates the same instance for a seed and that it solves."""
+    problem = make_problem(family, 6)
+
+    assert make_problem(family, 6) == problem
+    assert make_problem(family, 6, seed=1) != problem
+    result = solve_program(problem.program_components)
+    assert result.error is None
+    assert result.solution
+
+
+def test_percentiles_use_nearest_rank():
+    """Test that percentiles use the nearest-rank method."""
+    stats = percentiles([float(value) for value in range(1, 101)])
+
+    assert (stats["p50"], stats["p95"], stats["p99"], stats["max"]) == (50.0, 95.0, 99.0, 100.0)
+    assert stats["mean"] == 50.5
+    assert percentiles([0.2])["p99"] == 0.2
+
+
+def test_run_benchmark_reports_single_and_http_runs():
+    """Test that a benchmark run reports stage latencies for single and HTTP runs."""
+    data = run_benchmark(families=["knapsack"], sizes=[5], repeat=3, concurrency=2, http_requests=4,
+                         lm_latency=0.01)
+
+    single, http = data["results"]
+    assert (single["mode"], single["runs"], single["errors"]) == ("single", 3, 0)
+    assert (http["mode"], http["runs"], http["errors"]) == ("http", 4, 0)
+    for entry in data["results"]:
+        assert set(entry["latency"]) == {"total", "pipeline", "load_facts", "ground", "solve"}
+        # Two staged LM calls (validate, analyze) plus generate, at 10 ms each
+        assert entry["latency"]["pipeline"]["p50"] >= 0.03
+        assert entry["throughput"] > 0
+    assert data["meta"]["lm_latency"] == 0.01
+    json.dumps(data)
+
+
+def test_compare_results_flags_slowdowns():
+    """Test that only slowdowns beyond the tolerance are reported as regressions."""
+    def results(p95, throughput):
+        return {"results": [{"family": "knapsack", "size": 5, "mode": "single", "throughput": throughput,
+                             "latency": {"total": {"p95": p95}, "ground": {"p95": 0.001}}}]}
+
+    assert compare_results(results(0.1, 10.0), results(0.11, 9.0)) == []
+    regressions = compare_results(results(0.1, 10.0), results(0.2, 5.0))
+    assert regressions == ["knapsack/5/single total p95 100.0 ms -> 200.0 ms",
+                           "knapsack/5/single throughput 10.00/s -> 5.00/s"]
+
+
+def test_bench_command(tmp_path):
+    """Test that `savanty bench` writes results and compares them with a baseline."""
+    from savanty.cli import main
+
+    out = tmp_path / "bench.json"
+    result = CliRunner().invoke(main, ['bench', '--family', 'graph_coloring', '--sizes', '5',
+                                       '--repeat', '1', '--concurrency', '0', '--out', str(out)])
+    assert result.exit_code == 0, result.output
+    assert "graph_coloring" in result.output
+    assert json.loads(out.read_text())["results"][0]["mode"] == "single"
+
+    result = CliRunner().invoke(main, ['bench', '--family', 'graph_coloring', '--sizes', '5',
+                                       '--repeat', '1', '--concurrency', '0', '--baseline', str(out),
+                                       '--tolerance', '100'])
+    assert result.exit_code == 0, result.output
+    assert "No regressions" in result.output
@@ -0,0 +1,77 @@
+"""Tests for the program components cache."""
+
+import os
+import time
+from unittest.mock import patch, MagicMock
+from savanty.cache import ProgramCache, normalize_text
+from savanty.solver import validate_and_parse_problem
+
+
+COMPONENTS = {"predicates": [], "facts": ["item(a)"], "constraints": [], "optimize": ""}
+
+
+def test_make_key_ignores_whitespace():
+    """Test that formatting-only differences map to the same key."""
+    key1 = ProgramCache.make_key("Minimize  x\n subject to x>=0", None, "m", "sig")
+    key2 = ProgramCache.make_key("Minimize x subject to x>=0", "", "m", "sig")
+    assert key1 == key2
+    assert normalize_text("  a \n b ") == "a b"
+
+
+def test_make_key_depends_on_model_and_signatures():
+    """Test that the key changes with the model and the signature definitions."""
+    base = ProgramCache.make_key("p", None, "m1", "sig")
+    assert base != ProgramCache.make_key("p", None, "m2", "sig")
+    assert base != ProgramCache.make_key("p", None, "m1", "sig2")
+    assert base != ProgramCache.make_key("p", "more", "m1", "sig")
+
+
+def test_get_set_and_counters(tmp_path):
+    """Test storing, retrieving and counting hits and misses."""
+    cache = ProgramCache(directory=str(tmp_path))
+    assert cache.get("ab" * 32) is None
+    cache.set("ab" * 32, COMPONENTS)
+    assert cache.get("ab" * 32) == COMPONENTS
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+
+def test_ttl_expiry(tmp_path):
+    """Test that expired entries are treated as misses and removed."""
+    cache = ProgramCache(directory=str(tmp_path), ttl=10)
+    cache.set("cd" * 32, COMPONENTS)
+    with patch('savanty.cache.time.time', return_value=time.time() + 60):
+        assert cache.get("cd" * 32) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_eviction_and_invalidation(tmp_path):
+    """Test size-based eviction of the oldest entries and explicit invalidation."""
+    cache = ProgramCache(directory=str(tmp_path), max_entries=2)
+    keys = [f"{i:02d}" * 32 for i in range(3)]
+    for i, key in enumerate(keys):
+        cache.set(key, COMPONENTS)
+        os.utime(cache._path(key), (i, i))
+    cache.set("ff" * 32, COMPONENTS)
+    assert cache.stats()["entries"] == 2
+    assert cache.get(keys[0]) is None
+    assert cache.invalidate("ff" * 32)
+    assert not cache.invalidate("ff" * 32)
+    assert cache.clear() == 1
+
+
+def test_validate_and_parse_problem_uses_cache():
+    """Test that a repeated problem skips the DSPy pipeline."""
+    mock_result = MagicMock()
+    mock_result.needs_more_info = False
+    mock_result.program.program_components = '{"predicates": [], "facts": [], "constraints": [], "optimize": ""}'
+
+    with patch('savanty.dspy_modules.InteractiveProblemSolver') as mock_problem_solver:
+        mock_problem_solver.return_value.forward.return_value = mock_result
+        first = validate_and_parse_problem("Minimize x")
+        second = validate_and_parse_problem("Minimize   x")
+
+    assert first == second
+    assert mock_problem_solver.return_value.forward.call_count == 1
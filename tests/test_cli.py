@@ -1,5 +1,6 @@
 """Tests for the CLI interface."""
 
+import os
 import pytest
 from click.testing import CliRunner
 from unittest.mock import patch, MagicMock
@@ -24,9 +25,10 @@ def test_cli_without_args():
     assert 'Savanty:' in result.output
 
 
-@patch('savanty.cli.solve_optimization_problem')
-def test_cli_with_problem(mock_solve):
+@patch('savanty.cli.SolveSession')
+def test_cli_with_problem(mock_session):
     """Test that the CLI can solve a problem."""
+    mock_solve = mock_session.return_value.solve
     # Mock the solver to return a successful result
     mock_result = ProblemSolverResult(solution="Solution found")
     mock_solve.return_value = mock_result
@@ -36,12 +38,14 @@ def test_cli_with_problem(mock_solve):
     
     assert result.exit_code == 0
     assert 'Solution found' in result.output
-    mock_solve.assert_called_once_with('Minimize x+y subject to x>=0, y>=0', '')
+    mock_session.assert_called_once_with('Minimize x+y subject to x>=0, y>=0')
+    mock_solve.assert_called_once_with('')
 
 
-@patch('savanty.cli.solve_optimization_problem')
-def test_cli_with_invalid_problem(mock_solve):
+@patch('savanty.cli.SolveSession')
+def test_cli_with_invalid_problem(mock_session):
     """Test that the CLI handles invalid problems gracefully."""
+    mock_solve = mock_session.return_value.solve
     # Mock the solver to return an error result
     mock_result = ProblemSolverResult(error="Invalid problem")
     mock_solve.return_value = mock_result
@@ -53,4 +57,101 @@ def test_cli_with_invalid_problem(mock_solve):
     assert 'Error:' in result.output
 
 
-@patch('savanty.cli.solve_optimization_problem')\ndef test_cli_with_needs_info_problem(mock_solve):\n    \"\"\"Test that the CLI handles problems that need more info.\"\"\"\n    # Mock the solver to first return needs more info, then a solution\n    mock_result1 = ProblemSolverResult(needs_more_info=True, questions=[\"What is the objective?\"])\n    mock_result2 = ProblemSolverResult(solution=\"Solution found\")\n    \n    mock_solve.side_effect = [mock_result1, mock_result2]\n    \n    runner = CliRunner()\n    result = runner.invoke(main, ['-p', 'Solve something'], input='Minimize x\\n')\n    \n    assert result.exit_code == 0\n    assert 'I need more information' in result.output\n    assert 'Solution found' in result.output\n    assert mock_solve.call_count == 2
\ No newline at end of file
+@patch('savanty.cli.SolveSession')
+def test_cli_with_needs_info_problem(mock_session):
+    """Test that the CLI handles problems that need more info."""
+    mock_solve = mock_session.return_value.solve
+    # Mock the solver to first return needs more info, then a solution
+    mock_result1 = ProblemSolverResult(needs_more_info=True, questions=["What is the objective?"])
+    mock_result2 = ProblemSolverResult(solution="Solution found")
+    
+    mock_solve.side_effect = [mock_result1, mock_result2]
+    
+    runner = CliRunner()
+    result = runner.invoke(main, ['-p', 'Solve something'], input='Minimize x\n')
+    
+    assert result.exit_code == 0
+    assert 'I need more information' in result.output
+    assert 'Solution found' in result.output
+    assert mock_solve.call_count == 2
+    assert mock_solve.call_args.args == ('Minimize x',)
+
+
+@patch('savanty.cli.SolveSession')
+def test_cli_stream_and_time_limit(mock_session):
+    """Test that --stream prints improving models and --time-limit is passed on."""
+    mock_solve = mock_session.return_value.solve
+    def fake_solve(additional_info, **kwargs):
+        kwargs["on_model"]({"models": 1, "cost": [5], "atoms": {}, "elapsed": 0.1})
+        assert kwargs["options"].time_limit == 2.0
+        return ProblemSolverResult(solution="p", cost=[5], optimal=False, models=1)
+    mock_solve.side_effect = fake_solve
+
+    runner = CliRunner()
+    result = runner.invoke(main, ['-p', 'Minimize x', '--stream', '--time-limit', '2'])
+
+    assert result.exit_code == 0
+    assert 'Model 1: cost [5]' in result.output
+    assert 'not proven optimal' in result.output
+
+
+@patch('savanty.cli.SolveSession')
+def test_cli_solver_threads(mock_session):
+    """Test that thread and strategy options reach the solver and are validated."""
+    mock_solve = mock_session.return_value.solve
+    mock_solve.return_value = ProblemSolverResult(solution="p")
+
+    runner = CliRunner()
+    result = runner.invoke(main, ['-p', 'Minimize x', '--threads', 'auto', '--parallel-mode', 'split',
+                                  '--opt-strategy', 'usc'])
+    assert result.exit_code == 0
+    options = mock_solve.call_args.kwargs["options"]
+    assert options.threads == "auto"
+    assert options.parallel_mode == "split"
+
+    result = runner.invoke(main, ['-p', 'Minimize x', '--threads', '0'])
+    assert result.exit_code == 2
+
+
+@patch('savanty.cli.solve_template')
+@patch('savanty.cli.compile_template')
+def test_cli_templates(mock_compile, mock_solve_template):
+    """Test --save-template and --template with inline facts."""
+    from savanty.problem_templates import ProblemTemplate
+
+    mock_compile.return_value = ProblemTemplate("pick", 1, {"predicates": [], "constraints": [], "optimize": ""})
+    mock_solve_template.return_value = ProblemSolverResult(solution="pick(b)")
+
+    runner = CliRunner()
+    result = runner.invoke(main, ['-p', 'Pick the best item', '--save-template', 'pick'])
+    assert result.exit_code == 0
+    assert 'Saved template pick@1' in result.output
+    mock_compile.assert_called_once_with('Pick the best item', '', 'pick')
+
+    result = runner.invoke(main, ['--template', 'pick', '--fact', 'item(b,5)'])
+    assert result.exit_code == 0
+    assert 'pick(b)' in result.output
+    assert mock_solve_template.call_args.args == ('pick',)
+    assert mock_solve_template.call_args.kwargs["facts"] == ['item(b,5)']
+
+
+def test_cli_startup_skips_heavy_imports(tmp_path):
+    """Test that --help and template solves never import dspy, FastAPI or fastmcp."""
+    import subprocess
+    import sys
+    from savanty.problem_templates import TemplateStore
+
+    TemplateStore(str(tmp_path)).save({"predicates": [], "facts": [], "constraints": ["{ a }."],
+                                       "optimize": "#maximize { 1 : a }."}, template_id="pick")
+    script = (
+        "import sys\n"
+        "from click.testing import CliRunner\n"
+        "from savanty.cli import main\n"
+        "assert CliRunner().invoke(main, ['--help']).exit_code == 0\n"
+        "result = CliRunner().invoke(main, ['--template', 'pick'])\n"
+        "assert 'Solution found' in result.output, result.output\n"
+        "print(sorted(m for m in ('dspy', 'fastapi', 'uvicorn', 'pydantic', 'fastmcp') if m in sys.modules))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True,
+                            env=dict(os.environ, SAVANTY_TEMPLATE_DIR=str(tmp_path)))
+    assert output.stdout.strip() == "[]"
@@ -0,0 +1,107 @@
+"""Tests for single-flight request coalescing."""
+
+import asyncio
+import threading
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+from savanty.coalesce import SingleFlight, coalesce_key, get_single_flight, reset_single_flights
+from savanty.solver import ProblemSolverResult, SolverOptions, solve_optimization_problem
+
+
+def test_coalesce_key_normalizes_whitespace():
+    """Test that keys ignore whitespace differences but not other inputs."""
+    assert coalesce_key("Minimize  x\n", "", {"a": 1}) == coalesce_key("Minimize x", "", {"a": 1})
+    assert coalesce_key("Minimize x", "", {"a": 1}) != coalesce_key("Minimize x", "", {"a": 2})
+
+
+def test_concurrent_threads_share_one_call():
+    """Test that concurrent callers with one key share a single call, without caching it."""
+    group = SingleFlight()
+    calls = []
+    started = threading.Event()
+
+    def slow(value):
+        calls.append(value)
+        started.set()
+        time.sleep(0.2)
+        return value * 2
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        leader = executor.submit(group.do, "k", slow, 21)
+        started.wait()
+        followers = [executor.submit(group.do, "k", slow, 21) for _ in range(4)]
+        results = [leader.result()] + [future.result() for future in followers]
+
+    assert results == [42] * 5
+    assert calls == [21]
+    assert group.stats() == {"calls": 5, "coalesced": 4, "in_flight": 0}
+
+    # Finished calls are not cached
+    assert group.do("k", slow, 1) == 2
+    assert calls == [21, 1]
+
+
+def test_errors_reach_every_caller():
+    """Test that the leader's exception is raised in every waiting caller."""
+    group = SingleFlight()
+    started = threading.Event()
+
+    def failing():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        leader = executor.submit(group.do, "k", failing)
+        started.wait()
+        follower = executor.submit(group.do, "k", failing)
+        for future in (leader, follower):
+            with pytest.raises(ValueError):
+                future.result()
+
+
+def test_async_callers_survive_leader_cancellation():
+    """Test that cancelling the leading coroutine does not cancel its followers."""
+    group = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        leader = asyncio.ensure_future(group.do_async("k", compute))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(group.do_async("k", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(scenario()) == "done"
+    assert calls == [1]
+    assert group.coalesced == 1
+
+
+@patch('savanty.solver.validate_and_parse_problem')
+def test_solve_optimization_problem_coalesces(mock_validate):
+    """Test that identical concurrent solves run the pipeline once."""
+    reset_single_flights()
+
+    def slow_compile(description, additional_info, lm=None):
+        time.sleep(0.2)
+        return {"predicates": [], "facts": ["a"], "constraints": [], "optimize": ""}
+    mock_validate.side_effect = slow_compile
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [executor.submit(solve_optimization_problem, "Find a  model", "") for _ in range(3)]
+        futures.append(executor.submit(solve_optimization_problem, "Find a model", "",
+                                       options=SolverOptions(time_limit=5)))
+        results = [future.result() for future in futures]
+
+    assert all(result.atoms == {"a": [[]]} for result in results)
+    # The request with different options was solved separately
+    assert mock_validate.call_count == 2
+    assert get_single_flight("solve").coalesced == 2
@@ -0,0 +1,172 @@
+"""Tests for the DSPy pipeline modules."""
+
+import asyncio
+import pytest
+import dspy
+from savanty.dspy_modules import (
+    InteractiveProblemSolver,
+    FusedProblemSolver,
+    FUSED_PIPELINE_SIGNATURES,
+    gaps_likely,
+    program_components_errors,
+    signature_fingerprint,
+)
+
+
+class FakeStage:
+    """Stand-in for a dspy.Predict stage that records sync and async calls."""
+
+    def __init__(self, log, name, delay=0.0, **outputs):
+        self.log = log
+        self.name = name
+        self.delay = delay
+        self.outputs = outputs
+
+    def __call__(self, **kwargs):
+        self.log.append(self.name)
+        return dspy.Prediction(**self.outputs)
+
+    async def acall(self, **kwargs):
+        self.log.append(self.name)
+        await asyncio.sleep(self.delay)
+        return dspy.Prediction(**self.outputs)
+
+
+def make_solver(speculative, is_valid="True", has_gaps="False"):
+    log = []
+    solver = InteractiveProblemSolver(speculative=speculative)
+    solver.refine = FakeStage(log, "refine", refined_problem="refined")
+    solver.validate = FakeStage(log, "validate", delay=0.01, is_valid=is_valid, reason="r")
+    solver.identify_gaps = FakeStage(log, "identify_gaps", has_gaps=has_gaps, gaps="g", questions="q")
+    solver.analyze = FakeStage(log, "analyze", analysis="a")
+    solver.generate = FakeStage(log, "generate", program_components="{}")
+    return solver, log
+
+
+def test_gaps_likely():
+    """Test the heuristic used to start gap identification early."""
+    assert gaps_likely("Solve a scheduling problem")
+    long_problem = " ".join(["task"] * 30) + " with capacity 10"
+    assert not gaps_likely(long_problem)
+
+
+def test_signature_fingerprint_is_stable():
+    """Test that the fingerprint is deterministic."""
+    assert signature_fingerprint() == signature_fingerprint()
+
+
+@pytest.mark.parametrize("speculative", [False, True])
+def test_forward_modes_agree(speculative):
+    """Test that speculative and sequential modes return the same stage results."""
+    solver, log = make_solver(speculative)
+    result = solver.forward("Minimize x", additional_info="x >= 0")
+    assert not result.needs_more_info
+    assert result.analysis.analysis == "a"
+    assert result.program.program_components == "{}"
+    assert log[0] == "refine"
+    assert log.count("generate") == 1
+
+
+def test_speculative_starts_analysis_before_validation_finishes():
+    """Test that analyze is issued concurrently with validate."""
+    solver, log = make_solver(True)
+    solver.forward("Minimize x")
+    assert log.index("analyze") < log.index("generate")
+    assert set(log[:2]) == {"validate", "analyze"}
+
+
+def test_speculative_needs_more_info_discards_analysis():
+    """Test that an invalid problem returns gap questions and never generates."""
+    solver, log = make_solver(True, is_valid="False", has_gaps="True")
+    result = solver.forward("Solve a scheduling problem")
+    assert result.needs_more_info
+    assert result.questions == "q"
+    assert "generate" not in log
+
+
+def test_speculative_invalid_without_gaps_raises():
+    """Test that an invalid problem without gaps still raises."""
+    solver, _ = make_solver(True, is_valid="False", has_gaps="False")
+    with pytest.raises(ValueError):
+        solver.forward("Solve a scheduling problem")
+
+
+def test_speculative_inside_an_event_loop_warns_and_runs_sequentially(monkeypatch):
+    """Test that the sequential fallback inside a running loop is visible."""
+    from savanty import dspy_modules
+    from savanty.metrics import get_metrics
+
+    monkeypatch.setattr(dspy_modules, "_warned_speculative_fallback", False)
+    solver, log = make_solver(True)
+
+    async def call_twice():
+        solver.forward("Minimize x")
+        solver.forward("Minimize x")
+
+    with pytest.warns(RuntimeWarning, match="acall") as warned:
+        asyncio.run(call_twice())
+
+    assert len(warned) == 1
+    assert log[:2] == ["validate", "analyze"]
+    assert "savanty_speculative_fallbacks_total" in get_metrics().render()
+
+
+VALID_COMPONENTS = '{"predicates": [{"name": "Item", "fields": {"name": "ConstantField"}}], "facts": ["item(a)"], "constraints": [], "optimize": ""}'
+
+
+def make_fused_solver(**outputs):
+    log = []
+    fields = dict(is_valid="True", reason="r", has_gaps="False", questions="[]",
+                  analysis="a", program_components=VALID_COMPONENTS)
+    fields.update(outputs)
+    solver = FusedProblemSolver()
+    solver.compile = FakeStage(log, "compile", **fields)
+    staged, staged_log = make_solver(False)
+    solver.staged = staged
+    return solver, log, staged_log
+
+
+def test_program_components_errors():
+    """Test schema validation of program components."""
+    import json
+    assert program_components_errors(json.loads(VALID_COMPONENTS)) == []
+    assert program_components_errors([]) == ["program components must be a JSON object"]
+    errors = program_components_errors({"predicates": [{"name": "p"}], "facts": "p(1)"})
+    assert "predicate p must have a 'fields' object" in errors
+    assert "'facts' must be a list of strings" in errors
+    assert "'optimize' must be a string" in errors
+
+
+def test_fused_solver_single_call():
+    """Test that well-formed fused output is used without the staged pipeline."""
+    solver, log, staged_log = make_fused_solver()
+    result = solver.forward("Minimize x")
+    assert result.fused
+    assert not result.needs_more_info
+    assert result.program.program_components == VALID_COMPONENTS
+    assert log == ["compile"]
+    assert staged_log == []
+
+
+def test_fused_solver_gap_questions():
+    """Test that fused gap questions are returned as a list."""
+    solver, _, staged_log = make_fused_solver(is_valid="False", has_gaps="True",
+                                              questions='["What is the capacity?"]')
+    result = solver.forward("Knapsack")
+    assert result.needs_more_info
+    assert result.questions == ["What is the capacity?"]
+    assert staged_log == []
+
+
+def test_fused_solver_falls_back_on_schema_failure():
+    """Test that malformed fused output falls back to the staged pipeline."""
+    solver, _, staged_log = make_fused_solver(program_components="not json")
+    result = solver.forward("Minimize x")
+    assert not result.fused
+    assert result.program.program_components == "{}"
+    assert "generate" in staged_log
+
+
+def test_fused_fingerprint_differs():
+    """Test that fused and staged pipelines are cached separately."""
+    assert signature_fingerprint() != signature_fingerprint(FUSED_PIPELINE_SIGNATURES)
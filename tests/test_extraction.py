@@ -0,0 +1,108 @@
+"""Tests for extracting tabular instance data from problem descriptions."""
+
+import json
+from savanty.bench import make_problem
+from savanty.extraction import extract_tables
+from savanty.session import SolveSession
+from savanty.solver import SolverOptions, run_pipeline, solve_program
+from savanty.stand_in_lm import StandInLM, stand_in_lm
+
+
+def task_records(count, separator="; "):
+    return separator.join(f"Task{i}: duration {i % 5 + 1}, priority {i % 7}" for i in range(1, count + 1))
+
+
+def test_record_runs_are_replaced_by_a_summary():
+    """Test that a run of records becomes a table and a short summary in the text."""
+    text = f"Schedule these tasks on 2 machines. Tasks: {task_records(200)}. Maximize the total priority."
+
+    extraction = extract_tables(text)
+
+    [table] = extraction.tables
+    assert (table.predicate, table.columns, len(table.rows)) == ("task", ["id", "duration", "priority"], 200)
+    assert extraction.facts[:2] == ['task("Task1",2,1).', 'task("Task2",3,2).']
+    description = extraction.texts[0]
+    assert description.startswith("Schedule these tasks on 2 machines. Tasks: [Data table of 200 rows")
+    assert description.endswith("] Maximize the total priority.")
+    assert "task(Id,Duration,Priority)" in description and "priority (integer)" in description
+    assert "Task4:" not in description and len(description) < 500
+
+
+def test_tables_csv_and_json_blocks():
+    """Test that CSV, Markdown and JSON blocks are extracted as named tables."""
+    csv_text = "Items:\nname,value,weight\n" + "\n".join(f"i{i},{i * 3},{i % 4 + 1}" for i in range(8))
+    markdown = "Workers:\n| Worker | Cost |\n|---|---|\n" + "\n".join(f"| w{i} | {i * 2} |" for i in range(6))
+    edges = "Edges: " + json.dumps([{"from": f"n{i}", "to": f"n{i + 1}"} for i in range(7)]) + " Color them."
+
+    extraction = extract_tables(csv_text, markdown, edges)
+
+    assert [(table.predicate, table.columns, len(table.rows)) for table in extraction.tables] == [
+        ("items", ["name", "value", "weight"], 8),
+        ("workers", ["worker", "cost"], 6),
+        ("edges", ["from", "to"], 7),
+    ]
+    assert extraction.facts[0] == "items(i0,0,1)."
+    assert extraction.texts[2].endswith("] Color them.")
+
+
+def test_small_or_prose_blocks_are_kept(monkeypatch):
+    """Test that prose and short blocks are kept, names stay unique and SAVANTY_EXTRACT_TABLES=0 turns extraction off."""
+    prose = ("Choose among 6 items, each with a value and a weight, the subset of maximum total value "
+             "whose total weight is at most 8.")
+    few = f"Tasks: {task_records(4)}."
+    two_runs = f"{task_records(5)}\nMore tasks:\n{task_records(5)}"
+
+    assert extract_tables(prose, few).texts == [prose, few]
+    assert not extract_tables(prose, few).tables
+    assert [table.predicate for table in extract_tables(two_runs, task_records(6)).tables] == ["task", "task2", "task3"]
+    monkeypatch.setenv("SAVANTY_EXTRACT_TABLES", "0")
+    assert extract_tables(task_records(50)).tables == []
+
+
+def scheduling_responses():
+    components = {
+        "predicates": [],
+        "facts": ["machine(1..2)", "horizon(40)"],
+        "constraints": ["{ assign(T,M) : machine(M) } 1 :- task(T,_,_).",
+                        ":- machine(M), horizon(H), #sum { D,T : assign(T,M), task(T,D,_) } > H."],
+        "optimize": "#maximize { P,T : assign(T,_), task(T,_,P) }.",
+    }
+    responses = make_problem("scheduling", 5).responses()
+    responses["generate"] = {"program_components": components}
+    responses["analyze"] = {"analysis": "Tasks are given as task(Id,Duration,Priority) facts."}
+    return responses
+
+
+def test_run_pipeline_sends_only_the_schema_to_the_llm():
+    """Test that the LLM sees the table summary while the rows go into the program's facts."""
+    description = f"Schedule these tasks on 2 machines with 40 time units each. {task_records(300)}."
+    lm = StandInLM(scheduling_responses())
+
+    prediction = run_pipeline(description, lm=lm)
+
+    prompts = " ".join(message["content"] for call in lm.history for message in call["messages"])
+    assert "Task2" in prompts and "Task150" not in prompts
+    assert len(prediction.data_facts) == 300
+    assert prediction.components["facts"][:3] == ["machine(1..2)", "horizon(40)", 'task("Task1",2,1).']
+    result = solve_program(prediction.components, options=SolverOptions(time_limit=2))
+    assert result.error is None and len(result.atoms["assign"]) > 10
+
+
+def test_sessions_keep_extracted_rows_across_turns():
+    """Test that sessions keep extracted rows across turns and in their saved state."""
+    responses = scheduling_responses()
+    responses["refine"] = {"refined_problem": "Schedule the tasks, now on 40 time units."}
+    session = SolveSession(f"Schedule these tasks on 2 machines. {task_records(20)}.")
+
+    with stand_in_lm(StandInLM(responses)):
+        first = session.compile()
+        assert len(session.data_facts) == 20 and "Task12" not in session.refined_description
+        second = session.compile("Each machine has 40 time units.")
+        assert second["facts"] == first["facts"]
+        # A later turn's table of another shape gets a name of its own
+        deadlines = "; ".join(f"Task{i}: deadline {i * 2}" for i in range(1, 7))
+        session.compile(f"Tasks have deadlines. {deadlines}.")
+
+    assert session.data_facts[:20] == first["facts"][2:22]
+    assert session.data_facts[20:] == [f'task2("Task{i}",{i * 2}).' for i in range(1, 7)]
+    assert SolveSession.from_state(session.to_state()).data_facts == session.data_facts
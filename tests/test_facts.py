@@ -0,0 +1,78 @@
+"""Tests for bulk and streaming fact loading."""
+
+import json
+import pytest
+from clingo import Control
+from savanty.facts import (
+    format_fact,
+    format_term,
+    iter_program_chunks,
+    load_facts,
+    read_csv_facts,
+    read_fact_file,
+    read_jsonl_facts,
+)
+
+
+TASK = {"name": "Task", "fields": {"name": "ConstantField", "duration": "IntegerField", "label": "StringField"}}
+
+
+def ground_atoms(facts, chunk_size=1000):
+    ctrl = Control()
+    load_facts(ctrl, facts, chunk_size=chunk_size)
+    ctrl.ground([("base", [])])
+    return sorted(str(atom.symbol) for atom in ctrl.symbolic_atoms)
+
+
+def test_format_term():
+    """Test rendering Python values as ASP terms."""
+    assert format_term(3) == "3"
+    assert format_term("12") == "12"
+    assert format_term("task1") == "task1"
+    assert format_term("Task 1") == '"Task 1"'
+    assert format_term('say "hi"') == '"say \\"hi\\""'
+    assert format_term("abc", "StringField") == '"abc"'
+    with pytest.raises(ValueError):
+        format_term("abc", "IntegerField")
+
+
+def test_load_facts_handles_nested_and_quoted_terms():
+    """Test that facts go through Clingo's parser rather than string splitting."""
+    atoms = ground_atoms(['edge(f(1,2), g(3))', 'label(a, "x, (y)").', "p"])
+    assert atoms == ['edge(f(1,2),g(3))', 'label(a,"x, (y)")', 'p']
+
+
+def test_iter_program_chunks_streams():
+    """Test that facts are grouped into bounded chunks lazily."""
+    facts = (f"n({i})" for i in range(25))
+    chunks = list(iter_program_chunks(facts, chunk_size=10))
+    assert len(chunks) == 3
+    assert chunks[0].splitlines()[0] == "n(0)."
+    assert len(ground_atoms((f"n({i})" for i in range(25)), chunk_size=10)) == 25
+
+
+def test_read_csv_facts_uses_spec(tmp_path):
+    """Test that CSV columns are reordered and typed by the predicate spec."""
+    path = tmp_path / "task.csv"
+    path.write_text("duration,label,name\n3,Write report,t1\n2,Review,t2\n")
+    facts = list(read_csv_facts(str(path), predicates=[TASK]))
+    assert facts == ['task(t1,3,"Write report").', 'task(t2,2,"Review").']
+
+
+def test_read_jsonl_facts(tmp_path):
+    """Test the supported JSON Lines record shapes."""
+    path = tmp_path / "facts.jsonl"
+    lines = [
+        '"edge(1,2)"',
+        json.dumps({"predicate": "cap", "args": [10]}),
+        json.dumps({"name": "t1", "duration": 3, "label": "A"}),
+    ]
+    path.write_text("\n".join(lines) + "\n")
+    facts = list(read_jsonl_facts(str(path), predicate="Task", predicates=[TASK]))
+    assert facts == ["edge(1,2).", "cap(10).", 'task(t1,3,"A").']
+
+
+def test_read_fact_file_rejects_unknown_format(tmp_path):
+    """Test that unsupported extensions are rejected."""
+    with pytest.raises(ValueError):
+        read_fact_file(str(tmp_path / "facts.xlsx"))
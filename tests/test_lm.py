@@ -0,0 +1,60 @@
+"""Tests for lazily built, per-call language models."""
+
+import dspy
+import pytest
+from unittest.mock import patch
+from savanty.bench import make_problem
+from savanty.lm import get_lm, lm_context, model_name, reset_lms, resolve_lm
+from savanty.solver import program_cache_key, run_pipeline
+from savanty.stand_in_lm import StandInLM
+
+
+@pytest.fixture(autouse=True)
+def fresh_lms():
+    reset_lms()
+    yield
+    reset_lms()
+
+
+def test_get_lm_builds_each_model_once():
+    """Test that each model name is built once and then reused."""
+    with patch("dspy.LM") as mock_lm:
+        first = get_lm()
+        assert get_lm() is first
+        get_lm("openai/gpt-4o-mini")
+
+    assert [call.args[0] for call in mock_lm.call_args_list] == ["openai/gpt-4o", "openai/gpt-4o-mini"]
+
+
+def test_resolve_lm_precedence():
+    """Test that an explicit LM wins over the configured one, which wins over the default."""
+    configured = StandInLM({})
+    explicit = StandInLM({})
+
+    assert resolve_lm(explicit) is explicit
+    assert resolve_lm("openai/gpt-4o-mini").model == "openai/gpt-4o-mini"
+    with dspy.context(lm=configured):
+        assert resolve_lm() is configured
+    with dspy.context(lm=None):
+        assert resolve_lm() is get_lm()
+    assert model_name(None) == "openai/gpt-4o"
+    assert model_name("openai/gpt-4o-mini") == "openai/gpt-4o-mini"
+
+
+def test_lm_context_tracks_usage():
+    """Test that the LM context sets the LM and turns on usage tracking."""
+    lm = StandInLM({})
+    with lm_context(lm):
+        assert dspy.settings.lm is lm
+        assert dspy.settings.track_usage
+
+
+def test_run_pipeline_with_a_per_call_lm():
+    """Test that a per-call LM runs the pipeline and is part of the cache key."""
+    problem = make_problem("assignment", 3)
+
+    prediction = run_pipeline(problem.description, lm=StandInLM(problem.responses()))
+
+    assert prediction.components == problem.program_components
+    assert (program_cache_key(problem.description, lm="openai/gpt-4o-mini")
+            != program_cache_key(problem.description))
@@ -0,0 +1,114 @@
+"""Tests for the MCP tools and background jobs."""
+
+import asyncio
+import threading
+import time
+from unittest.mock import patch
+from savanty.bench import make_problem
+from savanty.jobs import JobRegistry
+from savanty.mcp_server import SavantyTools
+from savanty.pool import get_pool
+
+
+KNAPSACK = make_problem("knapsack", 5)
+
+# Pigeonhole: 13 pigeons in 12 holes, which Clingo takes very long to refute
+PIGEONHOLE = {
+    "predicates": [],
+    "facts": ["pigeon(1..13)", "hole(1..12)"],
+    "constraints": ["1 { in(P,H) : hole(H) } 1 :- pigeon(P).", ":- in(P,H), in(Q,H), P < Q."],
+    "optimize": "",
+}
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+@patch("savanty.mcp_server.validate_and_parse_problem", return_value=KNAPSACK.program_components)
+def test_solve_problem(mock_validate):
+    """Test that solve_problem compiles, adds the extra facts and validates its options."""
+    tools = SavantyTools(jobs=JobRegistry())
+
+    result = run(tools.solve_problem("Pack the knapsack", facts=["item(extra,1,1)"], time_limit=5))
+
+    assert result["error"] is None and result["optimal"] is True
+    assert mock_validate.call_args.args == ("Pack the knapsack", "")
+    assert run(tools.solve_problem("Pack", threads=0))["error"] == "threads must be at least 1"
+
+
+@patch("savanty.solver.validate_and_parse_problem", return_value=KNAPSACK.program_components)
+def test_compile_then_solve_with_facts(mock_validate):
+    """Test that a compiled template is solved with new facts and questions are passed back."""
+    tools = SavantyTools(jobs=JobRegistry())
+
+    template = run(tools.compile_problem("Pack the knapsack", template_id="knapsack"))
+    assert (template["id"], template["version"]) == ("knapsack", 1)
+
+    facts = ["capacity(10)", "item(gold,9,5)", "item(silver,4,4)", "item(bronze,3,4)"]
+    result = run(tools.solve_with_facts("knapsack@1", facts=facts))
+    assert result["atoms"]["take"] == [["gold"], ["silver"]]
+    assert "not found" in run(tools.solve_with_facts("missing"))["error"]
+
+    mock_validate.side_effect = ValueError('NEEDS_MORE_INFO:["What is the capacity?"]')
+    assert run(tools.compile_problem("Pack"))["questions"] == ["What is the capacity?"]
+
+
+def test_jobs_run_in_the_background_within_the_concurrency_limit():
+    """Test that jobs started with wait=False run within the concurrency limit and can be polled."""
+    tools = SavantyTools(max_concurrency=1, jobs=JobRegistry())
+    running = []
+    peak = []
+    lock = threading.Lock()
+
+    def slow_compile(description, additional_info=""):
+        with lock:
+            running.append(description)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(description)
+        return KNAPSACK.program_components
+
+    async def scenario():
+        jobs = [await tools.solve_problem(f"Pack {index}", wait=False) for index in range(3)]
+        assert all(job["status"] == "running" for job in jobs)
+        while any(job["status"] == "running" for job in jobs):
+            await asyncio.sleep(0.01)
+            jobs = [await tools.job_status(job["job_id"]) for job in jobs]
+        return jobs
+
+    with patch("savanty.mcp_server.validate_and_parse_problem", side_effect=slow_compile):
+        jobs = run(scenario())
+
+    assert max(peak) == 1
+    assert [job["status"] for job in jobs] == ["done"] * 3
+    assert jobs[0]["result"]["optimal"] is True
+    assert tools.jobs.stats() == {"running": 0, "done": 3, "failed": 0, "cancelled": 0}
+    assert "not found" in run(tools.job_status("missing"))["error"]
+
+
+@patch("savanty.mcp_server.validate_and_parse_problem", return_value=PIGEONHOLE)
+def test_cancel_stops_a_running_solve(mock_validate):
+    """Test that cancelling a job stops its Clingo search on a thread pool."""
+    tools = SavantyTools(jobs=JobRegistry())
+    pool = get_pool("solve")
+
+    async def scenario():
+        job = await tools.solve_problem("Seat the pigeons", wait=False)
+        while pool.pending == 0:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.2)
+        started = time.monotonic()
+        cancelled = await tools.cancel_job(job["job_id"])
+        return cancelled, time.monotonic() - started
+
+    cancelled, elapsed = run(scenario())
+
+    assert cancelled["status"] == "cancelled"
+    assert elapsed < 1
+    # The Clingo search itself stopped, freeing its worker
+    deadline = time.monotonic() + 2
+    while pool.pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert pool.pending == 0
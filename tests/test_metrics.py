@@ -0,0 +1,124 @@
+"""Tests for stage timings, token counts and Clingo statistics."""
+
+import pytest
+from click.testing import CliRunner
+from unittest.mock import patch
+from savanty.metrics import (
+    MetricsRegistry,
+    Profile,
+    current_profile,
+    format_profile,
+    get_metrics,
+    profiling,
+    record_lm_usage,
+    span,
+)
+from savanty.solver import ProblemSolverResult, solve_program
+
+
+PROGRAM = {
+    "predicates": [],
+    "facts": ["val(1)", "val(2)", "val(3)"],
+    "constraints": ["{ x(X) : val(X) } = 1."],
+    "optimize": "#minimize { X : x(X) }.",
+}
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics():
+    get_metrics().reset()
+    yield
+    get_metrics().reset()
+
+
+def test_histogram_renders_cumulative_buckets():
+    """Test that histograms, counters and gauges render in the Prometheus text format."""
+    registry = MetricsRegistry()
+    registry.observe("latency_seconds", 0.3, buckets=(0.1, 0.5, 1.0), help="Latency", stage="solve")
+    registry.observe("latency_seconds", 0.05, buckets=(0.1, 0.5, 1.0), stage="solve")
+    registry.inc("requests_total", 2, kind="http")
+
+    text = registry.render(gauges={"pending": [({"pool": "llm"}, 3)]})
+
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{stage="solve",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{stage="solve",le="0.5"} 2' in text
+    assert 'latency_seconds_bucket{stage="solve",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{stage="solve"} 2' in text
+    assert 'requests_total{kind="http"} 2' in text
+    assert '# TYPE pending gauge\npending{pool="llm"} 3' in text
+
+
+def test_spans_and_tokens_fill_the_current_profile():
+    """Test that spans and LLM token counts go to the active profile and the registry."""
+    assert current_profile() is None
+    with profiling() as profile:
+        with span("ground"):
+            pass
+        with profiling() as inner:
+            assert inner is profile
+        record_lm_usage("generate", {"openai/gpt-4o": {"prompt_tokens": 120, "completion_tokens": 30}})
+        record_lm_usage("generate", {"openai/gpt-4o": {"prompt_tokens": 10, "completion_tokens": 5}})
+    assert current_profile() is None
+
+    data = profile.to_dict()
+    assert [item["name"] for item in data["spans"]] == ["ground"]
+    assert data["tokens"] == {"generate": {"prompt_tokens": 130, "completion_tokens": 35}}
+    text = get_metrics().render()
+    assert 'savanty_llm_tokens_total{kind="prompt",stage="generate"} 130' in text
+    assert 'savanty_stage_seconds_count{stage="ground"} 1' in text
+
+
+def test_profile_merges_worker_profiles():
+    """Test that a profile returned by a worker merges into the caller's."""
+    profile = Profile()
+    profile.add_span("pipeline", 1.5)
+    profile.merge({"spans": [{"name": "solve", "seconds": 0.5}], "clingo": {"choices": 4.0},
+                   "tokens": {"compile": {"prompt_tokens": 1, "completion_tokens": 2}}})
+
+    assert profile.total("pipeline") == 1.5
+    assert profile.to_dict()["clingo"] == {"choices": 4.0}
+    report = format_profile(profile.to_dict())
+    assert "pipeline" in report and "solve" in report and "choices=4" in report
+
+
+def test_solve_program_records_clingo_statistics():
+    """Test that a solve records its stage spans and Clingo statistics."""
+    result = solve_program(PROGRAM)
+
+    assert result.solution
+    names = [item["name"] for item in result.profile["spans"]]
+    assert names == ["load_facts", "ground", "solve"]
+    assert result.profile["clingo"]["atoms"] >= 1
+    assert "choices" in result.profile["clingo"]
+    assert "savanty_clingo_atoms_count 1" in get_metrics().render()
+
+
+def test_metrics_endpoint():
+    """Test that /metrics serves the registry with pool and request gauges."""
+    from fastapi.testclient import TestClient
+    from savanty.server import create_app
+
+    solve_program(PROGRAM)
+    response = TestClient(create_app()).get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'savanty_stage_seconds_count{stage="solve"} 1' in response.text
+    assert "savanty_requests_active 0" in response.text
+
+
+@patch('savanty.cli.SolveSession')
+def test_cli_profile_flag(mock_session):
+    """Test that --profile prints the stage timings to stderr."""
+    from savanty.cli import main
+
+    mock_session.return_value.solve.return_value = ProblemSolverResult(
+        solution="x=1", profile={"spans": [{"name": "pipeline", "seconds": 0.25}], "tokens": {}, "clingo": {}}
+    )
+
+    result = CliRunner().invoke(main, ['-p', 'Minimize x', '--profile'])
+
+    assert result.exit_code == 0
+    assert "Solution found:" in result.stdout
+    assert "pipeline" in result.stderr and "250.0 ms" in result.stderr
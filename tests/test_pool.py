@@ -0,0 +1,66 @@
+"""Tests for the bounded worker pools."""
+
+import asyncio
+import threading
+import pytest
+from savanty.pool import WorkerPool, RequestLimiter, PoolSaturatedError
+
+
+def test_worker_pool_runs_jobs():
+    """Test that jobs run on the pool and their results are awaited."""
+    pool = WorkerPool("test", max_workers=2, max_queue=2)
+    try:
+        result = asyncio.run(pool.run(lambda x, y: x + y, 1, y=2))
+        assert result == 3
+        assert pool.pending == 0
+    finally:
+        pool.shutdown()
+
+
+def test_worker_pool_rejects_when_queue_full():
+    """Test that submissions beyond workers plus queue are rejected."""
+    pool = WorkerPool("test", max_workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        pool.submit(release.wait)
+        pool.submit(release.wait)
+        with pytest.raises(PoolSaturatedError) as exc_info:
+            pool.submit(release.wait)
+        assert exc_info.value.status_code == 503
+    finally:
+        release.set()
+        pool.shutdown()
+    assert pool.pending == 0
+
+
+def test_worker_pool_rejects_unknown_kind():
+    """Test that only thread and process pools are supported."""
+    with pytest.raises(ValueError):
+        WorkerPool("test", kind="fiber")
+
+
+def test_request_limiter_queues_then_rejects():
+    """Test that the limiter queues up to max_queue requests and rejects the rest."""
+    async def scenario():
+        limiter = RequestLimiter(max_concurrency=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await release.wait()
+
+        first = asyncio.create_task(hold())
+        second = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert limiter.active == 1
+        assert limiter.waiting == 1
+        with pytest.raises(PoolSaturatedError) as exc_info:
+            async with limiter.slot():
+                pass
+        release.set()
+        await asyncio.gather(first, second)
+        return exc_info.value.status_code, limiter.active
+
+    status_code, active = asyncio.run(scenario())
+    assert status_code == 429
+    assert active == 0
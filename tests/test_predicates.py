@@ -0,0 +1,57 @@
+"""Tests for the clorm predicate class factory."""
+
+import threading
+import pytest
+from clorm import Predicate
+from savanty.predicates import build_predicate, build_predicates, schema_fingerprint
+
+
+TASK = {"name": "Task", "fields": {"name": "ConstantField", "duration": "IntegerField"}}
+
+
+def test_build_predicate():
+    """Test that a spec becomes a usable clorm predicate."""
+    Task = build_predicate(TASK)
+    assert issubclass(Task, Predicate)
+    assert Task.meta.name == "task"
+    assert str(Task("a", 3)) == "task(a,3)"
+
+
+def test_build_predicate_is_memoized():
+    """Test that repeated schemas return the same class."""
+    assert build_predicate(TASK) is build_predicate(dict(TASK))
+
+
+def test_same_name_different_schema():
+    """Test that a predicate name reused with other fields gets its own class."""
+    other = {"name": "Task", "fields": {"name": "ConstantField", "priority": "IntegerField", "slot": "IntegerField"}}
+    assert schema_fingerprint(TASK) != schema_fingerprint(other)
+    assert build_predicate(TASK).meta.arity == 2
+    assert build_predicate(other).meta.arity == 3
+
+
+def test_build_predicates_namespace():
+    """Test that the per-request namespace is keyed by class and ASP names."""
+    namespace = build_predicates([TASK])
+    assert namespace["Task"] is namespace["task"]
+    assert "Task" not in globals()
+
+
+def test_invalid_specs_are_rejected():
+    """Test that unknown field types and bad names raise ValueError."""
+    with pytest.raises(ValueError):
+        build_predicate({"name": "Task", "fields": {"name": "FloatField"}})
+    with pytest.raises(ValueError):
+        build_predicate({"name": "Task", "fields": {"import os": "IntegerField"}})
+
+
+def test_build_predicate_from_many_threads():
+    """Test that concurrent requests for one schema share a single class."""
+    spec = {"name": "Shift", "fields": {"worker": "ConstantField", "day": "IntegerField"}}
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(build_predicate(spec))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len({id(cls) for cls in results}) == 1
@@ -0,0 +1,82 @@
+"""Tests for reusable problem templates."""
+
+import pytest
+from unittest.mock import patch
+from savanty.problem_templates import TemplateStore, TemplateNotFoundError, parse_template_ref
+from savanty.solver import compile_template, solve_template
+
+
+KNAPSACK = {
+    "predicates": [{"name": "Item", "fields": {"name": "ConstantField", "value": "IntegerField",
+                                               "weight": "IntegerField"}}],
+    "facts": ["item(a,3,2)", "item(b,5,4)", "capacity(5)"],
+    "constraints": ["{ take(I) : item(I,_,_) }.",
+                    ":- capacity(C), #sum { W,I : take(I), item(I,_,W) } > C."],
+    "optimize": "#maximize { V,I : take(I), item(I,V,_) }.",
+}
+
+
+def test_save_versions_and_get(tmp_path):
+    """Test that saving bumps the version only when the encoding changes."""
+    store = TemplateStore(str(tmp_path))
+    first = store.save(KNAPSACK, template_id="knapsack", description="Pack items")
+    assert (first.id, first.version) == ("knapsack", 1)
+    assert "facts" not in first.program_components
+    assert first.example_facts == KNAPSACK["facts"]
+
+    assert store.save(dict(KNAPSACK, facts=[]), template_id="knapsack").version == 1
+    changed = store.save(dict(KNAPSACK, optimize="#minimize { 1,I : take(I) }."), template_id="knapsack")
+    assert changed.version == 2
+
+    assert store.versions("knapsack") == [1, 2]
+    assert store.get("knapsack").version == 2
+    assert store.get("knapsack", 1).program_components["optimize"] == KNAPSACK["optimize"]
+    assert store.list()[0]["version"] == 2
+
+
+def test_generated_id_and_errors(tmp_path):
+    """Test content-derived ids, missing templates and invalid input."""
+    store = TemplateStore(str(tmp_path))
+    template = store.save(KNAPSACK)
+    assert store.save(KNAPSACK).id == template.id
+
+    with pytest.raises(TemplateNotFoundError):
+        store.get("missing")
+    with pytest.raises(ValueError):
+        store.get("../escape")
+    with pytest.raises(ValueError):
+        store.save({"predicates": [], "constraints": "not a list", "optimize": ""})
+
+    assert store.delete(template.id)
+    assert store.list() == []
+
+
+def test_parse_template_ref():
+    """Test that template references split into id and optional version."""
+    assert parse_template_ref("shifts") == ("shifts", None)
+    assert parse_template_ref("shifts@3") == ("shifts", 3)
+    with pytest.raises(ValueError):
+        parse_template_ref("shifts@latest")
+
+
+@patch('savanty.solver.validate_and_parse_problem')
+def test_compile_then_solve_without_llm(mock_validate):
+    """Test that a compiled template is re-solved with new facts and no further LLM call."""
+    mock_validate.return_value = KNAPSACK
+    template = compile_template("Pack the most valuable items", template_id="knapsack")
+    assert mock_validate.call_count == 1
+
+    result = solve_template("knapsack", facts=["item(a,3,2)", "item(b,5,4)", "item(c,4,3)", "capacity(5)"])
+    assert result.error is None
+    assert result.atoms["take"] == [["a"], ["c"]]
+    assert result.cost == [-7]
+    assert mock_validate.call_count == 1
+
+    result = solve_template(template, facts=["item(a,3,2)", "capacity(1)"])
+    assert "take" not in result.atoms
+
+
+def test_solve_unknown_template():
+    """Test that solving a missing template reports an error."""
+    result = solve_template("nope", facts=[])
+    assert "not found" in result.error
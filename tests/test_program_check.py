@@ -0,0 +1,91 @@
+"""Tests for static program checks, the grounding-size guard and the repair loop."""
+
+import pytest
+from savanty.bench import FAMILIES, make_problem
+from savanty.program_check import (
+    GroundingTooLargeError,
+    check_ground_size,
+    check_program,
+    fact_counts,
+    fact_signature,
+)
+from savanty.solver import run_pipeline, solve_program
+from savanty.stand_in_lm import StandInLM
+
+
+KNAPSACK = make_problem("knapsack", 5)
+
+
+def components(**changes):
+    return dict(KNAPSACK.program_components, **changes)
+
+
+def test_generated_programs_pass():
+    """Test that every benchmark family's program passes the static checks."""
+    for family in FAMILIES:
+        check = check_program(make_problem(family, 20).program_components)
+        assert check.ok, check.errors
+        assert check.ground_size > 0
+
+
+def test_diagnostics():
+    """Test that syntax, safety, arity and undefined-predicate errors are reported per statement."""
+    check = check_program(components(
+        constraints=["{ take(I) : item(I,_) }.", "p(X) :- q(Y).", ":- take(I"],
+        optimize="#maximize { V,I : tak(I), item(I,V,_) }.",
+    ))
+
+    assert check.errors == [
+        "`p(X) :- q(Y).`: unsafe variables X",
+        "`:- take(I`: syntax error, unexpected EOF, expecting ) or ;",
+        "item/2 is used but item is defined with arity 3",
+        "q/1 is used but never declared, given as a fact or derived by a rule",
+        "tak/1 is used but never declared, given as a fact or derived by a rule",
+    ]
+    assert check_program({"predicates": [], "facts": "item(a)"}).errors == [
+        "'facts' must be a list of strings", "'constraints' must be a list of strings", "'optimize' must be a string"
+    ]
+
+
+def test_fact_counts():
+    """Test that facts are counted by predicate signature."""
+    assert fact_signature('a("x,y", f(1,2), 3).') == ("a", 3)
+    assert fact_counts(["item(a,1,2)", "item(b,1,2).", "flag.", " ", "edge(f(1,2),b)"]) == {
+        ("item", 3): 2, ("flag", 0): 1, ("edge", 2): 1
+    }
+
+
+def test_grounding_guard():
+    """Test that programs estimated to ground too large are refused before grounding."""
+    facts = [f"item(i{i},1,1)" for i in range(1000)]
+    triples = components(facts=facts, optimize="",
+                         constraints=["triple(A,B,C) :- item(A,_,_), item(B,_,_), item(C,_,_)."])
+
+    assert "exceeds the limit of 50,000,000" in check_program(triples).errors[0]
+    with pytest.raises(GroundingTooLargeError):
+        check_ground_size(triples)
+    assert check_ground_size(triples, limit=0) == 0
+    # Joins on shared variables are not counted as cross products
+    assert check_program(components(facts=facts)).ground_size < 10_000
+
+    result = solve_program(triples)
+    assert result.error.startswith("Estimated grounding size 1,000,001,000 exceeds the limit")
+
+
+def test_run_pipeline_repairs_bad_programs():
+    """Test that a program failing the checks is sent back for repair with its errors."""
+    broken = components(constraints=["{ take(I) : item(I) }."] + KNAPSACK.program_components["constraints"][1:])
+    responses = KNAPSACK.responses()
+    responses["generate"] = {"program_components": broken}
+    responses["repair"] = {"repaired_components": KNAPSACK.program_components}
+    lm = StandInLM(responses)
+
+    prediction = run_pipeline(KNAPSACK.description, lm=lm)
+
+    assert prediction.repairs == 1
+    assert prediction.components == KNAPSACK.program_components
+    assert "item/1 is used but item is defined with arity 3" in lm.history[-1]["messages"][-1]["content"]
+
+    responses["repair"] = {"repaired_components": "not json"}
+    with pytest.raises(ValueError, match="failed static checks: the repaired program components are not valid JSON"):
+        run_pipeline(KNAPSACK.description, lm=StandInLM(responses))
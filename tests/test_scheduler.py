@@ -0,0 +1,118 @@
+"""Tests for per-stage LM routing and LLM call scheduling."""
+
+import asyncio
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from savanty.bench import make_problem
+from savanty.lm import model_key, stage_lm, stage_models
+from savanty.scheduler import ModelScheduler, TokenBucket, traffic_priority
+from savanty.solver import run_pipeline
+from savanty.stand_in_lm import StandInLM, stand_in_lm
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_token_bucket():
+    """Test that the token bucket delays calls over its rate and never waits longer than a full refill."""
+    bucket = TokenBucket(rate=10, capacity=20)
+    now = time.monotonic()
+
+    assert bucket.delay(20, now) == 0
+    bucket.take(20)
+    assert bucket.delay(5, now) == pytest.approx(0.5)
+    # More than the bucket holds waits for a full bucket, not forever
+    assert bucket.delay(100, now + 1) == pytest.approx(1.0)
+    assert TokenBucket(rate=0).delay(10 ** 9, now) == 0
+
+
+def test_concurrency_cap_and_priority():
+    """Test that a full scheduler admits interactive calls before batch calls."""
+    scheduler = ModelScheduler("m", max_concurrency=1)
+    admitted = []
+    release = threading.Event()
+
+    def call(name, priority):
+        with traffic_priority(priority):
+            with scheduler.slot(100):
+                admitted.append(name)
+                release.wait()
+
+    first = threading.Thread(target=call, args=("first", "batch"))
+    first.start()
+    wait_until(lambda: scheduler.in_flight == 1)
+    threads = []
+    for name, priority in [("batch", "batch"), ("interactive", "interactive")]:
+        threads.append(threading.Thread(target=call, args=(name, priority)))
+        threads[-1].start()
+        wait_until(lambda: scheduler.waiting == len(threads))
+    release.set()
+    for thread in [first] + threads:
+        thread.join(5)
+
+    assert admitted == ["first", "interactive", "batch"]
+    assert scheduler.stats() == {"in_flight": 0, "waiting": 0, "admitted": 3, "throttled": 0}
+
+
+def test_token_quota_is_settled_with_real_usage():
+    """Test that the token quota is charged with the tokens actually used, not the estimate."""
+    # 6000 tokens per minute: 100 per second, bursts of up to 1000
+    scheduler = ModelScheduler("m", tokens_per_minute=6000)
+
+    with scheduler.slot(1000) as usage:
+        usage.used = 200
+    started = time.monotonic()
+    with scheduler.slot(500):
+        pass
+    assert time.monotonic() - started < 0.1
+
+    started = time.monotonic()
+    with scheduler.slot(500):
+        pass
+    assert time.monotonic() - started >= 0.15
+
+
+def test_throttle_and_async_slots():
+    """Test that a rate-limit throttle delays async slots, which respect the concurrency cap."""
+    scheduler = ModelScheduler("m", max_concurrency=2)
+    scheduler.throttle(0.2)
+
+    async def calls():
+        async def one():
+            async with scheduler.aslot(10):
+                await asyncio.sleep(0.05)
+                return scheduler.in_flight
+        return await asyncio.gather(*(one() for _ in range(4)))
+
+    started = time.monotonic()
+    peaks = asyncio.run(calls())
+    assert time.monotonic() - started >= 0.2
+    assert max(peaks) <= 2
+    assert scheduler.stats()["throttled"] == 1
+
+
+def test_stage_routing(monkeypatch):
+    """Test that SAVANTY_STAGE_MODELS routes stages to their models unless a call passes its own LM."""
+    problem = make_problem("knapsack", 5)
+    default, cheap = StandInLM(problem.responses()), StandInLM(problem.responses())
+    monkeypatch.setenv("SAVANTY_STAGE_MODELS", "validate=openai/gpt-4o-mini, identify_gaps=openai/gpt-4o-mini")
+
+    assert stage_models() == {"validate": "openai/gpt-4o-mini", "identify_gaps": "openai/gpt-4o-mini"}
+    assert model_key() == "openai/gpt-4o|identify_gaps=openai/gpt-4o-mini,validate=openai/gpt-4o-mini"
+    assert model_key("openai/gpt-4o") == "openai/gpt-4o"
+    with patch("savanty.lm.get_lm", return_value=cheap):
+        assert stage_lm("validate") is cheap
+        assert stage_lm("generate") is None
+        with stand_in_lm(default):
+            prediction = run_pipeline(problem.description)
+            assert prediction.components == problem.program_components
+            assert (len(cheap.history), len(default.history)) == (1, 2)
+            # An LM passed for the whole call overrides the routing
+            run_pipeline(problem.description, lm=default)
+            assert (len(cheap.history), len(default.history)) == (1, 5)
@@ -0,0 +1,203 @@
+"""Tests for the HTTP API."""
+
+import pytest
+from unittest.mock import patch, MagicMock
+from savanty.solver import ProblemSolverResult
+
+
+@patch('savanty.server.solve_program')
+@patch('savanty.session.run_pipeline')
+def test_solve_endpoint(mock_pipeline, mock_solve_program):
+    """Test that /solve runs both stages off the event loop and returns the solution."""
+    import dspy
+    from fastapi.testclient import TestClient
+    from savanty.server import create_app
+
+    components = {"predicates": [], "facts": [], "constraints": [], "optimize": ""}
+    mock_pipeline.return_value = dspy.Prediction(needs_more_info=False, components=components)
+    mock_solve_program.return_value = ProblemSolverResult(solution="x=0")
+
+    client = TestClient(create_app())
+    response = client.post("/solve", json={"problem_description": "Minimize x"})
+
+    assert response.status_code == 200
+    assert response.json()["solution"] == "x=0"
+    assert response.json()["session_id"]
+    assert mock_solve_program.call_args.args == (components,)
+
+
+@patch('savanty.server.solve_program')
+@patch('savanty.session.run_pipeline')
+def test_solve_endpoint_continues_session(mock_pipeline, mock_solve_program):
+    """Test that answers sent with a session id continue the earlier turn."""
+    import dspy
+    from fastapi.testclient import TestClient
+    from savanty.server import create_app
+
+    components = {"predicates": [], "facts": ["item(a)"], "constraints": [], "optimize": ""}
+    mock_pipeline.side_effect = [
+        dspy.Prediction(needs_more_info=True, questions=["Which items?"], problem_description="Pick items",
+                        validation=dspy.Prediction(is_valid="false", reason="No items given")),
+        dspy.Prediction(needs_more_info=False, components=components,
+                        problem_description="Pick items a"),
+    ]
+    mock_solve_program.return_value = ProblemSolverResult(solution="item(a)")
+    client = TestClient(create_app())
+
+    first = client.post("/solve", json={"problem_description": "Pick items"}).json()
+    assert first["questions"] == ["Which items?"]
+    session_id = first["session_id"]
+    assert client.get(f"/sessions/{session_id}").json()["stages"]["validation"]["reason"] == "No items given"
+
+    second = client.post("/solve", json={"session_id": session_id, "additional_info": "Item a",
+                                         "facts": ["item(b)"]})
+    assert second.status_code == 200
+    assert second.json()["session_id"] == session_id
+    assert mock_pipeline.call_args.args == ("Pick items", "Item a")
+    assert mock_solve_program.call_args.args[0]["facts"] == ["item(a)", "item(b)."]
+
+    assert client.post("/solve", json={"session_id": "missing"}).status_code == 404
+    assert client.delete(f"/sessions/{session_id}").status_code == 200
+
+
+@patch('savanty.server.solve_session_async')
+def test_solve_endpoint_when_busy(mock_solve_async):
+    """Test that a saturated pool is reported as 503 with Retry-After."""
+    from fastapi.testclient import TestClient
+    from savanty.server import create_app
+    from savanty.pool import PoolSaturatedError
+
+    mock_solve_async.side_effect = PoolSaturatedError("The solve pool is at capacity")
+
+    client = TestClient(create_app())
+    response = client.post("/solve", json={"problem_description": "Minimize x"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+
+@patch('savanty.server.validate_and_parse_problem')
+def test_solve_stream_endpoint(mock_validate):
+    """Test that /solve/stream emits model events followed by the final result."""
+    import json
+    from fastapi.testclient import TestClient
+    from savanty.server import create_app
+
+    mock_validate.return_value = {
+        "predicates": [],
+        "facts": ["item(a,3)", "item(b,5)"],
+        "constraints": ["1 { pick(I) : item(I,_) } 1."],
+        "optimize": "#maximize { V,I : pick(I), item(I,V) }."
+    }
+
+    client = TestClient(create_app())
+    response = client.post("/solve/stream", json={"problem_description": "Pick the best item", "time_limit": 5})
+
+    assert response.status_code == 200
+    events = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    names = [lines[0].split(": ", 1)[1] for lines in events]
+    assert names[-1] == "result"
+    assert "model" in names
+    final = json.loads(events[-1][1].split(": ", 1)[1])
+    assert final["atoms"]["pick"] == [["b"]]
+    assert final["optimal"] is True
+
+
+@patch('savanty.server.validate_and_parse_problem')
+def test_solve_stream_stops_when_the_client_disconnects(mock_validate):
+    """Test that dropping a stream ends its Clingo search and frees its request slot."""
+    import asyncio
+    import time
+    from savanty.pool import get_pool
+    from savanty.server import SolveRequest, create_app
+
+    # Pigeonhole: 13 pigeons in 12 holes, which Clingo takes very long to refute
+    mock_validate.return_value = {
+        "predicates": [],
+        "facts": ["pigeon(1..13)", "hole(1..12)"],
+        "constraints": ["1 { in(P,H) : hole(H) } 1 :- pigeon(P).", ":- in(P,H), in(Q,H), P < Q."],
+        "optimize": "",
+    }
+    app = create_app()
+    endpoints = {route.path: route.endpoint for route in app.routes}
+    pool = get_pool("stream")
+
+    async def scenario():
+        response = await endpoints["/solve/stream"](SolveRequest(problem_description="Seat the pigeons"))
+        events = response.body_iterator
+        reader = asyncio.ensure_future(events.__anext__())
+        while pool.pending == 0:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.2)
+        reader.cancel()
+        await asyncio.gather(reader, return_exceptions=True)
+        await events.aclose()
+        deadline = time.monotonic() + 2
+        while pool.pending and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        await asyncio.sleep(0.05)
+        return (await endpoints["/metrics"]()).body.decode()
+
+    metrics = asyncio.run(scenario())
+
+    assert pool.pending == 0
+    assert "savanty_requests_active 0" in metrics
+
+
+@patch('savanty.solver.validate_and_parse_problem')
+def test_template_endpoints(mock_validate):
+    """Test compiling a template once and solving it with new facts over HTTP."""
+    from fastapi.testclient import TestClient
+    from savanty.server import create_app
+
+    mock_validate.return_value = {
+        "predicates": [],
+        "facts": ["item(a,3)"],
+        "constraints": ["1 { pick(I) : item(I,_) } 1."],
+        "optimize": "#maximize { V,I : pick(I), item(I,V) }."
+    }
+    client = TestClient(create_app())
+
+    response = client.post("/templates", json={"problem_description": "Pick the best item",
+                                               "template_id": "pick"})
+    assert response.status_code == 200
+    assert response.json()["version"] == 1
+    assert client.get("/templates").json()["templates"][0]["id"] == "pick"
+
+    response = client.post("/templates/pick/solve", json={"facts": ["item(a,3)", "item(b,5)"]})
+    assert response.status_code == 200
+    assert response.json()["atoms"]["pick"] == [["b"]]
+    assert mock_validate.call_count == 1
+
+    assert client.post("/templates/missing/solve", json={"facts": []}).status_code == 404
+    assert client.get("/templates/pick@2").status_code == 404
+
+
+@patch('savanty.server.solve_program')
+@patch('savanty.session.run_pipeline')
+def test_solve_endpoint_coalesces_identical_requests(mock_pipeline, mock_solve_program):
+    """Test that identical concurrent /solve requests share one pipeline run but not a session."""
+    import time
+    import dspy
+    from concurrent.futures import ThreadPoolExecutor
+    from fastapi.testclient import TestClient
+    from savanty.server import create_app
+
+    def slow_pipeline(*args, **kwargs):
+        time.sleep(0.3)
+        return dspy.Prediction(needs_more_info=False, components={
+            "predicates": [], "facts": [], "constraints": [], "optimize": ""})
+    mock_pipeline.side_effect = slow_pipeline
+    mock_solve_program.return_value = ProblemSolverResult(solution="x=0")
+
+    with TestClient(create_app()) as client:
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(client.post, "/solve", json={"problem_description": "Minimize x"})
+                       for _ in range(3)]
+            responses = [future.result().json() for future in futures]
+        stats = client.get("/stats").json()["coalescing"]["http"]
+
+    assert [response["solution"] for response in responses] == ["x=0"] * 3
+    assert len({response["session_id"] for response in responses}) == 3
+    assert mock_pipeline.call_count == 1
+    assert stats["coalesced"] == 2
@@ -0,0 +1,117 @@
+"""Tests for multi-turn solving sessions."""
+
+import json
+import dspy
+from unittest.mock import patch
+from savanty.session import SolveSession
+
+
+KNAPSACK = {
+    "predicates": [],
+    "facts": ["item(a,3,2)", "item(b,5,4)", "item(c,4,3)", "capacity(5)"],
+    "constraints": ["{ take(I) : item(I,_,_) }.",
+                    ":- capacity(C), #sum { W,I : take(I), item(I,_,W) } > C."],
+    "optimize": "#maximize { V,I : take(I), item(I,V,_) }.",
+}
+
+
+def compiled(components, description="refined"):
+    return dspy.Prediction(needs_more_info=False, problem_description=description,
+                           program=dspy.Prediction(program_components=json.dumps(components)),
+                           components=components)
+
+
+@patch('savanty.session.run_pipeline')
+def test_answers_refine_the_previous_turn(mock_pipeline):
+    """Test that each answer is refined into the last refined description only."""
+    mock_pipeline.side_effect = [
+        dspy.Prediction(needs_more_info=True, questions=["What is the capacity?"],
+                        problem_description="Pack items"),
+        dspy.Prediction(needs_more_info=True, questions=["What are the items?"],
+                        problem_description="Pack items into a knapsack of capacity 5"),
+        compiled(KNAPSACK),
+    ]
+    session = SolveSession("Pack items")
+
+    result = session.solve()
+    assert result.needs_more_info
+    assert result.questions == ["What is the capacity?"]
+
+    assert session.solve("Capacity is 5").questions == ["What are the items?"]
+    result = session.solve("Items a, b and c")
+    assert result.atoms["take"] == [["a"], ["c"]]
+
+    assert mock_pipeline.call_args.args == ("Pack items into a knapsack of capacity 5", "Items a, b and c")
+    assert session.additional_info == ["Capacity is 5", "Items a, b and c"]
+
+    # Facts and constraints alone never go back to the LLM
+    session.solve(facts=["item(d,9,1)"])
+    assert mock_pipeline.call_count == 3
+
+
+@patch('savanty.session.run_pipeline')
+def test_live_control_grounds_only_the_difference(mock_pipeline):
+    """Test that re-solves and added constraints reuse the grounded program."""
+    mock_pipeline.return_value = compiled(KNAPSACK)
+    session = SolveSession("Pack items")
+
+    assert session.solve().cost == [-7]
+    assert session.solve().cost == [-7]
+    assert session.groundings == 1
+
+    session.add_constraints([":- take(a)."])
+    result = session.solve()
+    assert result.atoms["take"] == [["b"]]
+    assert session.groundings == 1
+
+    # New facts need the encoding grounded again
+    result = session.solve(facts=["item(d,6,1)"])
+    assert result.atoms["take"] == [["b"], ["d"]]
+    assert session.groundings == 2
+
+
+@patch('savanty.session.run_pipeline')
+def test_regenerated_constraints_are_added_incrementally(mock_pipeline):
+    """Test that an answer that only adds an integrity constraint does not reground."""
+    extended = dict(KNAPSACK, constraints=KNAPSACK["constraints"] + [":- take(c)."])
+    mock_pipeline.side_effect = [compiled(KNAPSACK), compiled(extended)]
+    session = SolveSession("Pack items")
+
+    assert session.solve().cost == [-7]
+    result = session.solve("Item c is not available")
+    assert result.atoms["take"] == [["b"]]
+    assert session.groundings == 1
+
+    changed = dict(KNAPSACK, optimize="#minimize { 1,I : take(I) }.")
+    mock_pipeline.side_effect = [compiled(changed)]
+    assert session.solve("Take as few items as possible").cost == [0]
+    assert session.groundings == 2
+
+
+@patch('savanty.session.run_pipeline')
+def test_errors_are_reported(mock_pipeline):
+    """Test that pipeline errors come back as the result's error."""
+    mock_pipeline.side_effect = ValueError("Error in DSPy processing: boom")
+    result = SolveSession("Pack items").solve()
+    assert result.error == "Error in DSPy processing: boom"
+
+
+@patch('savanty.session.run_pipeline')
+def test_concurrent_turns_keep_every_fact_and_turn(mock_pipeline):
+    """Test that turns started on one session from several threads lose no update."""
+    from concurrent.futures import ThreadPoolExecutor
+    from savanty.solver import ProblemSolverResult
+
+    mock_pipeline.return_value = compiled(KNAPSACK)
+    session = SolveSession("Pack items")
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        programs = list(executor.map(lambda i: session.start_turn(facts=[f"item(x{i},1,1)"]), range(32)))
+
+    assert session.turns == 32
+    assert sorted(session.facts) == sorted(f"item(x{i},1,1)." for i in range(32))
+    # Each turn's program includes at least its own facts
+    assert all(f"item(x{i},1,1)." in program["facts"] for i, program in enumerate(programs))
+    session.finish_turn(ProblemSolverResult(solution="done"))
+    assert session.last_result.solution == "done"
+    assert mock_pipeline.call_count == 1
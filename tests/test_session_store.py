@@ -0,0 +1,115 @@
+"""Tests for the session stores."""
+
+import time
+import pytest
+from unittest.mock import patch
+from savanty.session import SolveSession
+from savanty.session_store import (
+    MemorySessionStore,
+    SessionStore,
+    SQLiteSessionStore,
+    get_session_store,
+    reset_session_store,
+)
+
+
+COMPONENTS = {
+    "predicates": [],
+    "facts": ["item(a,3)", "item(b,5)"],
+    "constraints": ["1 { pick(I) : item(I,_) } 1."],
+    "optimize": "#maximize { V,I : pick(I), item(I,V) }.",
+}
+
+
+def answered_session():
+    session = SolveSession("Pick the best item")
+    session.additional_info = ["Items a and b"]
+    session.refined_description = "Pick the best of items a and b"
+    session.stages = {"validation": {"is_valid": "true", "reason": "ok"}}
+    session.program_components = COMPONENTS
+    session.add_facts(["item(c,4)"])
+    return session
+
+
+def test_memory_store_is_lru_with_ttl():
+    """Test that the memory store evicts the least recently used session and expires old ones."""
+    store = MemorySessionStore(max_sessions=2, ttl=60)
+    sessions = [SolveSession(f"problem {i}") for i in range(3)]
+    store.put(sessions[0])
+    store.put(sessions[1])
+    assert store.get(sessions[0].id) is not None
+    store.put(sessions[2])
+
+    # sessions[1] was the least recently used
+    assert store.get(sessions[1].id) is None
+    assert store.get(sessions[0].id).problem_description == "problem 0"
+    assert len(store) == 2
+
+    store.ttl = 0.01
+    time.sleep(0.02)
+    assert store.get(sessions[0].id) is None
+    assert not store.delete(sessions[0].id)
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    """Test that a session saved by one process can be continued by another."""
+    path = str(tmp_path / "sessions.db")
+    first, second = SQLiteSessionStore(path), SQLiteSessionStore(path)
+    session = answered_session()
+    first.put(session)
+
+    restored = second.get(session.id)
+    assert restored.refined_description == "Pick the best of items a and b"
+    assert restored.stages["validation"]["reason"] == "ok"
+    assert restored.problem_info["facts"] == ["item(a,3)", "item(b,5)", "item(c,4)."]
+
+    assert second.delete(session.id)
+    assert first.get(session.id) is None
+
+
+def test_sqlite_store_purges_expired(tmp_path):
+    """Test that purge removes expired sessions from the database."""
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), ttl=0.01)
+    session = SolveSession("Pick the best item")
+    store.put(session)
+    time.sleep(0.02)
+    assert store.purge() == 1
+    assert store.get(session.id) is None
+
+
+@patch('savanty.session.run_pipeline')
+def test_restored_session_solves_without_llm(mock_pipeline):
+    """Test that a session restored from a store solves without calling the LLM."""
+    store = MemorySessionStore()
+    session = answered_session()
+    store.put(session)
+    restored = store.get(session.id)
+
+    result = restored.solve()
+    assert result.atoms["pick"] == [["b"]]
+    mock_pipeline.assert_not_called()
+
+
+def test_get_session_store_backends(monkeypatch):
+    """Test that SAVANTY_SESSION_STORE selects the backend and rejects unknown ones."""
+    assert isinstance(get_session_store(), MemorySessionStore)
+    monkeypatch.setenv("SAVANTY_SESSION_STORE", "sqlite")
+    reset_session_store()
+    assert isinstance(get_session_store(), SQLiteSessionStore)
+    monkeypatch.setenv("SAVANTY_SESSION_STORE", "redis")
+    reset_session_store()
+    with pytest.raises(ValueError):
+        get_session_store()
+
+
+def test_incomplete_store_fails_at_construction():
+    """Test that a store missing one of the backend methods cannot be created."""
+    class NoDelete(SessionStore):
+        def _load(self, session_id):
+            return None
+
+        def _save(self, session_id, state):
+            pass
+
+    with pytest.raises(TypeError):
+        NoDelete()
@@ -2,22 +2,17 @@
 
 import pytest
 from unittest.mock import patch, MagicMock
-from savanty.solver import validate_and_parse_problem, generate_clorm_predicates, generate_asp_program, ProblemSolverResult, solve_optimization_problem
+from savanty.solver import validate_and_parse_problem, generate_clorm_predicates, generate_asp_program, ProblemSolverResult, solve_optimization_problem, solve_program, SolverOptions
 
 
-@patch('savanty.solver.dspy')
-def test_validate_and_parse_problem(mock_dspy):
+def test_validate_and_parse_problem():
     """Test validating and parsing an optimization problem."""
-    # Mock the DSPy modules
-    mock_dspy.LM = MagicMock()
-    mock_dspy.settings.configure = MagicMock()
-    
     # Mock the InteractiveProblemSolver forward method
     mock_result = MagicMock()
-    mock_result.program.program_components = '{"predicates": [{"name": "Variable", "fields": {"name": "ConstantField", "value": "IntegerField"}}], "facts": ["variable(x)", "variable(y)"], "constraints": ["x >= 0", "y >= 0", "x + y <= 10"], "optimize": "minimize x + y"}'
+    mock_result.program.program_components = '{"predicates": [{"name": "Variable", "fields": {"name": "ConstantField", "value": "IntegerField"}}], "facts": ["variable(x)", "variable(y)"], "constraints": ["{ pick(X) : variable(X) } 1."], "optimize": "#maximize { 1,X : pick(X) }."}'
     mock_result.needs_more_info = False
     
-    with patch('savanty.solver.InteractiveProblemSolver') as mock_problem_solver:
+    with patch('savanty.dspy_modules.InteractiveProblemSolver') as mock_problem_solver:
         mock_instance = MagicMock()
         mock_instance.forward.return_value = mock_result
         mock_problem_solver.return_value = mock_instance
@@ -32,19 +27,14 @@ def test_validate_and_parse_problem(mock_dspy):
         assert "optimize" in result
 
 
-@patch('savanty.solver.dspy')
-def test_validate_and_parse_problem_needs_info(mock_dspy):
+def test_validate_and_parse_problem_needs_info():
     """Test validating and parsing an optimization problem that needs more info."""
-    # Mock the DSPy modules
-    mock_dspy.LM = MagicMock()
-    mock_dspy.settings.configure = MagicMock()
-    
     # Mock the InteractiveProblemSolver forward method for a problem that needs more info
     mock_result = MagicMock()
     mock_result.needs_more_info = True
     mock_result.questions = ['What is the objective function?', 'What are the constraints?']
     
-    with patch('savanty.solver.InteractiveProblemSolver') as mock_problem_solver:
+    with patch('savanty.dspy_modules.InteractiveProblemSolver') as mock_problem_solver:
         mock_instance = MagicMock()
         mock_instance.forward.return_value = mock_result
         mock_problem_solver.return_value = mock_instance
@@ -104,13 +94,11 @@ def test_solve_optimization_problem_success(mock_validate):
         "optimize": "minimize x"
     }
     
-    # We'll mock the exec and globals functions to avoid ASP execution
-    with patch('savanty.solver.exec'), patch('savanty.solver.globals', return_value={}):
-        result = solve_optimization_problem("Minimize x subject to x>=0")
-        assert isinstance(result, ProblemSolverResult)
-        assert not result.needs_more_info
-        # We expect an error because we mocked the ASP execution
-        assert result.error is not None
+    result = solve_optimization_problem("Minimize x subject to x>=0")
+    assert isinstance(result, ProblemSolverResult)
+    assert not result.needs_more_info
+    # We expect an error because the mocked program is not valid ASP
+    assert result.error is not None
 
 
 @patch('savanty.solver.validate_and_parse_problem')
@@ -123,4 +111,123 @@ def test_solve_optimization_problem_needs_info(mock_validate):
     assert isinstance(result, ProblemSolverResult)
     assert result.needs_more_info
     assert len(result.questions) > 0
-    assert "What is the objective function?" in result.questions
\ No newline at end of file
+    assert "What is the objective function?" in result.questions
+
+
+def test_solve_program_with_fact_file(tmp_path):
+    """Test solving a program whose instance data comes from a CSV file."""
+    path = tmp_path / "item.csv"
+    path.write_text("name,weight,value\na,5,10\nb,4,7\nc,6,12\n")
+    problem_info = {
+        "predicates": [{"name": "Item", "fields": {"name": "ConstantField", "weight": "IntegerField", "value": "IntegerField"}}],
+        "facts": ["item(d,2,3)"],
+        "constraints": ["{ take(I) } :- item(I,_,_).", ":- #sum { W,I : take(I), item(I,W,_) } > 10."],
+        "optimize": "#maximize { V,I : take(I), item(I,_,V) }."
+    }
+
+    result = solve_program(problem_info, fact_files=[str(path)])
+    assert result.error is None
+    assert "item(a,5,10)" in result.solution
+    assert "item(d,2,3)" in result.solution
+    assert sorted(result.atoms["take"]) == [["b"], ["c"]]
+    assert result.atoms["item"][0] == ["a", 5, 10]
+    assert result.cost == [-19]
+    assert result.optimal is True
+    assert result.models >= 1
+
+
+def test_solve_program_unsatisfiable():
+    """Test that an unsatisfiable program reports no solution."""
+    problem_info = {"predicates": [], "facts": ["p"], "constraints": [":- p."], "optimize": ""}
+    result = solve_program(problem_info)
+    assert result.solution == "No solution found"
+    assert result.optimal is False
+    assert result.models == 0
+
+
+def test_result_to_dict_is_json_serializable():
+    """Test that structured results can be returned as JSON."""
+    import json
+    result = ProblemSolverResult(solution="p(1)", atoms={"p": [[1]]}, cost=[3], optimal=True, models=2)
+    data = json.loads(json.dumps(result.to_dict()))
+    assert data["atoms"] == {"p": [[1]]}
+    assert data["cost"] == [3]
+    assert data["models"] == 2
+
+
+def independent_set_problem(nodes=120, density=0.08):
+    """A maximum independent set instance that takes Clingo a while to prove optimal."""
+    import random
+    rng = random.Random(1)
+    facts = [f"node({i})" for i in range(nodes)]
+    facts += [f"edge({i},{j})" for i in range(nodes) for j in range(i + 1, nodes) if rng.random() < density]
+    return {
+        "predicates": [],
+        "facts": facts,
+        "constraints": ["{ in(X) } :- node(X).", ":- edge(X,Y), in(X), in(Y)."],
+        "optimize": "#maximize { 1,X : in(X) }."
+    }
+
+
+def test_solve_program_time_limit_returns_best_model():
+    """Test that an exhausted time budget returns the best model, marked non-optimal."""
+    import time
+    started = time.monotonic()
+    result = solve_program(independent_set_problem(), options=SolverOptions(time_limit=0.3))
+    assert time.monotonic() - started < 5
+    assert result.error is None
+    assert result.optimal is False
+    assert result.models >= 1
+    assert result.cost
+
+
+def test_solve_program_conflict_limit_and_on_model():
+    """Test the conflict budget and that each improving model is reported."""
+    seen = []
+    result = solve_program(independent_set_problem(), options=SolverOptions(conflict_limit=20),
+                           on_model=seen.append)
+    assert result.optimal is False
+    assert len(seen) == result.models
+    assert seen[-1]["cost"] == result.cost
+    assert seen[-1]["atoms"]["in"]
+    assert [info["cost"] for info in seen] == sorted((info["cost"] for info in seen), reverse=True)
+
+
+def test_solver_options_clingo_arguments():
+    """Test translating solver options into Clingo arguments."""
+    options = SolverOptions(threads=4, parallel_mode="split", opt_strategy="usc", configuration="trendy")
+    assert options.clingo_arguments() == ["--parallel-mode=4,split", "--opt-strategy=usc", "--configuration=trendy"]
+    assert SolverOptions(threads=1).clingo_arguments() == []
+    assert SolverOptions(threads="2").threads == 2
+
+
+def test_solver_options_auto_threads():
+    """Test that "auto" shares the available CPUs between running solves."""
+    with patch('savanty.solver.available_cpus', return_value=8):
+        assert SolverOptions(threads="auto").with_resolved_threads(1).threads == 8
+        assert SolverOptions(threads="auto").with_resolved_threads(3).threads == 2
+        assert SolverOptions(threads="auto").with_resolved_threads(16).threads == 1
+
+
+def test_solver_options_validation():
+    """Test that invalid solver options are rejected."""
+    with pytest.raises(ValueError):
+        SolverOptions(parallel_mode="race")
+    with pytest.raises(ValueError):
+        SolverOptions(threads=0)
+    with pytest.raises(ValueError):
+        SolverOptions(configuration="fast")
+
+
+def test_solve_program_multithreaded():
+    """Test that multi-threaded portfolio solving finds the optimum."""
+    problem_info = {
+        "predicates": [],
+        "facts": ["item(a,3)", "item(b,5)", "item(c,4)"],
+        "constraints": ["1 { pick(I) : item(I,_) } 2."],
+        "optimize": "#maximize { V,I : pick(I), item(I,V) }."
+    }
+    result = solve_program(problem_info, options=SolverOptions(threads=2, opt_strategy="usc"))
+    assert result.error is None
+    assert result.optimal is True
+    assert sorted(result.atoms["pick"]) == [["b"], ["c"]]
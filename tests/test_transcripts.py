@@ -0,0 +1,72 @@
+"""Tests for LM transcript recording and replay."""
+
+import pytest
+from click.testing import CliRunner
+from savanty.bench import make_problem
+from savanty.stand_in_lm import StandInLM, stand_in_lm
+from savanty.solver import run_pipeline
+from savanty.transcripts import Transcript, TranscriptMissError, get_transcript, reset_transcript
+
+
+def test_record_and_lookup(tmp_path):
+    """Test that recorded calls are found by normalized inputs and the latest recording wins."""
+    path = str(tmp_path / "runs.tx")
+    transcript = Transcript(path, mode="replay")
+
+    assert transcript.lookup("analyze", "sig", {"problem_description": "Minimize x"}) is None
+    transcript.record("analyze", "sig", {"problem_description": "Minimize x"}, {"analysis": "first"})
+    transcript.record("analyze", "sig", {"problem_description": "Minimize x"}, {"analysis": "second"})
+    transcript.record("analyze", "sig", {"problem_description": "Maximize y"}, {"analysis": "other"})
+
+    # A reopened transcript rebuilds its index; the latest recording wins
+    reopened = Transcript(path, mode="replay")
+    assert len(reopened) == 2
+    assert reopened.lookup("analyze", "sig", {"problem_description": " Minimize  x\n"}) == {"analysis": "second"}
+    assert reopened.lookup("analyze", "other-sig", {"problem_description": "Minimize x"}) is None
+    assert reopened.stats()["hits"] == 1 and reopened.stats()["misses"] == 1
+
+
+def test_modes(tmp_path):
+    """Test that record mode never replays, strict mode raises on misses and unknown modes are rejected."""
+    path = str(tmp_path / "runs.tx")
+    Transcript(path).record("validate", "sig", {"problem_description": "p"}, {"is_valid": "true"})
+
+    assert Transcript(path, mode="record").lookup("validate", "sig", {"problem_description": "p"}) is None
+    with pytest.raises(TranscriptMissError):
+        Transcript(path, mode="strict").lookup("validate", "sig", {"problem_description": "q"})
+    with pytest.raises(ValueError):
+        Transcript(path, mode="rewind")
+
+
+@pytest.mark.parametrize("pipeline", ["staged", "fused"])
+def test_pipeline_replays_without_the_llm(tmp_path, monkeypatch, pipeline):
+    """Test that a recorded pipeline run replays in strict mode without calling the LM."""
+    problem = make_problem("knapsack", 5)
+    monkeypatch.setenv("SAVANTY_TRANSCRIPT", str(tmp_path / "runs.tx"))
+    monkeypatch.setenv("SAVANTY_TRANSCRIPT_MODE", "record")
+    reset_transcript()
+    lm = StandInLM(problem.responses())
+    with stand_in_lm(lm):
+        recorded = run_pipeline(problem.description, pipeline=pipeline)
+    calls = len(lm.history)
+    assert get_transcript().recorded == calls > 0
+
+    monkeypatch.setenv("SAVANTY_TRANSCRIPT_MODE", "strict")
+    reset_transcript()
+    with stand_in_lm(lm):
+        replayed = run_pipeline(problem.description, pipeline=pipeline)
+        assert len(lm.history) == calls
+        with pytest.raises(ValueError, match="No recorded"):
+            run_pipeline("Some other problem", pipeline=pipeline)
+    assert replayed.components == recorded.components == problem.program_components
+
+
+def test_cli_strict_replay_fails_on_miss(tmp_path):
+    """Test that the CLI exits with an error on a strict-mode miss."""
+    from savanty.cli import main
+
+    result = CliRunner().invoke(main, ['-p', 'Minimize x', '--transcript', str(tmp_path / "empty.tx"),
+                                       '--transcript-mode', 'strict'])
+
+    assert result.exit_code == 1
+    assert "No recorded 'validate' call" in result.output
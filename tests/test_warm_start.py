@@ -0,0 +1,171 @@
+"""Tests for warm-starting solves from a previous solution."""
+
+import asyncio
+import json
+import os
+import pytest
+from unittest.mock import patch
+from click.testing import CliRunner
+from savanty.bench import make_problem
+from savanty.cli import main
+from savanty.problem_templates import get_template_store
+from savanty.session import SolveSession
+from savanty.session_store import get_session_store
+from savanty.solver import ProblemSolverResult, SolverOptions, solve_program, solve_template
+from savanty.warm_start import previous_atoms
+
+
+KNAPSACK = make_problem("knapsack", 12).program_components
+OPTIONS = SolverOptions(time_limit=5)
+
+
+def with_facts(components, drop="", add=()):
+    facts = [fact for fact in components["facts"] if not drop or not fact.startswith(drop)]
+    return dict(components, facts=facts + list(add))
+
+
+def test_still_feasible_solution_bounds_the_search():
+    """Test that a still feasible previous solution bounds the search and is fully reused."""
+    first = solve_program(KNAPSACK, options=OPTIONS)
+
+    # A heavy new item leaves the previous choice optimal
+    result = solve_program(with_facts(KNAPSACK, add=["item(extra,1,30)"]), options=OPTIONS, warm_start=first)
+
+    assert (result.cost, result.optimal) == (first.cost, True)
+    assert result.warm_start == {"previous_atoms": len(first.atoms["take"]), "kept_atoms": len(first.atoms["take"]),
+                                 "reused": 1.0, "feasible": True, "bound": first.cost}
+    assert first.warm_start is None
+
+
+def test_infeasible_solution_only_guides_the_search():
+    """Test that an infeasible previous solution only guides the search, which still finds the optimum."""
+    first = solve_program(KNAPSACK, options=OPTIONS)
+    tighter = with_facts(KNAPSACK, drop="capacity", add=["capacity(14)"])
+
+    result = solve_program(tighter, options=OPTIONS, warm_start=first.to_dict())
+
+    assert (result.cost, result.optimal) == (solve_program(tighter, options=OPTIONS).cost, True)
+    report = result.warm_start
+    assert (report["feasible"], report["bound"]) == (False, None)
+    assert 0 < report["kept_atoms"] < report["previous_atoms"]
+    assert report["reused"] == report["kept_atoms"] / report["previous_atoms"]
+
+
+def test_previous_atoms_accepts_results_dicts_and_atoms():
+    """Test that results, result dicts and atoms are accepted and anything else is rejected."""
+    atoms = {"take": [["a"]]}
+
+    assert previous_atoms(ProblemSolverResult(atoms=atoms)) == atoms
+    assert previous_atoms(ProblemSolverResult(atoms=atoms).to_dict()) == atoms
+    assert previous_atoms(atoms) == atoms
+    assert previous_atoms(ProblemSolverResult(solution="No solution found")) is None
+    with pytest.raises(ValueError):
+        previous_atoms(["take(a)"])
+    assert "needs a previous result" in solve_program(KNAPSACK, warm_start="take(a)").error
+
+
+def test_sessions_warm_start_after_new_facts():
+    """Test that a session warm-starts when new facts force a fresh grounding."""
+    session = SolveSession("Pack items")
+    session.program_components = KNAPSACK
+
+    first = session.solve(options=OPTIONS)
+    assert first.warm_start is None
+    result = session.solve(facts=["item(extra,1,30)"], options=OPTIONS)
+
+    assert session.groundings == 2
+    assert result.warm_start["bound"] == first.cost and result.optimal
+    # Re-solving the live grounding needs no warm start
+    assert session.solve(options=OPTIONS).warm_start is None
+
+
+def test_cli_saves_and_warm_starts_from_results(tmp_path):
+    """Test that --save-result writes a result that --warm-start reads back."""
+    get_template_store().save(KNAPSACK, template_id="knapsack")
+    saved = tmp_path / "last.json"
+    runner = CliRunner()
+    facts = [argument for fact in KNAPSACK["facts"] for argument in ("--fact", fact)]
+
+    result = runner.invoke(main, ["--template", "knapsack", *facts, "--save-result", str(saved)])
+    assert result.exit_code == 0 and "Warm start" not in result.output
+    assert json.loads(saved.read_text())["optimal"] is True
+
+    result = runner.invoke(main, ["--template", "knapsack", *facts, "--fact", "item(extra,1,30)",
+                                  "--warm-start", str(saved)])
+    assert result.exit_code == 0
+    assert "Warm start: kept 100% of the previous solution" in result.output
+    assert "initial bound" in result.output
+
+    saved.write_text("[]")
+    result = runner.invoke(main, ["--template", "knapsack", "--warm-start", str(saved)])
+    assert result.exit_code == 2 and "needs a previous result" in result.output
+
+
+def test_template_endpoint_warm_starts_from_a_session():
+    """Test that template solves warm-start from a session's last result or an inline result."""
+    from fastapi.testclient import TestClient
+    from savanty.server import create_app
+
+    get_template_store().save(KNAPSACK, template_id="knapsack")
+    session = SolveSession("Pack items")
+    session.program_components = KNAPSACK
+    session.solve(options=OPTIONS)
+    get_session_store().put(session)
+    client = TestClient(create_app())
+
+    facts = KNAPSACK["facts"] + ["item(extra,1,30)"]
+    response = client.post("/templates/knapsack/solve", json={"facts": facts, "warm_start_session": session.id})
+    assert response.status_code == 200
+    assert response.json()["warm_start"]["reused"] == 1.0
+
+    response = client.post("/templates/knapsack/solve", json={"facts": facts,
+                                                              "warm_start": session.last_result.to_dict()})
+    assert response.json()["warm_start"]["feasible"] is True
+    assert client.post("/templates/knapsack/solve", json={"warm_start_session": "missing"}).status_code == 404
+
+
+@patch("savanty.session.run_pipeline")
+def test_http_session_turns_warm_start_after_new_facts(mock_pipeline):
+    """Test that an HTTP session turn adding facts warm-starts from the previous turn's solution."""
+    import dspy
+    from fastapi.testclient import TestClient
+    from savanty.server import create_app
+
+    mock_pipeline.return_value = dspy.Prediction(needs_more_info=False, components=KNAPSACK)
+    client = TestClient(create_app())
+
+    first = client.post("/solve", json={"problem_description": "Pack items", "time_limit": 5}).json()
+    assert "warm_start" not in first
+    second = client.post("/solve", json={"session_id": first["session_id"], "facts": ["item(extra,1,30)"],
+                                         "time_limit": 5}).json()
+
+    assert second["warm_start"]["reused"] == 1.0 and second["warm_start"]["bound"] == first["cost"]
+
+
+def test_templates_warm_start_from_their_last_result():
+    """Test that template solves keep their last result and warm_start_template starts from it."""
+    from fastapi.testclient import TestClient
+    from savanty.jobs import JobRegistry
+    from savanty.mcp_server import SavantyTools
+    from savanty.server import create_app
+
+    store = get_template_store()
+    store.save(KNAPSACK, template_id="knapsack")
+    assert store.last_result("knapsack") is None
+    first = solve_template("knapsack", facts=KNAPSACK["facts"], options=OPTIONS)
+    assert store.last_result("knapsack", 1) == first.atoms
+
+    facts = KNAPSACK["facts"] + ["item(extra,1,30)"]
+    client = TestClient(create_app())
+    response = client.post("/templates/knapsack/solve", json={"facts": facts, "warm_start_template": "knapsack"})
+    assert response.json()["warm_start"]["reused"] == 1.0
+
+    result = asyncio.run(SavantyTools(jobs=JobRegistry()).solve_with_facts("knapsack", facts=facts,
+                                                                           warm_start_template="knapsack@1"))
+    assert result["warm_start"]["feasible"] is True
+
+    store.save(KNAPSACK, template_id="unsolved")
+    response = client.post("/templates/knapsack/solve", json={"warm_start_template": "unsolved"})
+    assert response.status_code == 400 and "no solution to start from" in response.json()["detail"]["error"]
+    assert client.post("/templates/knapsack/solve", json={"warm_start_template": "missing"}).status_code == 404
+    assert store.delete("knapsack") and not os.path.exists(os.path.join(store.directory, "knapsack"))
@@ -0,0 +1,80 @@
+"""Tests for the isolated Clingo worker processes."""
+
+import pytest
+from savanty.solver import solve_program, SolverOptions
+from savanty.workers import IsolatedExecutor, WorkerLimitError, encode_job, decode_job
+from tests.test_solver import independent_set_problem
+
+
+KNAPSACK = {
+    "predicates": [],
+    "facts": ["item(a,3)", "item(b,5)", "item(c,4)"],
+    "constraints": ["1 { pick(I) : item(I,_) } 2."],
+    "optimize": "#maximize { V,I : pick(I), item(I,V) }."
+}
+
+
+@pytest.fixture
+def executor():
+    executor = IsolatedExecutor(max_workers=1, memory_limit_mb=1024, cpu_limit=30, timeout=1.0)
+    yield executor
+    executor.shutdown()
+
+
+def test_encode_job_round_trip():
+    """Test that jobs survive serialization."""
+    payload = encode_job(solve_program, (KNAPSACK,), {"options": None})
+    fn, args, kwargs = decode_job(payload)
+    assert fn is solve_program
+    assert args == (KNAPSACK,)
+
+
+def test_isolated_executor_solves(executor):
+    """Test that a job runs in a worker process and returns its result."""
+    result = executor.submit(solve_program, KNAPSACK).result()
+    assert result.error is None
+    assert sorted(result.atoms["pick"]) == [["b"], ["c"]]
+
+
+def test_isolated_executor_kills_and_respawns_on_overrun(executor):
+    """Test that a job exceeding the wall-clock limit is killed and the worker replaced."""
+    future = executor.submit(solve_program, independent_set_problem(nodes=250, density=0.05))
+    with pytest.raises(WorkerLimitError):
+        future.result()
+    assert executor.respawns == 1
+    # The replacement worker serves the next job
+    assert executor.submit(solve_program, KNAPSACK).result().error is None
+
+
+def test_isolated_executor_respects_solver_budget(executor):
+    """Test that jobs finishing within the limits are unaffected."""
+    result = executor.submit(solve_program, independent_set_problem(),
+                             options=SolverOptions(time_limit=0.2)).result()
+    assert result.optimal is False
+    assert executor.respawns == 0
+
+
+def test_respawn_does_not_hold_the_submit_lock(executor):
+    """Test that new jobs can be submitted while a killed worker's replacement starts."""
+    import threading
+    import time
+
+    spawn = executor._spawn
+    spawning = threading.Event()
+
+    def slow_spawn():
+        spawning.set()
+        time.sleep(0.5)
+        return spawn()
+
+    executor._spawn = slow_spawn
+    future = executor.submit(solve_program, independent_set_problem(nodes=250, density=0.05))
+    assert spawning.wait(5)
+    started = time.monotonic()
+    queued = executor.submit(solve_program, KNAPSACK)
+    assert time.monotonic() - started < 0.2
+
+    with pytest.raises(WorkerLimitError):
+        future.result()
+    assert queued.result().error is None
+    assert executor.respawns == 1